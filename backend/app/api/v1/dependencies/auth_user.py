@@ -1,17 +1,36 @@
 #logica de autenticacion/validacion de token (jwt, auth0, etc)
 #una dependencia para validar el token JWT en cada request
+from typing import Any, Dict, List, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from supabase import AuthApiError
 #from app.core.supabase import supabase  # Asegúrate de que esta importación sea correcta
-from app.api.v1.routers.users.auth_user2.auth import read_profile
-from app.schemas.user import UserProfileAndRolesOut
-from app.supabase.auth_service import supabase_auth  # Importa el cliente Supabase inicializado
+from app.supabase.auth_service import get_async_auth, auth_call  # Cliente asíncrono de Supabase Auth
 from app.schemas.auth_user import SupabaseUser  # o desde schemas si lo moviste
 from gotrue.types import User  # Importa el tipo User de gotrue import UserResponse  # Importa UserResponse para manejar la respuesta de get_user
+from app.supabase.jwt_service import verify_access_token, UnknownSigningKeyError
+from app.supabase.token_cache import user_token_cache, token_expiration, unverified_claims
+from app.supabase.role_cache import get_user_roles
+from app.api.v1.dependencies.database_supabase import get_async_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import AUTH_JWT_VERIFICATION, AUTH_ROLES_CLAIM
+import jwt
+import logging
+
+logger = logging.getLogger(__name__)
 
 security = HTTPBearer()
 
+
+def _roles_from_claims(claims: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    Extrae la lista de roles del claim personalizado, o None si el token no lo trae.
+    """
+    roles = claims.get(AUTH_ROLES_CLAIM)
+    if not isinstance(roles, list):
+        return None
+    return [str(rol) for rol in roles]
+
 # Dependencia para validar el token JWT y obtener los datos del usuario autenticado
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -40,12 +59,58 @@ async def get_current_user(
         email=user_data.get("email")
     )'''
 
+    # Un token invalidado por /auth/logout no se vuelve a aceptar aunque su firma sea válida
+    if user_token_cache.is_revoked(token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido o expirado: la sesión fue cerrada"
+        )
+
+    cached_user = user_token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
+    user = None
+    exp = None
+    if AUTH_JWT_VERIFICATION == "local":
+        # Validación local: firma, expiración y audiencia sin ida y vuelta a GoTrue
+        try:
+            claims = await verify_access_token(token)
+            user = SupabaseUser(
+                id=claims["sub"],
+                email=claims.get("email") or "",
+                roles=_roles_from_claims(claims)
+            )
+            exp = claims["exp"]
+        except UnknownSigningKeyError as e:
+            # Clave de firma desconocida: se valida contra GoTrue
+            logger.info(f"Validación local no disponible, se consulta a Supabase Auth: {e}")
+        except jwt.InvalidTokenError as e:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=f"Token inválido o expirado: {str(e)}"
+            )
+
+    if user is None:
+        user = await get_user_remote(token)
+        # GoTrue ya validó el token, así que se puede leer el claim de roles sin verificar la firma
+        user.roles = _roles_from_claims(unverified_claims(token))
+        exp = token_expiration(token)
+
+    user_token_cache.set(token, user, exp)
+    return user
+
+
+async def get_user_remote(token: str) -> SupabaseUser:
+    """
+    Valida el token consultando a Supabase Auth (GoTrue) y retorna los datos del usuario.
+    """
     try:
         # Obtenemos la respuesta completa del cliente de Supabase
-        user_response = supabase_auth.auth.get_user(token)
+        user_response = await auth_call(get_async_auth().get_user(token))
         
         # Accedemos al objeto 'user' que está anidado en la respuesta
-        user_data = user_response.user
+        user_data = user_response.user if user_response else None
         
         if not user_data:
             # Si no hay datos de usuario, es un token inválido
@@ -59,6 +124,8 @@ async def get_current_user(
             id=user_data.id,
             email=user_data.email
         )
+    except HTTPException:
+        raise
     except AuthApiError as e:
         # Capturamos la excepción específica de la librería para un token inválido
         raise HTTPException(
@@ -74,14 +141,21 @@ async def get_current_user(
     
 
 async def get_admin_user(
-    current_user_profile: UserProfileAndRolesOut = Depends(read_profile)
+    current_user: SupabaseUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ) -> SupabaseUser:
     """
     Dependencia que asegura que el usuario autenticado es un administrador.
+    Los roles se toman del claim del token; si no viene, del cache de roles por usuario
+    (con una única consulta a rol/usuario_rol cuando no está cacheado).
     """
-    if "admin" not in current_user_profile.roles:
+    roles = current_user.roles
+    if roles is None:
+        roles = await get_user_roles(db, current_user.id)
+
+    if "admin" not in roles:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permisos de administrador"
         )
-    return current_user_profile
\ No newline at end of file
+    return current_user
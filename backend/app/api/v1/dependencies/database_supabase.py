@@ -2,7 +2,7 @@ from typing import Generator
 #from fastapi import logger
 import logging
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.supabase.db.db_supabase import AsyncSessionLocal, SessionLocal
+from app.supabase.db.db_supabase import get_async_sessionmaker, get_session_local
 
 #def get_async_db() -> Generator[AsyncSession, None, None]:
 
@@ -16,7 +16,7 @@ logger = logging.getLogger(__name__)
 
 # Función síncrona para obtener sesión de base de datos
 def get_db():
-    db = SessionLocal()
+    db = get_session_local()()
     try:
         yield db
     finally:
@@ -24,7 +24,7 @@ def get_db():
 
 # Función asíncrona para obtener sesión de base de datos con mejor manejo de errores
 async def get_async_db():
-    async with AsyncSessionLocal() as session:
+    async with get_async_sessionmaker()() as session:
         try:
             yield session
         except Exception as e:
@@ -1,9 +1,133 @@
+import asyncio
+import base64
+import hashlib
+import logging
 import uuid
-from app.idrive.idrive_service import idrive_s3_client
-from app.core.config import IDRIVE_BUCKET_NAME, IDRIVE_ENDPOINT_URL
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from app.idrive.idrive_service import get_idrive_client
+from app.core.config import (
+    IDRIVE_BUCKET_NAME, IDRIVE_ENDPOINT_URL, IDRIVE_UPLOAD_CONCURRENCY,
+    IDRIVE_PRESIGN_EXPIRES_SECONDS, IDRIVE_MAX_FILE_SIZE_BYTES,
+    IDRIVE_MULTIPART_PART_SIZE_BYTES, IDRIVE_MULTIPART_CONCURRENCY,
+)
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import NoCredentialsError, ClientError
 from fastapi import UploadFile
 
+logger = logging.getLogger(__name__)
+
+# Tamaño de lectura al calcular el hash de un archivo ya recibido
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Límite de subidas simultáneas en todo el proceso: cada subida ocupa un hilo del pool de
+# asyncio.to_thread y una conexión HTTP de boto3
+_upload_semaphore: Optional[asyncio.Semaphore] = None
+
+# Mismas partes y concurrencia que la subida por streaming, en lugar de los valores por
+# defecto de boto3 (partes de 8 MiB y 10 hilos por archivo)
+_transfer_config = TransferConfig(
+    multipart_threshold=IDRIVE_MULTIPART_PART_SIZE_BYTES,
+    multipart_chunksize=IDRIVE_MULTIPART_PART_SIZE_BYTES,
+    max_concurrency=IDRIVE_MULTIPART_CONCURRENCY,
+)
+
+
+def _get_upload_semaphore() -> asyncio.Semaphore:
+    global _upload_semaphore
+    if _upload_semaphore is None:
+        _upload_semaphore = asyncio.Semaphore(IDRIVE_UPLOAD_CONCURRENCY)
+    return _upload_semaphore
+
+
+def idrive_url_for_key(key: str) -> str:
+    """
+    URL pública de un objeto del bucket.
+    """
+    return f"{IDRIVE_ENDPOINT_URL}/{IDRIVE_BUCKET_NAME}/{key}"
+
+
+def build_document_key(user_id: str, file_type: str, filename: str) -> str:
+    """
+    Ruta del objeto en iDrive: {user_id}/{file_type}/{uuid}.{extension}
+    """
+    file_extension = filename.split('.')[-1]
+    return f"{user_id}/{file_type}/{uuid.uuid4()}.{file_extension}"
+
+
+def build_content_key(user_id: str, file_type: str, sha256: str, filename: str) -> str:
+    """
+    Ruta direccionada por contenido: {user_id}/{file_type}/{sha256}.{extension}. El mismo
+    archivo subido dos veces por el mismo usuario y tipo de documento cae en el mismo objeto.
+    """
+    file_extension = filename.split('.')[-1].lower()
+    return f"{user_id}/{file_type}/{sha256}.{file_extension}"
+
+
+def build_temp_key(user_id: str, file_type: str, filename: str) -> str:
+    """
+    Ruta temporal para subidas cuyo hash recién se conoce al terminar de recibirlas:
+    tmp/{user_id}/{file_type}/{uuid}.{extension}. Queda fuera del prefijo {user_id}/ que
+    acepta /solicitar-verificacion/finalizar, así que nunca se registra como documento.
+    """
+    file_extension = filename.split('.')[-1].lower()
+    return f"tmp/{user_id}/{file_type}/{uuid.uuid4()}.{file_extension}"
+
+
+class IdriveUpload(NamedTuple):
+    """
+    Resultado de una subida: `nuevo` es False cuando el objeto ya existía y se reutilizó.
+    Ninguno se borra si algo falla después: la key es direccionada por contenido y otro
+    request con el mismo archivo puede estar usándola.
+    """
+    key: str
+    nuevo: bool
+
+
+def _sha256_fileobj(fileobj: BinaryIO) -> str:
+    sha256 = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(_HASH_CHUNK_SIZE), b""):
+        sha256.update(chunk)
+    fileobj.seek(0)
+    return sha256.hexdigest()
+
+
+async def sha256_upload_file(file: UploadFile) -> str:
+    """
+    SHA-256 (hex) de un archivo recibido, calculado fuera del event loop. Deja el archivo
+    posicionado al inicio.
+    """
+    return await asyncio.to_thread(_sha256_fileobj, file.file)
+
+
+async def _upload_to_idrive(
+    file: UploadFile, user_id: str, file_type: str, sha256: Optional[str] = None
+) -> IdriveUpload:
+    """
+    Calcula el SHA-256 del archivo (si no se recibió ya calculado) y lo sube a su key
+    direccionada por contenido, salvo que ese objeto ya exista (ej. un reintento con el mismo
+    documento): ahí se reutiliza. boto3 es síncrono, así que el hash, el HEAD y la subida
+    corren fuera del event loop.
+    """
+    async with _get_upload_semaphore():
+        if sha256 is None:
+            sha256 = await sha256_upload_file(file)
+        idrive_file_key = build_content_key(user_id, file_type, sha256, file.filename)
+
+        if await asyncio.to_thread(_head, idrive_file_key) is not None:
+            logger.info(f"♻️ Documento ya existente en iDrive, se reutiliza: {idrive_file_key}")
+            return IdriveUpload(idrive_file_key, nuevo=False)
+
+        await asyncio.to_thread(
+            get_idrive_client().upload_fileobj,
+            file.file,
+            IDRIVE_BUCKET_NAME,
+            idrive_file_key,
+            ExtraArgs={"ACL": "public-read"},  # Hacer el archivo público
+            Config=_transfer_config
+        )
+    return IdriveUpload(idrive_file_key, nuevo=True)
+
 
 async def upload_file_to_idrive(file: UploadFile, user_id: str, file_type: str) -> str:
     """
@@ -15,26 +139,155 @@ async def upload_file_to_idrive(file: UploadFile, user_id: str, file_type: str)
     return: URL del archivo subido.
     """
     try:
-        # Construir el nombre del archivo y la ruta en iDrive
-        file_extension = file.filename.split('.')[-1]
-        idrive_file_key = f"{user_id}/{file_type}/{uuid.uuid4()}.{file_extension}"
-        
-        # Subir el archivo a iDrive
-        idrive_s3_client.upload_fileobj(
-            file.file,
-            IDRIVE_BUCKET_NAME,
-            idrive_file_key,
-            ExtraArgs={"ACL": "public-read"}  # Hacer el archivo público
-        )
-        
+        idrive_file_key = (await _upload_to_idrive(file, user_id, file_type)).key
+
         # Construir la URL pública del archivo subido
-        idrive_file_url = f"{IDRIVE_ENDPOINT_URL}/{IDRIVE_BUCKET_NAME}/{idrive_file_key}"
-        
-        return idrive_file_url
+        return idrive_url_for_key(idrive_file_key)
     
     except NoCredentialsError:
         raise ValueError("Credenciales de iDrive no encontradas.")
     except ClientError as e:
         raise ValueError(f"Error al subir el archivo a iDrive: {str(e)}")
     except Exception as e:
-        raise ValueError(f"Error inesperado: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Error inesperado: {str(e)}")
+
+
+async def upload_files_to_idrive(
+    files: Sequence[Tuple[UploadFile, str]], user_id: str, sha256s: Optional[Sequence[str]] = None
+) -> List[IdriveUpload]:
+    """
+    Sube varios archivos en paralelo (acotado por IDRIVE_UPLOAD_CONCURRENCY) y devuelve sus
+    keys en el mismo orden, indicando cuáles se subieron y cuáles ya existían. Si alguno
+    falla lanza ValueError; los que sí se subieron quedan en el bucket (ver IdriveUpload).
+
+    parametro files: pares (archivo, tipo de archivo).
+    parametro user_id: ID del usuario que sube los archivos (para organizar en carpetas).
+    parametro sha256s: hashes ya calculados de los archivos, en el mismo orden (opcional).
+    """
+    sha256s = sha256s or [None] * len(files)
+    results = await asyncio.gather(
+        *[_upload_to_idrive(file, user_id, file_type, sha256)
+          for (file, file_type), sha256 in zip(files, sha256s)],
+        return_exceptions=True
+    )
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        error = errors[0]
+        if isinstance(error, NoCredentialsError):
+            raise ValueError("Credenciales de iDrive no encontradas.")
+        if isinstance(error, ClientError):
+            raise ValueError(f"Error al subir el archivo a iDrive: {str(error)}")
+        raise ValueError(f"Error inesperado: {str(error)}")
+
+    return list(results)
+
+
+async def delete_files_from_idrive(keys: Sequence[str]) -> None:
+    """
+    Borra objetos del bucket (best-effort: los errores solo se registran). Se usa para no
+    dejar archivos huérfanos cuando falla la transacción que los iba a referenciar.
+    """
+    if not keys:
+        return
+    try:
+        await asyncio.to_thread(
+            get_idrive_client().delete_objects,
+            Bucket=IDRIVE_BUCKET_NAME,
+            Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+        )
+    except Exception as e:
+        logger.warning(f"No se pudieron borrar {len(keys)} archivo(s) huérfanos de iDrive: {e}")
+
+
+def _presign(
+    key: str, content_type: str, method: str, tamano: Optional[int] = None, sha256: Optional[str] = None
+) -> Dict[str, object]:
+    client = get_idrive_client()
+    if method == "post":
+        # La policy del POST hace que el bucket rechace archivos fuera del límite de tamaño
+        presigned = client.generate_presigned_post(
+            Bucket=IDRIVE_BUCKET_NAME,
+            Key=key,
+            Fields={"acl": "public-read", "Content-Type": content_type},
+            Conditions=[
+                {"acl": "public-read"},
+                {"Content-Type": content_type},
+                ["content-length-range", 1, IDRIVE_MAX_FILE_SIZE_BYTES],
+            ],
+            ExpiresIn=IDRIVE_PRESIGN_EXPIRES_SECONDS,
+        )
+        return {"url": presigned["url"], "campos": presigned["fields"], "headers": {}}
+
+    # Content-Type y Content-Length quedan en la firma: el bucket rechaza un PUT con otro tipo
+    # o con otro tamaño que el declarado (que ya se validó contra el límite)
+    params = {
+        "Bucket": IDRIVE_BUCKET_NAME, "Key": key, "ContentType": content_type,
+        "ContentLength": tamano, "ACL": "public-read",
+    }
+    headers = {"Content-Type": content_type, "Content-Length": str(tamano), "x-amz-acl": "public-read"}
+    if sha256 is not None:
+        # Con el checksum firmado el bucket verifica que el cuerpo tenga ese SHA-256: una key
+        # direccionada por contenido no puede quedar con otro contenido
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        params["ChecksumSHA256"] = checksum
+        headers["x-amz-checksum-sha256"] = checksum
+
+    url = client.generate_presigned_url("put_object", Params=params, ExpiresIn=IDRIVE_PRESIGN_EXPIRES_SECONDS)
+    # Los headers firmados deben enviarse tal cual en el PUT
+    return {"url": url, "campos": {}, "headers": headers}
+
+
+async def presign_document_upload(
+    key: str, content_type: str, method: str = "put", tamano: Optional[int] = None,
+    sha256: Optional[str] = None,
+) -> Dict[str, object]:
+    """
+    Genera una URL firmada (PUT) o un formulario firmado (POST) para que el cliente suba un
+    documento directo al bucket. El PUT necesita el tamaño exacto del archivo (`tamano`), que
+    queda firmado, igual que su SHA-256 (hex) si se indica. Firmar no hace requests de red,
+    pero boto3 es síncrono y puede resolver credenciales: se ejecuta fuera del event loop.
+    """
+    return await asyncio.to_thread(_presign, key, content_type, method, tamano, sha256)
+
+
+async def idrive_object_exists(key: str) -> bool:
+    """
+    Indica si el objeto existe en el bucket (HEAD).
+    """
+    return await asyncio.to_thread(_head, key) is not None
+
+
+async def copy_idrive_object(source_key: str, key: str) -> None:
+    """
+    Copia un objeto dentro del bucket (del lado del servidor, sin descargarlo) manteniendo
+    sus metadatos y el acceso público.
+    """
+    await asyncio.to_thread(
+        get_idrive_client().copy_object,
+        Bucket=IDRIVE_BUCKET_NAME,
+        Key=key,
+        CopySource={"Bucket": IDRIVE_BUCKET_NAME, "Key": source_key},
+        ACL="public-read",
+    )
+
+
+def _head(key: str) -> Optional[Dict[str, object]]:
+    try:
+        return get_idrive_client().head_object(Bucket=IDRIVE_BUCKET_NAME, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+
+async def head_idrive_objects(keys: Sequence[str]) -> List[Optional[Dict[str, object]]]:
+    """
+    HEAD de varios objetos en paralelo (acotado por IDRIVE_UPLOAD_CONCURRENCY). Devuelve los
+    metadatos de cada uno (ContentLength, ContentType, ...) o None si no existe.
+    """
+    async def head_one(key: str):
+        async with _get_upload_semaphore():
+            return await asyncio.to_thread(_head, key)
+
+    return list(await asyncio.gather(*[head_one(key) for key in keys]))
@@ -0,0 +1,34 @@
+# app/api/v1/routers/health/health.py
+
+from fastapi import APIRouter, HTTPException, status
+from app.core.startup import readiness, startup_timer
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get(
+    "/live",
+    status_code=status.HTTP_200_OK,
+    description="Liveness: el proceso está vivo y atiende requests."
+)
+async def liveness():
+    return {"status": "alive"}
+
+
+@router.get(
+    "/ready",
+    status_code=status.HTTP_200_OK,
+    description="Readiness: la instancia terminó el warm-up (conexiones abiertas y datos de referencia precargados)."
+)
+async def readiness_check():
+    if not readiness.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "status": "warming_up",
+                "intentos": readiness.intentos,
+                # El error real (puede incluir host o DSN) solo va al log del warm-up
+                "motivo": "reintentando warm-up" if readiness.error else "warm-up en curso",
+            }
+        )
+    return {"status": "ready", "arranque": startup_timer.report()}
@@ -1,76 +1,336 @@
 # app/api/v1/routers/locations.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from collections import defaultdict
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
+from typing import List, Literal, Optional, Sequence, Tuple
+import pydantic_core
 from app.api.v1.dependencies.database_supabase import get_async_db
+from app.core.config import (
+    REFERENCE_CACHE_CHECK_SECONDS, REFERENCE_CACHE_MAX_AGE_SECONDS, REFERENCE_HTTP_MAX_AGE_SECONDS,
+)
 from app.models.empresa.departamento import Departamento
 from app.models.empresa.ciudad import Ciudad
 from app.models.empresa.barrio import Barrio
 from app.schemas.empresa.departamento import DepartamentoOut
 from app.schemas.empresa.ciudad import CiudadOut
-from app.schemas.empresa.barrio import BarrioOut
+from app.schemas.empresa.barrio import BarrioOut, BarrioPacked
+from app.schemas.empresa.departamento import DepartamentoPacked
+from app.schemas.empresa.ciudad import CiudadPacked
+from app.schemas.empresa.ubicaciones import (
+    UbicacionesArbolPacked, UbicacionResultado,
+    PuntoIn, GeocodificacionInversaBatchIn, GeocodificacionInversaOut,
+)
+from app.utils.location_index import location_index
+from app.utils.geocoding import barrio_rtree, resolver_barrios
+from app.utils.reference_cache import ReferenceDataCache, cached_response, content_hash
 
 router = APIRouter(prefix="/locations", tags=["locations"])
 
+# Respuestas ya serializadas; se descartan cuando cambia la versión 'ubicaciones'
+# (triggers sobre departamento, ciudad y barrio)
+ubicaciones_cache = ReferenceDataCache(
+    "ubicaciones",
+    check_seconds=REFERENCE_CACHE_CHECK_SECONDS,
+    max_age_seconds=REFERENCE_CACHE_MAX_AGE_SECONDS,
+)
+
+
+def _columnas(model, schema) -> list:
+    """
+    Columnas del modelo que expone el schema *Out, en el orden de sus campos: los listados
+    leen solo eso (sin entidades ORM, identity map ni relaciones).
+    """
+    return [getattr(model, campo) for campo in schema.model_fields]
+
+
+departamento_columnas = _columnas(Departamento, DepartamentoOut)
+ciudad_columnas = _columnas(Ciudad, CiudadOut)
+barrio_columnas = _columnas(Barrio, BarrioOut)
+
+
+def _serializar(columnas: list, rows: Sequence[tuple]) -> Tuple[bytes, int]:
+    """
+    JSON de las filas (tuplas en el orden de `columnas`) sin pasar por modelos pydantic: los
+    tipos ya vienen de la base y pydantic_core serializa igual que el schema (mismos bytes,
+    mismo ETag).
+    """
+    campos = [columna.key for columna in columnas]
+    items = [dict(zip(campos, row)) for row in rows]
+    return pydantic_core.to_json(items), len(items)
+
+
 @router.get(
     "/departamentos",
     response_model=List[DepartamentoOut],
     status_code=status.HTTP_200_OK,
-    description="Devuelve una lista de todos los departamentos."
+    description="Devuelve una lista de todos los departamentos. Soporta ETag / If-None-Match."
 )
-async def get_departamentos(db: AsyncSession = Depends(get_async_db)):
+async def get_departamentos(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Obtiene todos los departamentos de la base de datos.
     """
-    result = await db.execute(select(Departamento))
-    departamentos = result.scalars().all()
-    if not departamentos:
+    async def cargar():
+        result = await db.execute(select(*departamento_columnas))
+        return _serializar(departamento_columnas, result.all())
+
+    await ubicaciones_cache.ensure_fresh(db)
+    payload = await ubicaciones_cache.get_or_load("departamentos", cargar)
+    if not payload.items:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No se encontraron departamentos."
         )
-    return list(departamentos)
+    return cached_response(request, payload, REFERENCE_HTTP_MAX_AGE_SECONDS)
 
 @router.get(
     "/ciudades/{id_departamento}",
     response_model=List[CiudadOut],
     status_code=status.HTTP_200_OK,
-    description="Devuelve una lista de ciudades para un departamento específico."
+    description="Devuelve una lista de ciudades para un departamento específico. Soporta ETag / If-None-Match."
 )
-async def get_ciudades_por_departamento(id_departamento: int, db: AsyncSession = Depends(get_async_db)):
+async def get_ciudades_por_departamento(id_departamento: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Obtiene todas las ciudades de un departamento por su ID.
     """
-    result = await db.execute(
-        select(Ciudad).where(Ciudad.id_departamento == id_departamento)
+    async def cargar():
+        result = await db.execute(
+            select(*ciudad_columnas).where(Ciudad.id_departamento == id_departamento)
+        )
+        return _serializar(ciudad_columnas, result.all())
+
+    await ubicaciones_cache.ensure_fresh(db)
+    # Sin cachear listas vacías: el warm-up ya cargó todos los padres válidos, y un id
+    # inexistente no debe dejar una entrada por cada valor que envíe el cliente
+    payload = await ubicaciones_cache.get_or_load(
+        f"ciudades:{id_departamento}", cargar, cache_empty=False
     )
-    ciudades = result.scalars().all()
-    if not ciudades:
+    if not payload.items:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No se encontraron ciudades para el departamento con ID {id_departamento}."
         )
-    return list(ciudades)
+    return cached_response(request, payload, REFERENCE_HTTP_MAX_AGE_SECONDS)
 
 @router.get(
     "/barrios/{id_ciudad}",
     response_model=List[BarrioOut],
     status_code=status.HTTP_200_OK,
-    description="Devuelve una lista de barrios para una ciudad específica."
+    description="Devuelve una lista de barrios para una ciudad específica. Soporta ETag / If-None-Match."
 )
-async def get_barrios_por_ciudad(id_ciudad: int, db: AsyncSession = Depends(get_async_db)):
+async def get_barrios_por_ciudad(id_ciudad: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Obtiene todos los barrios de una ciudad por su ID.
     """
-    result = await db.execute(
-        select(Barrio).where(Barrio.id_ciudad == id_ciudad)
-    )
-    barrios = result.scalars().all()
-    if not barrios:
+    async def cargar():
+        result = await db.execute(
+            select(*barrio_columnas).where(Barrio.id_ciudad == id_ciudad)
+        )
+        return _serializar(barrio_columnas, result.all())
+
+    await ubicaciones_cache.ensure_fresh(db)
+    payload = await ubicaciones_cache.get_or_load(f"barrios:{id_ciudad}", cargar, cache_empty=False)
+    if not payload.items:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"No se encontraron barrios para la ciudad con ID {id_ciudad}."
         )
-    return list(barrios)
\ No newline at end of file
+    return cached_response(request, payload, REFERENCE_HTTP_MAX_AGE_SECONDS)
+
+
+async def _cargar_arbol(db: AsyncSession) -> Tuple[bytes, int, str]:
+    """
+    Arma el árbol compacto con una consulta liviana por tabla (solo id, nombre y padre).
+    La versión es el hash del contenido, así todos los workers calculan la misma.
+    """
+    dep = (await db.execute(
+        select(Departamento.id_departamento, Departamento.nombre).order_by(Departamento.id_departamento)
+    )).all()
+    ciu = (await db.execute(
+        select(Ciudad.id_ciudad, Ciudad.nombre, Ciudad.id_departamento).order_by(Ciudad.id_ciudad)
+    )).all()
+    bar = (await db.execute(
+        select(Barrio.id_barrio, Barrio.nombre, Barrio.id_ciudad).order_by(Barrio.id_barrio)
+    )).all()
+
+    departamentos = DepartamentoPacked(id=[r[0] for r in dep], nombre=[r[1] for r in dep])
+    ciudades = CiudadPacked(
+        id=[r[0] for r in ciu], nombre=[r[1] for r in ciu], id_departamento=[r[2] for r in ciu]
+    )
+    barrios = BarrioPacked(
+        id=[r[0] for r in bar], nombre=[r[1] for r in bar], id_ciudad=[r[2] for r in bar]
+    )
+
+    version = content_hash(
+        departamentos.model_dump_json().encode()
+        + ciudades.model_dump_json().encode()
+        + barrios.model_dump_json().encode()
+    )
+    arbol = UbicacionesArbolPacked(
+        version=version, departamentos=departamentos, ciudades=ciudades, barrios=barrios
+    )
+    return arbol.model_dump_json().encode(), len(dep) + len(ciu) + len(bar), version
+
+
+@router.get(
+    "/arbol",
+    response_model=UbicacionesArbolPacked,
+    status_code=status.HTTP_200_OK,
+    responses={304: {"description": "El cliente ya tiene esta versión del árbol."}},
+    description=(
+        "Devuelve el árbol completo departamento -> ciudad -> barrio en una sola respuesta, "
+        "en formato compacto por columnas (comprimido con gzip si el cliente lo acepta). "
+        "Si `version` coincide con la actual responde 304 sin cuerpo."
+    )
+)
+async def get_arbol_ubicaciones(
+    request: Request,
+    version: Optional[str] = Query(None, description="Versión del árbol que el cliente ya tiene guardada."),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Obtiene todas las ubicaciones en una sola llamada, para cargar el formulario de dirección
+    sin encadenar departamentos -> ciudades -> barrios.
+    """
+    await ubicaciones_cache.ensure_fresh(db)
+    payload = await ubicaciones_cache.get_or_load("arbol", lambda: _cargar_arbol(db))
+    if not payload.items:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No se encontraron ubicaciones."
+        )
+    return cached_response(
+        request, payload, REFERENCE_HTTP_MAX_AGE_SECONDS,
+        not_modified=version is not None and f'"{version}"' == payload.etag,
+    )
+
+
+@router.get(
+    "/search",
+    response_model=List[UbicacionResultado],
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Autocompletado de barrios y ciudades por nombre (por prefijo y aproximado, sin distinguir "
+        "tildes ni mayúsculas). Cada resultado incluye su ruta completa."
+    )
+)
+async def search_ubicaciones(
+    q: str = Query(..., min_length=2, max_length=100, description="Texto a buscar."),
+    tipo: Optional[Literal["barrio", "ciudad"]] = Query(None, description="Restringe la búsqueda a barrios o ciudades."),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Busca en el índice en memoria; solo va a la base para reconstruirlo cuando cambió la
+    versión de las ubicaciones (o si todavía no se construyó).
+    """
+    await _asegurar_indices(db)
+    return location_index.search(q, limit=limit, tipo=tipo)
+
+
+async def _asegurar_indices(db: AsyncSession) -> None:
+    """
+    Reconstruye los índices en memoria (búsqueda y R-tree) si cambió la versión de las
+    ubicaciones o todavía no se construyeron.
+    """
+    await ubicaciones_cache.ensure_fresh(db)
+    version = ubicaciones_cache.version
+    if not location_index.listo or location_index.version != version:
+        await location_index.refresh(db, version)
+    if barrio_rtree.disponible and (not barrio_rtree.listo or barrio_rtree.version != version):
+        await barrio_rtree.refresh(db, version)
+
+
+async def _geocodificar(db: AsyncSession, puntos: List[PuntoIn]) -> List[GeocodificacionInversaOut]:
+    await _asegurar_indices(db)
+    resueltos = await resolver_barrios(db, [(p.lon, p.lat) for p in puntos])
+
+    resultado = []
+    for punto, (id_barrio, fuente) in zip(puntos, resueltos):
+        entrada = location_index.get("barrio", id_barrio) if id_barrio is not None else None
+        resultado.append(GeocodificacionInversaOut(
+            lat=punto.lat,
+            lon=punto.lon,
+            encontrado=id_barrio is not None,
+            id_barrio=id_barrio,
+            barrio=entrada.nombre if entrada else None,
+            id_ciudad=entrada.id_ciudad if entrada else None,
+            ciudad=entrada.ciudad if entrada else None,
+            id_departamento=entrada.id_departamento if entrada else None,
+            departamento=entrada.departamento if entrada else None,
+            fuente=fuente,
+        ))
+    return resultado
+
+
+@router.get(
+    "/reverse",
+    response_model=GeocodificacionInversaOut,
+    status_code=status.HTTP_200_OK,
+    description="Geocodificación inversa: devuelve el barrio, la ciudad y el departamento que contienen un punto (lat/lon, SRID 4326)."
+)
+async def reverse_geocode(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Resuelve un punto a su barrio para completar el formulario de dirección automáticamente.
+    """
+    resultado = (await _geocodificar(db, [PuntoIn(lat=lat, lon=lon)]))[0]
+    if not resultado.encontrado:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No se encontró un barrio que contenga el punto indicado."
+        )
+    return resultado
+
+
+@router.post(
+    "/reverse/batch",
+    response_model=List[GeocodificacionInversaOut],
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Geocodificación inversa de un lote de puntos en una sola request (importaciones masivas). "
+        "Devuelve un resultado por punto, en el mismo orden; `encontrado` es False si el punto "
+        "no cae en ningún barrio."
+    )
+)
+async def reverse_geocode_batch(
+    data: GeocodificacionInversaBatchIn,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Resuelve todos los puntos con una sola consulta a PostGIS (más el R-tree si está activo).
+    """
+    return await _geocodificar(db, data.puntos)
+
+
+async def precargar_datos_referencia(db: AsyncSession) -> None:
+    """
+    Llena el cache de ubicaciones (listas por padre y árbol compacto) y construye el índice
+    de búsqueda y, si está activo, el R-tree de barrios. Las listas salen de una consulta por
+    tabla, agrupando por el padre. Se usa en el warm-up para que ninguna request encuentre el
+    cache vacío.
+    """
+    await ubicaciones_cache.ensure_fresh(db)
+
+    result = await db.execute(select(*departamento_columnas))
+    ubicaciones_cache.put("departamentos", *_serializar(departamento_columnas, result.all()))
+
+    for columnas, parent, prefix in (
+        (ciudad_columnas, Ciudad.id_departamento, "ciudades"),
+        (barrio_columnas, Barrio.id_ciudad, "barrios"),
+    ):
+        result = await db.execute(select(*columnas))
+        i_parent = [columna.key for columna in columnas].index(parent.key)
+        grupos = defaultdict(list)
+        for row in result.all():
+            grupos[row[i_parent]].append(row)
+        for parent_id, rows in grupos.items():
+            ubicaciones_cache.put(f"{prefix}:{parent_id}", *_serializar(columnas, rows))
+
+    ubicaciones_cache.put("arbol", *await _cargar_arbol(db))
+    await location_index.refresh(db, ubicaciones_cache.version)
+    await barrio_rtree.refresh(db, ubicaciones_cache.version)
@@ -1,6 +1,6 @@
 # app/api/v1/routers/providers.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.api.v1.dependencies.auth_user import get_current_user
@@ -10,26 +10,184 @@ from app.models.empresa.verificacion_solicitud import VerificacionSolicitud
 from app.models.empresa.documento import Documento
 from app.models.empresa.direccion import Direccion
 from app.models.perfil import UserModel 
-from app.schemas.empresa.perfil_empresa import PerfilEmpresaIn
+from app.models.empresa.tipo_documento import TipoDocumento
+from app.schemas.empresa.perfil_empresa import PerfilEmpresaIn, SolicitudVerificacionFinalizarIn
+from app.schemas.empresa.documento import PresignDocumentosIn, DocumentoPresignOut, DocumentoSubidoOut
+from app.idrive.streaming_upload import stream_to_idrive, UploadTooLargeError, ContentHashMismatchError
 from app.schemas.auth_user import SupabaseUser
-from app.api.v1.dependencies.idrive import upload_file_to_idrive
-from typing import Optional, List
+from app.schemas.empresa.proveedor_cercano import ProveedorCercanoOut, ProveedoresCercanosPage
+from app.api.v1.dependencies.idrive import (
+    upload_files_to_idrive, delete_files_from_idrive, idrive_url_for_key,
+    build_document_key, build_content_key, build_temp_key, presign_document_upload,
+    head_idrive_objects, idrive_object_exists, copy_idrive_object, sha256_upload_file,
+)
+from app.core.config import (
+    PROVIDERS_NEARBY_DEFAULT_RADIUS_M, PROVIDERS_NEARBY_MAX_RADIUS_M,
+    REFERENCE_CACHE_CHECK_SECONDS, REFERENCE_CACHE_MAX_AGE_SECONDS,
+    TILES_MAX_ZOOM, TILES_CLUSTER_MAX_ZOOM, TILES_CLUSTER_GRID, TILES_CACHE_SIZE, TILES_HTTP_MAX_AGE_SECONDS,
+    IDRIVE_PRESIGN_EXPIRES_SECONDS, IDRIVE_MAX_FILE_SIZE_BYTES, IDRIVE_ALLOWED_CONTENT_TYPES,
+)
+from app.utils.cursor import encode_cursor, decode_cursor
+from botocore.exceptions import ClientError
+from app.utils.proveedores_geo import buscar_proveedores_cercanos, generar_tile
+from app.utils.reference_cache import ReferenceDataCache, cached_response
+from app.utils.idempotency import ejecutar_idempotente, huella_request, idempotencia_habilitada
+from typing import Literal, Optional, List, Tuple
+import asyncio
+import math
+import re
 import uuid
 
 router = APIRouter(prefix="/providers", tags=["providers"])
 
+# Tiles generados (LRU); se descartan cuando cambia la versión 'proveedores_geo'
+# (triggers sobre direccion, perfil_empresa y sucursal_empresa)
+tiles_cache = ReferenceDataCache(
+    "proveedores_geo",
+    check_seconds=REFERENCE_CACHE_CHECK_SECONDS,
+    max_age_seconds=REFERENCE_CACHE_MAX_AGE_SECONDS,
+    max_entries=TILES_CACHE_SIZE,
+)
+
+_SHA256_HEX = re.compile(r"^[0-9a-f]{64}$")
+
+TILE_MEDIA_TYPES = {
+    "mvt": "application/vnd.mapbox-vector-tile",
+    "json": "application/json",
+}
+
+async def _obtener_razon_social(db: AsyncSession, current_user: SupabaseUser, nombre_fantasia: str) -> str:
+    """
+    Devuelve la razón social (nombre de empresa del perfil del usuario) y valida que no exista
+    otra empresa con esa razón social o con el mismo nombre de fantasía.
+    """
+    # 1. Obtener el perfil del usuario actual para recuperar el nombre de la empresa
+    #esto porque al iniciar sesion ya carga el nombre de su empresa
+    user_profile_result = await db.execute(
+        select(UserModel).where(UserModel.id == uuid.UUID(current_user.id))
+    )
+
+    # Obtener el perfil de usuario
+    user_profile = user_profile_result.scalars().first()
+
+    # Verificar que el perfil de usuario tiene un nombre de empresa
+    if not user_profile or not user_profile.nombre_empresa:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, 
+                            detail="El nombre de la empresa no está disponible en el perfil de usuario.")
+    
+    razon_social = user_profile.nombre_empresa
+    
+    # 2. Validar la unicidad de la empresa
+    query = select(PerfilEmpresa).where(
+        (PerfilEmpresa.razon_social == razon_social) |
+        (PerfilEmpresa.nombre_fantasia == nombre_fantasia)
+    )
+
+    empresa_existente = await db.execute(query)
+    
+    if empresa_existente.scalars().first():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Una empresa con esta razón social o nombre de fantasía ya está registrada."
+        )
+
+    return razon_social
+
+
+async def _crear_perfil_y_solicitud(
+    db: AsyncSession,
+    current_user: SupabaseUser,
+    perfil_in: PerfilEmpresaIn,
+    razon_social: str,
+    comentario_solicitud: Optional[str],
+    documentos: List[Tuple[int, str]],
+) -> None:
+    """
+    Transacción corta que crea la dirección, el perfil de empresa, la solicitud de verificación
+    y sus documentos (pares id_tip_documento, url ya subida).
+    """
+    async with db.begin():
+        nueva_direccion = Direccion(**perfil_in.direccion.model_dump())
+        db.add(nueva_direccion)
+        await db.flush()
+
+        nuevo_perfil = PerfilEmpresa(
+            user_id=uuid.UUID(current_user.id),
+            razon_social=razon_social,
+            nombre_fantasia=perfil_in.nombre_fantasia,
+            id_direccion=nueva_direccion.id_direccion,
+            estado="pendiente",
+            verificado=False
+        )
+        db.add(nuevo_perfil)
+        await db.flush()
+
+        nueva_solicitud = VerificacionSolicitud(
+            id_perfil=nuevo_perfil.id_perfil,
+            estado="pendiente",
+            comentario=comentario_solicitud
+        )
+        db.add(nueva_solicitud)
+        await db.flush()
+
+        # Crea los registros de los documentos
+        db.add_all([
+            Documento(
+                id_verificacion=nueva_solicitud.id_verificacion,
+                id_tip_documento=id_tip_documento,
+                url_archivo=url_archivo,
+                estado_revision="pendiente"
+            )
+            for id_tip_documento, url_archivo in documentos
+        ])
+
+
 @router.post(
     "/solicitar-verificacion",
     status_code=status.HTTP_201_CREATED,
-    description="Registra un perfil de empresa y una solicitud de verificación con documentos adjuntos."
+    description=(
+        "Registra un perfil de empresa y una solicitud de verificación con documentos adjuntos. "
+        "Con el header Idempotency-Key los reintentos repiten la respuesta del primer request "
+        "en lugar de volver a subir los archivos y crear los registros."
+    )
 )
 async def solicitar_verificacion_completa(
     perfil_in: PerfilEmpresaIn = Depends(),
     ids_tip_documento: List[int] = Form(...), # Recibe una lista de IDs de tipos de documento
     documentos: List[UploadFile] = File(...),
     comentario_solicitud: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     current_user: SupabaseUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_async_db)
+):
+    # Los hashes sirven tanto para la huella del request como para las keys de los objetos
+    sha256s = await asyncio.gather(*[sha256_upload_file(file) for file in documentos])
+
+    async def operacion():
+        return await _solicitar_verificacion(
+            perfil_in, ids_tip_documento, documentos, sha256s, comentario_solicitud, current_user, db
+        )
+
+    if not idempotency_key or not idempotencia_habilitada():
+        return await operacion()
+    huella = huella_request(
+        perfil_in.model_dump(), ids_tip_documento, comentario_solicitud,
+        [(file.filename, sha256) for file, sha256 in zip(documentos, sha256s)],
+    )
+    return await ejecutar_idempotente(
+        str(current_user.id), "providers.solicitar-verificacion", idempotency_key, huella,
+        operacion, status_code=status.HTTP_201_CREATED,
+    )
+
+
+async def _solicitar_verificacion(
+    perfil_in: PerfilEmpresaIn,
+    ids_tip_documento: List[int],
+    documentos: List[UploadFile],
+    sha256s: List[str],
+    comentario_solicitud: Optional[str],
+    current_user: SupabaseUser,
+    db: AsyncSession,
 ):
     try:
         # Validar que la cantidad de IDs de tipos de documento coincide con la de los archivos
@@ -39,85 +197,390 @@ async def solicitar_verificacion_completa(
                 detail="El número de IDs de tipo de documento no coincide con el número de archivos."
             )
 
-        # 1. Obtener el perfil del usuario actual para recuperar el nombre de la empresa
-        #esto porque al iniciar sesion ya carga el nombre de su empresa
-        user_profile_result = await db.execute(
-            select(UserModel).where(UserModel.id == uuid.UUID(current_user.id))
-        )
+        razon_social = await _obtener_razon_social(db, current_user, perfil_in.nombre_fantasia)
 
-        # Obtener el perfil de usuario
-        user_profile = user_profile_result.scalars().first()
+        # Cerrar la transacción de lectura para devolver la conexión al pool: las subidas
+        # pueden tardar varios segundos y no deben retener una conexión
+        await db.rollback()
 
-        # Verificar que el perfil de usuario tiene un nombre de empresa
-        if not user_profile or not user_profile.nombre_empresa:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, 
-                                detail="El nombre de la empresa no está disponible en el perfil de usuario.")
-        
-        razon_social = user_profile.nombre_empresa
-        
-        # 2. Validar la unicidad de la empresa
-        query = select(PerfilEmpresa).where(
-            (PerfilEmpresa.razon_social == razon_social) |
-            (PerfilEmpresa.nombre_fantasia == perfil_in.nombre_fantasia)
-        )
+        # 3. Subir los archivos a iDrive en paralelo, antes de abrir la transacción
+        try:
+            subidas = await upload_files_to_idrive(
+                # Usa el ID del tipo de documento como nombre de carpeta
+                [(file, str(id_tip)) for file, id_tip in zip(documentos, ids_tip_documento)],
+                user_id=str(current_user.id),
+                sha256s=sha256s
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
 
-        empresa_existente = await db.execute(query)
+        # 4. Transacción corta: solo inserta los registros con las URLs ya conocidas
+        try:
+            await _crear_perfil_y_solicitud(
+                db, current_user, perfil_in, razon_social, comentario_solicitud,
+                [(id_tip, idrive_url_for_key(s.key)) for id_tip, s in zip(ids_tip_documento, subidas)]
+            )
+        except Exception:
+            # Los objetos no se borran: son direccionados por contenido y otro request con el
+            # mismo archivo puede haberlos encontrado (HEAD) y registrado mientras tanto. Un
+            # objeto huérfano solo puede borrarse verificando que ningún documento lo referencie
+            raise
         
-        if empresa_existente.scalars().first():
+        return {"message": "Perfil de empresa y solicitud de verificación creados exitosamente."}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error inesperado: {str(e)}")
+
+
+@router.post(
+    "/solicitar-verificacion/presign",
+    response_model=List[DocumentoPresignOut],
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Primer paso de la subida directa: devuelve una URL firmada (PUT) o un formulario firmado "
+        "(POST) por documento para subirlo directo al bucket, sin pasar por la API."
+    )
+)
+async def presign_documentos_verificacion(
+    data: PresignDocumentosIn,
+    current_user: SupabaseUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    for doc in data.documentos:
+        if doc.content_type not in IDRIVE_ALLOWED_CONTENT_TYPES:
             raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Una empresa con esta razón social o nombre de fantasía ya está registrada."
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Tipo de archivo no permitido: {doc.content_type}."
             )
-
-        # 3. Iniciar transacción y creación de registros
-        async with db.begin():
-            nueva_direccion = Direccion(**perfil_in.direccion.model_dump())
-            db.add(nueva_direccion)
-            await db.flush()
-            
-            nuevo_perfil = PerfilEmpresa(
-                user_id=uuid.UUID(current_user.id),
-                razon_social=razon_social,
-                nombre_fantasia=perfil_in.nombre_fantasia,
-                id_direccion=nueva_direccion.id_direccion,
-                estado="pendiente",
-                verificado=False
+        if doc.tamano_bytes is not None and doc.tamano_bytes > IDRIVE_MAX_FILE_SIZE_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"El archivo {doc.nombre_archivo} supera el tamaño máximo de {IDRIVE_MAX_FILE_SIZE_BYTES} bytes."
             )
-            db.add(nuevo_perfil)
-            await db.flush()
+        if data.metodo == "put" and doc.tamano_bytes is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Debe indicar tamano_bytes de {doc.nombre_archivo} para subirlo con PUT."
+            )
+
+    ids_tip = {doc.id_tip_documento for doc in data.documentos}
+    result = await db.execute(
+        select(TipoDocumento.id_tip_documento).where(TipoDocumento.id_tip_documento.in_(ids_tip))
+    )
+    faltantes = ids_tip - set(result.scalars().all())
+    if faltantes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipos de documento inexistentes: {sorted(faltantes)}."
+        )
+    await db.rollback()
+
+    # Con el hash informado y PUT la key es direccionada por contenido: el checksum queda
+    # firmado, así que el bucket solo acepta ese contenido en esa key, y se puede saber de
+    # antemano si el documento ya está (ej. un reintento): ese no se firma ni se sube. El POST
+    # no firma el checksum, así que sube siempre a una key nueva
+    def direccionado(doc) -> bool:
+        return doc.sha256 is not None and data.metodo == "put"
+
+    keys = [
+        build_content_key(str(current_user.id), str(doc.id_tip_documento), doc.sha256.lower(), doc.nombre_archivo)
+        if direccionado(doc) else
+        build_document_key(str(current_user.id), str(doc.id_tip_documento), doc.nombre_archivo)
+        for doc in data.documentos
+    ]
+
+    async def firmar(doc, key: str) -> dict:
+        if not direccionado(doc):
+            return await presign_document_upload(key, doc.content_type, data.metodo, doc.tamano_bytes)
+        if await idrive_object_exists(key):
+            return {"existente": True}
+        return await presign_document_upload(
+            key, doc.content_type, data.metodo, doc.tamano_bytes, doc.sha256.lower()
+        )
+
+    firmados = await asyncio.gather(*[firmar(doc, key) for key, doc in zip(keys, data.documentos)])
+    return [
+        DocumentoPresignOut(
+            id_tip_documento=doc.id_tip_documento,
+            key=key,
+            metodo=data.metodo,
+            expira_en=IDRIVE_PRESIGN_EXPIRES_SECONDS,
+            **firmado
+        )
+        for doc, key, firmado in zip(data.documentos, keys, firmados)
+    ]
 
-            nueva_solicitud = VerificacionSolicitud(
-                id_perfil=nuevo_perfil.id_perfil,
-                estado="pendiente",
-                comentario=comentario_solicitud
+
+@router.put(
+    "/solicitar-verificacion/documentos/{id_tip_documento}",
+    response_model=DocumentoSubidoOut,
+    status_code=status.HTTP_201_CREATED,
+    description=(
+        "Sube un documento enviando el archivo como cuerpo crudo del request (no multipart). "
+        "Se transmite por partes a iDrive con memoria acotada; el límite de tamaño se aplica "
+        "mientras se recibe. Los objetos se guardan por SHA-256: si el mismo documento ya fue "
+        "subido se reutiliza. Con el header X-Content-SHA256 eso se comprueba antes de enviar "
+        "el archivo. Devuelve la key a informar en /solicitar-verificacion/finalizar."
+    )
+)
+async def subir_documento_streaming(
+    id_tip_documento: int,
+    request: Request,
+    nombre_archivo: str = Query(..., min_length=1, max_length=200),
+    current_user: SupabaseUser = Depends(get_current_user)
+):
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in IDRIVE_ALLOWED_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Tipo de archivo no permitido: {content_type or 'sin Content-Type'}."
+        )
+
+    # Si el cliente declara el tamaño, rechazar antes de leer un solo byte
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > IDRIVE_MAX_FILE_SIZE_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El archivo supera el tamaño máximo de {IDRIVE_MAX_FILE_SIZE_BYTES} bytes."
+        )
+
+    user_id, file_type = str(current_user.id), str(id_tip_documento)
+
+    # Con X-Content-SHA256 se conoce la key final antes de leer el cuerpo: si el documento ya
+    # está en el bucket no se recibe ni se sube nada; si no, se sube directo a esa key y el
+    # hash se verifica antes de completar la subida
+    sha256_declarado = request.headers.get("x-content-sha256", "").strip().lower() or None
+    if sha256_declarado is not None and not _SHA256_HEX.match(sha256_declarado):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El header X-Content-SHA256 debe ser un SHA-256 en hexadecimal."
+        )
+
+    try:
+        if sha256_declarado is not None:
+            key = build_content_key(user_id, file_type, sha256_declarado, nombre_archivo)
+            objeto = (await head_idrive_objects([key]))[0]
+            if objeto is not None:
+                return DocumentoSubidoOut(
+                    id_tip_documento=id_tip_documento,
+                    key=key,
+                    url=idrive_url_for_key(key),
+                    tamano_bytes=objeto.get("ContentLength", 0),
+                    sha256=sha256_declarado,
+                    reutilizado=True,
+                )
+            tamano, sha256 = await stream_to_idrive(
+                request.stream(), key, content_type, max_size=IDRIVE_MAX_FILE_SIZE_BYTES,
+                expected_sha256=sha256_declarado,
+            )
+            reutilizado = False
+        else:
+            # Sin hash previo se sube a una key temporal y al terminar se mueve a la key
+            # direccionada por contenido (o se descarta si ese contenido ya existía)
+            temp_key = build_temp_key(user_id, file_type, nombre_archivo)
+            tamano, sha256 = await stream_to_idrive(
+                request.stream(), temp_key, content_type, max_size=IDRIVE_MAX_FILE_SIZE_BYTES
             )
-            db.add(nueva_solicitud)
-            await db.flush()
-
-            # 4. Subir archivos a iDrive y registrar en la base de datos
-            for index, file in enumerate(documentos):
-                id_tip_documento = ids_tip_documento[index]
-                
-                # Sube el archivo a iDrive y obtiene la URL
-                idrive_url = await upload_file_to_idrive(
-                    file=file, 
-                    user_id=str(current_user.id), 
-                    file_type=str(id_tip_documento) # Usa el ID del tipo de documento como nombre de carpeta
+            key = build_content_key(user_id, file_type, sha256, nombre_archivo)
+            try:
+                reutilizado = tamano > 0 and await idrive_object_exists(key)
+                if tamano > 0 and not reutilizado:
+                    await copy_idrive_object(temp_key, key)
+            finally:
+                await delete_files_from_idrive([temp_key])
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ContentHashMismatchError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ClientError as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Error al subir el archivo a iDrive: {str(e)}"
+        )
+
+    if tamano == 0:
+        if sha256_declarado is not None:
+            await delete_files_from_idrive([key])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El archivo está vacío."
+        )
+
+    return DocumentoSubidoOut(
+        id_tip_documento=id_tip_documento,
+        key=key,
+        url=idrive_url_for_key(key),
+        tamano_bytes=tamano,
+        sha256=sha256,
+        reutilizado=reutilizado,
+    )
+
+
+@router.post(
+    "/solicitar-verificacion/finalizar",
+    status_code=status.HTTP_201_CREATED,
+    description=(
+        "Segundo paso de la subida directa: verifica con HEAD que los documentos estén en el bucket "
+        "y registra el perfil de empresa, la solicitud de verificación y sus documentos."
+    )
+)
+async def finalizar_solicitud_verificacion(
+    data: SolicitudVerificacionFinalizarIn,
+    current_user: SupabaseUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        # Solo se aceptan keys generadas para este usuario y este tipo de documento
+        for doc in data.documentos:
+            if not doc.key.startswith(f"{current_user.id}/{doc.id_tip_documento}/"):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f"La key {doc.key} no corresponde a este usuario o tipo de documento."
                 )
-                
-                # Crea el registro del documento
-                nuevo_documento = Documento(
-                    id_verificacion=nueva_solicitud.id_verificacion,
-                    id_tip_documento=id_tip_documento,
-                    url_archivo=idrive_url,
-                    estado_revision="pendiente"
+
+        razon_social = await _obtener_razon_social(db, current_user, data.perfil_empresa.nombre_fantasia)
+        await db.rollback()
+
+        objetos = await head_idrive_objects([doc.key for doc in data.documentos])
+        for doc, objeto in zip(data.documentos, objetos):
+            if objeto is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"El documento {doc.key} no se encontró en el almacenamiento. Súbalo antes de finalizar."
                 )
-                db.add(nuevo_documento)
-        
+
+        # Un archivo fuera del límite no se registra ni se deja en el bucket
+        excedidos = [
+            doc.key for doc, objeto in zip(data.documentos, objetos)
+            if objeto.get("ContentLength", 0) > IDRIVE_MAX_FILE_SIZE_BYTES
+        ]
+        if excedidos:
+            await delete_files_from_idrive(excedidos)
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"El documento {excedidos[0]} supera el tamaño máximo de {IDRIVE_MAX_FILE_SIZE_BYTES} bytes."
+            )
+
+        await _crear_perfil_y_solicitud(
+            db, current_user, data.perfil_empresa, razon_social, data.comentario_solicitud,
+            [(doc.id_tip_documento, idrive_url_for_key(doc.key)) for doc in data.documentos]
+        )
         return {"message": "Perfil de empresa y solicitud de verificación creados exitosamente."}
 
     except HTTPException:
         raise
     except Exception as e:
         await db.rollback()
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error inesperado: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error inesperado: {str(e)}")
+
+
+def _parse_bbox(bbox: str):
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="bbox debe tener el formato min_lon,min_lat,max_lon,max_lat."
+        )
+    if not (-180 <= min_lon < max_lon <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="bbox fuera de rango o con los límites invertidos."
+        )
+    return min_lon, min_lat, max_lon, max_lat
+
+
+@router.get(
+    "/cercanos",
+    response_model=ProveedoresCercanosPage,
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Empresas verificadas y sus sucursales dentro de un radio (radio_m) o de un bounding box "
+        "(bbox=min_lon,min_lat,max_lon,max_lat), ordenadas por distancia a lat/lon. "
+        "Paginación por cursor: enviar next_cursor en ?cursor= para la página siguiente."
+    )
+)
+async def get_proveedores_cercanos(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radio_m: Optional[float] = Query(None, gt=0, le=PROVIDERS_NEARBY_MAX_RADIUS_M),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Busca proveedores cerca de un punto. Si no se indica radio ni bbox se usa el radio por defecto.
+    """
+    after = None
+    if cursor:
+        distancia, tipo, id_proveedor = decode_cursor(cursor, 3)
+        try:
+            after = (float(distancia), str(tipo), int(id_proveedor))
+            # Los valores van a CAST(... AS float8 / bigint): fuera de rango serían un 500
+            if not math.isfinite(after[0]) or not -2 ** 63 <= after[2] < 2 ** 63:
+                raise ValueError
+        except (TypeError, ValueError, OverflowError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El cursor de paginación no es válido."
+            )
+
+    rows = await buscar_proveedores_cercanos(
+        db,
+        lat=lat,
+        lon=lon,
+        limit=limit + 1,
+        radio_m=None if bbox else (radio_m or PROVIDERS_NEARBY_DEFAULT_RADIUS_M),
+        bbox=_parse_bbox(bbox) if bbox else None,
+        after=after,
+    )
+
+    items = [ProveedorCercanoOut(**row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        ultimo = items[-1]
+        next_cursor = encode_cursor([ultimo.distancia_m, ultimo.tipo, ultimo.id])
+    return ProveedoresCercanosPage(items=items, next_cursor=next_cursor)
+
+
+@router.get(
+    "/tiles/{z}/{x}/{y}.{formato}",
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"content": {"application/vnd.mapbox-vector-tile": {}, "application/json": {}}},
+        304: {"description": "El cliente ya tiene esta versión del tile."},
+    },
+    description=(
+        "Tile z/x/y con las empresas verificadas y sus sucursales, como Mapbox Vector Tile (.mvt, "
+        "capa 'proveedores') o JSON compacto por columnas (.json). Hasta el zoom de clustering los "
+        "puntos se agrupan en el servidor (propiedad 'cantidad')."
+    )
+)
+async def get_tile_proveedores(
+    z: int,
+    x: int,
+    y: int,
+    formato: Literal["mvt", "json"],
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Sirve el tile desde el cache en memoria o lo genera en PostGIS.
+    """
+    if not (0 <= z <= TILES_MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Coordenadas de tile inválidas (zoom máximo {TILES_MAX_ZOOM})."
+        )
+
+    clusterizar = z <= TILES_CLUSTER_MAX_ZOOM
+    await tiles_cache.ensure_fresh(db)
+    payload = await tiles_cache.get_or_load(
+        f"{formato}:{z}/{x}/{y}",
+        lambda: generar_tile(db, z, x, y, formato, clusterizar, TILES_CLUSTER_GRID),
+    )
+    return cached_response(request, payload, TILES_HTTP_MAX_AGE_SECONDS, TILE_MEDIA_TYPES[formato])
@@ -1,13 +1,17 @@
 #autenticacion supabase
 # app/api/v1/routers/auth.py
+import asyncio
 import uuid
 from sqlalchemy import UUID, select
 from app.schemas.auth import SignInIn, SignUpIn, SignUpSuccess, TokenOut, RefreshTokenIn, EmailOnlyIn
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.api.v1.dependencies.auth_user import get_current_user  # dependencia que valida el JWT
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from app.api.v1.dependencies.auth_user import get_current_user, security  # dependencia que valida el JWT
+from fastapi.security import HTTPAuthorizationCredentials
+from app.supabase.token_cache import user_token_cache, hash_token  # cache de usuarios validados por token
+from app.supabase.role_cache import user_role_cache  # cache de roles por usuario
 from app.api.v1.dependencies.database_supabase import get_async_db  # dependencia que proporciona la sesión de DB
-from app.supabase.auth_service import supabase_auth  # cliente Supabase inicializado
-from typing import Any, Dict, Union
+from app.supabase.auth_service import get_async_auth, auth_call  # cliente asíncrono de Supabase Auth
+from typing import Any, Dict, Optional, Tuple, Union
 from app.schemas.user import UserProfileAndRolesOut
 from app.schemas.auth_user import SupabaseUser
 from app.utils.errores import handle_supabase_auth_error  # Importa la función para manejar errores de Supabase
@@ -19,21 +23,104 @@ from app.models.perfil import UserModel  # Importa tu modelo actualizado
 import logging
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import joinedload
+from app.core.config import (
+    SIGNUP_TRIGGER_DEADLINE_SECONDS,
+    SIGNUP_TRIGGER_INITIAL_DELAY_SECONDS,
+    SIGNUP_TRIGGER_MAX_DELAY_SECONDS,
+    REFRESH_SINGLE_FLIGHT_TTL_SECONDS,
+)
+from app.utils.single_flight import SingleFlight
+from app.utils.idempotency import ejecutar_idempotente, huella_request, idempotencia_habilitada
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# Refresh de sesión compartido entre llamadas concurrentes con el mismo refresh_token
+refresh_single_flight = SingleFlight(result_ttl_seconds=REFRESH_SINGLE_FLIGHT_TTL_SECONDS)
+
+
+async def esperar_perfil_y_rol(db: AsyncSession, user_id: uuid.UUID) -> Tuple[bool, bool]:
+    """
+    Espera a que el trigger de registro cree el perfil (users) y asigne el rol "Cliente".
+    Ambas condiciones se comprueban en una sola consulta. Si todavía no existen se reintenta
+    con backoff exponencial hasta SIGNUP_TRIGGER_DEADLINE_SECONDS, liberando la conexión
+    entre intentos.
+
+    return: (tiene_perfil, tiene_rol) según el último intento.
+    """
+    query = select(
+        select(UserModel.id).where(UserModel.id == user_id).exists().label("tiene_perfil"),
+        select(UsuarioRolModel.id_usuario)
+        .join(RolModel, RolModel.id == UsuarioRolModel.id_rol)
+        .where(UsuarioRolModel.id_usuario == user_id, RolModel.nombre == "Cliente")
+        .exists()
+        .label("tiene_rol"),
+    )
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SIGNUP_TRIGGER_DEADLINE_SECONDS
+    delay = SIGNUP_TRIGGER_INITIAL_DELAY_SECONDS
+    while True:
+        tiene_perfil, tiene_rol = (await db.execute(query)).one()
+        if (tiene_perfil and tiene_rol) or loop.time() + delay > deadline:
+            return bool(tiene_perfil), bool(tiene_rol)
+
+        # Terminar la transacción de lectura para devolver la conexión al pool mientras se espera
+        await db.rollback()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, SIGNUP_TRIGGER_MAX_DELAY_SECONDS)
+
+
 # --- Endpoints de autenticación ---
 
 @router.post(
     "/signup",
     response_model=Union[TokenOut, SignUpSuccess],
     status_code=status.HTTP_201_CREATED,
-    description="Crea un usuario en Supabase Auth. El perfil y rol se crean automáticamente via trigger."
+    description=(
+        "Crea un usuario en Supabase Auth. El perfil y rol se crean automáticamente via trigger. "
+        "Con el header Idempotency-Key los reintentos repiten la respuesta del primer registro "
+        "en lugar de volver a llamar a Supabase Auth; si ese registro abrió una sesión, el "
+        "reintento recibe el mensaje de registro exitoso (sin tokens) y debe iniciar sesión."
+    )
 )
-async def sign_up(data: SignUpIn, db: AsyncSession = Depends(get_async_db)) -> Union[TokenOut, SignUpSuccess]:
+async def sign_up(
+    data: SignUpIn,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: AsyncSession = Depends(get_async_db)
+) -> Union[TokenOut, SignUpSuccess]:
+    if not idempotency_key or not idempotencia_habilitada():
+        return await _registrar_usuario(data, db)
+    # Sin usuario todavía: el alcance de la key es el email, y la huella incluye la contraseña
+    # para que otra persona no reciba la respuesta de este registro.
+    return await ejecutar_idempotente(
+        f"signup:{data.email.lower()}", "auth.signup", idempotency_key,
+        huella_request(data.model_dump()),
+        lambda: _registrar_usuario(data, db),
+        status_code=status.HTTP_201_CREATED,
+        respuesta_guardada=lambda resultado: _respuesta_repetible(data, resultado),
+    )
+
+
+def _respuesta_repetible(data: SignUpIn, resultado: Union[TokenOut, SignUpSuccess]) -> SignUpSuccess:
+    """
+    Lo que se guarda para repetir un signup: nunca los tokens de la sesión (quedarían en claro
+    en la tabla y el refresh token puede haber rotado). Un reintento recibe el mensaje de
+    registro exitoso y obtiene su sesión iniciando sesión.
+    """
+    if isinstance(resultado, SignUpSuccess):
+        return resultado
+    return SignUpSuccess(
+        message="¡Registro exitoso! Inicia sesión para continuar.",
+        email=data.email,
+        nombre_persona=data.nombre_persona,
+        nombre_empresa=data.nombre_empresa,
+    )
+
+
+async def _registrar_usuario(data: SignUpIn, db: AsyncSession) -> Union[TokenOut, SignUpSuccess]:
     try:
         logger.info(f"Iniciando registro para usuario: {data.email}")
         
@@ -51,7 +138,7 @@ async def sign_up(data: SignUpIn, db: AsyncSession = Depends(get_async_db)) -> U
         }
         
         logger.info(f"Enviando datos a Supabase Auth: {signup_data}")
-        signup_response = supabase_auth.auth.sign_up(signup_data)
+        signup_response = await auth_call(get_async_auth().sign_up(signup_data))
 
         if not signup_response.user:
             handle_supabase_auth_error("Respuesta de Supabase incompleta (no hay user)")
@@ -60,101 +147,69 @@ async def sign_up(data: SignUpIn, db: AsyncSession = Depends(get_async_db)) -> U
         logger.info(f"Usuario creado en Supabase Auth con ID: {id_user}")
 
         # --- Paso 2: Verificar que el trigger funcionó correctamente ---
-        # Esperamos un momento para que el trigger se ejecute
-        import asyncio
-        await asyncio.sleep(2)  # Aumentamos el tiempo de espera
-
-        # Verificar que el perfil se creó con manejo de errores de conexión
+        # Se sondea con un backoff corto hasta que existan el perfil y el rol. El trigger corre
+        # en la misma transacción que crea el usuario, así que casi siempre basta el primer intento.
         try:
-            logger.info(f"Verificando si el perfil se creó para el usuario: {id_user}")
-            result = await db.execute(select(UserModel).filter(UserModel.id == id_user))
-            user_profile = result.scalars().first()
-
-            if not user_profile:
-                logger.error(f"El perfil no se creó para el usuario: {id_user}")
-                # Intentar crear el perfil manualmente como fallback
-                try:
-                    logger.info("Intentando crear perfil manualmente como fallback")
-                    new_profile = UserModel(
-                        id=id_user,
-                        nombre_persona=data.nombre_persona,
-                        nombre_empresa=data.nombre_empresa
-                    )
-                    db.add(new_profile)
-                    await db.commit()
-                    logger.info("Perfil creado manualmente exitosamente")
-                except SQLAlchemyError as e:
-                    logger.error(f"Error al crear perfil manualmente: {e}")
-                    await db.rollback()
-                    raise HTTPException(
-                        status_code=500, 
-                        detail=f"Error: El perfil del usuario no se creó automáticamente. Error del trigger: {str(e)}"
-                    )
+            logger.info(f"Verificando perfil y rol 'Cliente' para el usuario: {id_user}")
+            tiene_perfil, tiene_rol = await esperar_perfil_y_rol(db, uuid.UUID(id_user))
         except SQLAlchemyError as e:
-            logger.error(f"Error de base de datos al verificar perfil: {e}")
-            # Intentar recrear la conexión
+            logger.error(f"Error de base de datos al verificar perfil y rol: {e}")
+            raise HTTPException(
+                status_code=500, 
+                detail=f"Error de conexión a la base de datos: {str(e)}"
+            )
+
+        if not tiene_perfil:
+            logger.error(f"El perfil no se creó para el usuario: {id_user}")
+            # Intentar crear el perfil manualmente como fallback
             try:
-                await db.close()
-                # Aquí deberías obtener una nueva sesión, pero por ahora usamos fallback
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"Error de conexión a la base de datos: {str(e)}"
+                logger.info("Intentando crear perfil manualmente como fallback")
+                new_profile = UserModel(
+                    id=id_user,
+                    nombre_persona=data.nombre_persona,
+                    nombre_empresa=data.nombre_empresa
                 )
-            except Exception as reconnect_error:
-                logger.error(f"Error al intentar reconectar: {reconnect_error}")
+                db.add(new_profile)
+                await db.commit()
+                logger.info("Perfil creado manualmente exitosamente")
+            except SQLAlchemyError as e:
+                logger.error(f"Error al crear perfil manualmente: {e}")
+                await db.rollback()
                 raise HTTPException(
                     status_code=500, 
-                    detail="Error de conexión a la base de datos. Inténtalo de nuevo."
+                    detail=f"Error: El perfil del usuario no se creó automáticamente. Error del trigger: {str(e)}"
                 )
 
-        # Verificar que el rol "Cliente" se asignó con manejo de errores
-        try:
-            logger.info(f"Verificando si el rol 'Cliente' se asignó para el usuario: {id_user}")
-            result = await db.execute(
-                select(UsuarioRolModel)
-                .join(RolModel)
-                .filter(
-                    UsuarioRolModel.id_usuario == id_user,
-                    RolModel.nombre == "Cliente"
-                )
-            )
-            user_role = result.scalars().first()
-
-            if not user_role:
-                logger.error(f"El rol 'Cliente' no se asignó para el usuario: {id_user}")
-                # Intentar asignar el rol manualmente como fallback
-                try:
-                    logger.info("Intentando asignar rol manualmente como fallback")
-                    result = await db.execute(select(RolModel).filter(RolModel.nombre == "Cliente"))
-                    cliente_rol = result.scalars().first()
-                    
-                    if cliente_rol:
-                        new_user_role = UsuarioRolModel(
-                            id_usuario=id_user,
-                            id_rol=cliente_rol.id
-                        )
-                        db.add(new_user_role)
-                        await db.commit()
-                        logger.info("Rol asignado manualmente exitosamente")
-                    else:
-                        logger.error("Rol 'Cliente' no encontrado en la base de datos")
-                        raise HTTPException(
-                            status_code=500, 
-                            detail="Error: El rol 'Cliente' no existe en la base de datos"
-                        )
-                except SQLAlchemyError as e:
-                    logger.error(f"Error al asignar rol manualmente: {e}")
-                    await db.rollback()
+        if not tiene_rol:
+            logger.error(f"El rol 'Cliente' no se asignó para el usuario: {id_user}")
+            # Intentar asignar el rol manualmente como fallback
+            try:
+                logger.info("Intentando asignar rol manualmente como fallback")
+                result = await db.execute(select(RolModel).filter(RolModel.nombre == "Cliente"))
+                cliente_rol = result.scalars().first()
+                
+                if cliente_rol:
+                    new_user_role = UsuarioRolModel(
+                        id_usuario=id_user,
+                        id_rol=cliente_rol.id
+                    )
+                    db.add(new_user_role)
+                    await db.commit()
+                    user_role_cache.invalidate(id_user)
+                    logger.info("Rol asignado manualmente exitosamente")
+                else:
+                    logger.error("Rol 'Cliente' no encontrado en la base de datos")
                     raise HTTPException(
                         status_code=500, 
-                        detail=f"Error: El rol 'Cliente' no se asignó automáticamente. Error del trigger: {str(e)}"
+                        detail="Error: El rol 'Cliente' no existe en la base de datos"
                     )
-        except SQLAlchemyError as e:
-            logger.error(f"Error de base de datos al verificar rol: {e}")
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Error de conexión al verificar roles: {str(e)}"
-            )
+            except SQLAlchemyError as e:
+                logger.error(f"Error al asignar rol manualmente: {e}")
+                await db.rollback()
+                raise HTTPException(
+                    status_code=500, 
+                    detail=f"Error: El rol 'Cliente' no se asignó automáticamente. Error del trigger: {str(e)}"
+                )
 
         logger.info(f"Registro completado exitosamente para usuario: {id_user}")
 
@@ -173,6 +228,8 @@ async def sign_up(data: SignUpIn, db: AsyncSession = Depends(get_async_db)) -> U
             expires_in=signup_response.session.expires_in,
         )
 
+    except HTTPException:
+        raise
     except AuthApiError as e:
         logger.error(f"Error de Supabase Auth: {e}")
         handle_supabase_auth_error(e)
@@ -203,10 +260,10 @@ async def sign_in(data: SignInIn) -> TokenOut:
     #Supabase Auth utiliza el método sign_in para autenticar usuarios
     
     try:
-        signin_response = supabase_auth.auth.sign_in_with_password({
+        signin_response = await auth_call(get_async_auth().sign_in_with_password({
             "email": data.email,
             "password": data.password
-        })
+        }))
 
         if signin_response.user is None or not signin_response.session:
            handle_supabase_auth_error("Supabase response incomplete")
@@ -217,6 +274,8 @@ async def sign_in(data: SignInIn) -> TokenOut:
             expires_in=signin_response.session.expires_in,
         )
 
+    except HTTPException:
+        raise
     except AuthApiError as e:
         # Llama a la función centralizada que usa el diccionario
         handle_supabase_auth_error(e)
@@ -241,12 +300,12 @@ async def sign_in(data: SignInIn) -> TokenOut:
 async def refresh_token(data: RefreshTokenIn) -> TokenOut:
     """
     Refresca el JWT usando el refresh_token.
+    Las llamadas concurrentes con el mismo refresh_token (varias pestañas de una misma sesión)
+    comparten un único refresh contra Supabase y reciben los mismos tokens nuevos.
     """
-    try:
+    async def _refrescar() -> TokenOut:
         # Intenta refrescar la sesión usando el refresh_token proporcionado
-        refresh_response = supabase_auth.auth.refresh_session({
-            "refresh_token": data.refresh_token
-        })
+        refresh_response = await auth_call(get_async_auth().refresh_session(data.refresh_token))
 
         # Supabase Auth lanza AuthApiError si el refresh_token es inválido o expiró.
         # Sin embargo, si la respuesta es exitosa pero la sesión está ausente,
@@ -262,6 +321,11 @@ async def refresh_token(data: RefreshTokenIn) -> TokenOut:
             refresh_token=refresh_response.session.refresh_token,
             expires_in=refresh_response.session.expires_in,
         )
+
+    try:
+        return await refresh_single_flight.do(hash_token(data.refresh_token), _refrescar)
+    except HTTPException:
+        raise
     except AuthApiError as e:
         # Captura errores específicos de la API de autenticación de Supabase.
         # Esto incluirá casos como un refresh_token inválido o expirado.
@@ -289,13 +353,15 @@ async def resend_confirmation_email(data: EmailOnlyIn):
     Re-envia un correo de confirmacion de email para verificar la cuenta del usuario.
     """
     try:
-        supabase_auth.auth.resend({
+        await auth_call(get_async_auth().resend({
             "type": "signup",
             "email": data.email
-        })
+        }))
         
         return {"message": f"Se ha enviado un nuevo correo de confirmacion a {data.email}. Por favor, revisa tu bandeja de entrada."}
 
+    except HTTPException:
+        raise
     except AuthApiError as e:
         handle_supabase_auth_error(e)
     except Exception as e:
@@ -306,7 +372,8 @@ async def resend_confirmation_email(data: EmailOnlyIn):
 
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
-async def logout(current_user: SupabaseUser = Depends(get_current_user)):
+async def logout(current_user: SupabaseUser = Depends(get_current_user),
+                 credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Revoca el refresh token del usuario (deslogueo) y termina su sesión activa.
     """
@@ -315,11 +382,18 @@ async def logout(current_user: SupabaseUser = Depends(get_current_user)):
         # Supabase suele manejar esto invalidando el refresh token.
         # El resultado de sign_out es a menudo None si es exitoso y no hay errores.
         # supabase_auth.sign_out()
-        supabase_auth.auth.sign_out()
+        # Se revoca la sesión a la que pertenece este access token (el cliente es compartido
+        # entre requests, por eso no se usa auth.sign_out(), que actúa sobre su sesión interna)
+        await auth_call(get_async_auth().admin.sign_out(credentials.credentials, "local"))
+
+        # El access token deja de aceptarse en este proceso aunque aún no haya expirado
+        user_token_cache.invalidate(credentials.credentials)
 
         # Si la operación fue exitosa y no lanzó una excepción,
         # simplemente devuelve None para un 204 No Content.
         return None
+    except HTTPException:
+        raise
     except AuthApiError as e:
         # Captura errores específicos de la API de Supabase Auth durante el deslogueo.
         # Esto podría incluir problemas si el token ya no es válido,
@@ -343,10 +417,12 @@ async def forgot_password(data: EmailOnlyIn):
         # Supabase típicamente responde con éxito si la solicitud es válida,
             # incluso si el email no existe, para evitar enumeración de usuarios.
             # El método `reset_password_for_email` es el correcto.
-        response = supabase_auth.auth.reset_password_for_email(data.email)
+        await auth_call(get_async_auth().reset_password_for_email(data.email))
         
         # Si no hay error, significa que el correo se envió correctamente
         return {"message": "Te enviamos un correo para restablecer tu contraseña."}
+    except HTTPException:
+        raise
     except Exception as e:
         # Captura cualquier otra excepción inesperada.
         raise HTTPException(
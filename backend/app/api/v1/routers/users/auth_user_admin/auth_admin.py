@@ -1,34 +1,158 @@
 # app/api/v1/routers/admin.py
 
 import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import joinedload
-from typing import List, Optional
+from typing import List, Literal, Optional
 from app.api.v1.dependencies.database_supabase import get_async_db
 from app.models.empresa.verificacion_solicitud import VerificacionSolicitud
 from app.models.empresa.perfil_empresa import PerfilEmpresa
 from app.models.empresa.documento import Documento
-from app.schemas.empresa.solicitudverificacion import VerificacionSolicitudOut
+from app.schemas.empresa.verificacion_solicitud import (
+    VerificacionSolicitudOut, SolicitudesVerificacionPage, DecisionMasivaIn, DecisionMasivaOut,
+)
+from app.schemas.empresa.documento import RevisionDocumentosIn, RevisionDocumentosOut
 from app.api.v1.dependencies.auth_user import get_admin_user  # <-- Nueva dependencia de seguridad
+from app.core.config import (
+    ADMIN_QUEUE_DEFAULT_LIMIT, ADMIN_QUEUE_MAX_LIMIT, ADMIN_QUEUE_EXACT_COUNT_LIMIT,
+)
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.verificaciones import (
+    listar_solicitudes, contar_solicitudes, decidir_solicitudes, revisar_documentos, DECISIONES,
+)
 
 router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(get_admin_user)])
 
 
+def _a_utc(valor: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    # Las fechas sin zona horaria se interpretan en UTC
+    if valor is not None and valor.tzinfo is None:
+        return valor.replace(tzinfo=datetime.timezone.utc)
+    return valor
+
+
+async def _pagina_solicitudes(
+    db: AsyncSession,
+    estado: Optional[str],
+    desde: Optional[datetime.datetime],
+    hasta: Optional[datetime.datetime],
+    empresa: Optional[str],
+    limit: int,
+    cursor: Optional[str],
+) -> SolicitudesVerificacionPage:
+    desde, hasta = _a_utc(desde), _a_utc(hasta)
+    after = None
+    if cursor:
+        fecha, id_verificacion = decode_cursor(cursor, 2)
+        try:
+            after = (datetime.datetime.fromisoformat(fecha), int(id_verificacion))
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El cursor de paginación no es válido."
+            )
+
+    # Se pide una fila de más para saber si hay página siguiente
+    rows = await listar_solicitudes(db, limit + 1, estado, desde, hasta, empresa, after)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last["fecha_solicitud"].isoformat(), last["id_verificacion"]])
+
+    total, total_estimado = None, False
+    if cursor is None:
+        total, total_estimado = await contar_solicitudes(
+            db, ADMIN_QUEUE_EXACT_COUNT_LIMIT, estado, desde, hasta, empresa
+        )
+
+    return SolicitudesVerificacionPage(
+        items=rows, next_cursor=next_cursor, total=total, total_estimado=total_estimado
+    )
+
+
+@router.get(
+    "/verificaciones",
+    response_model=SolicitudesVerificacionPage,
+    description=(
+        "Cola de solicitudes de verificación paginada por cursor (de la más antigua a la más "
+        "nueva), filtrable por estado, rango de fechas de solicitud y nombre de empresa."
+    )
+)
+async def get_solicitudes(
+    estado: Optional[Literal["pendiente", "aprobada", "rechazada"]] = Query("pendiente"),
+    desde: Optional[datetime.datetime] = Query(None, description="Fecha de solicitud desde (inclusive)"),
+    hasta: Optional[datetime.datetime] = Query(None, description="Fecha de solicitud hasta (exclusive)"),
+    empresa: Optional[str] = Query(None, min_length=2, max_length=80, description="Nombre de fantasía o razón social"),
+    limit: int = Query(ADMIN_QUEUE_DEFAULT_LIMIT, ge=1, le=ADMIN_QUEUE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await _pagina_solicitudes(db, estado, desde, hasta, empresa, limit, cursor)
+
+
 @router.get(
     "/verificaciones/pendientes",
-    response_model=List[VerificacionSolicitudOut],
-    description="Obtiene todas las solicitudes de verificación pendientes."
+    response_model=SolicitudesVerificacionPage,
+    description="Obtiene las solicitudes de verificación pendientes, paginadas por cursor."
+)
+async def get_solicitudes_pendientes(
+    desde: Optional[datetime.datetime] = Query(None),
+    hasta: Optional[datetime.datetime] = Query(None),
+    empresa: Optional[str] = Query(None, min_length=2, max_length=80),
+    limit: int = Query(ADMIN_QUEUE_DEFAULT_LIMIT, ge=1, le=ADMIN_QUEUE_MAX_LIMIT),
+    cursor: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await _pagina_solicitudes(db, "pendiente", desde, hasta, empresa, limit, cursor)
+
+
+@router.post(
+    "/verificaciones/decisiones",
+    response_model=DecisionMasivaOut,
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Aprueba o rechaza varias solicitudes en una sola transacción (un único statement). "
+        "Cada solicitud puede llevar su comentario o usar el comentario común. Devuelve el "
+        "resultado de cada una: las que no existen o ya estaban resueltas no se modifican."
+    )
 )
-async def get_solicitudes_pendientes(db: AsyncSession = Depends(get_async_db)):
+async def decidir_solicitudes_masivo(data: DecisionMasivaIn, db: AsyncSession = Depends(get_async_db)):
+    # Una decisión por id: si se repite, vale la primera aparición
+    decisiones = {}
+    for item in data.solicitudes:
+        if item.id_verificacion not in decisiones:
+            decisiones[item.id_verificacion] = item.comentario if item.comentario is not None else data.comentario
 
-    query = select(VerificacionSolicitud).where(VerificacionSolicitud.estado == "pendiente")
-    result = await db.execute(query)
-    solicitudes = result.scalars().all()
+    try:
+        filas = await decidir_solicitudes(db, data.decision, list(decisiones.items()))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
 
-    return list(solicitudes)
+    estado_final = DECISIONES[data.decision]["solicitud"]
+    resultados = [
+        {
+            "id_verificacion": fila["id_verificacion"],
+            "resultado": (
+                estado_final if fila["actualizada"]
+                else "no_encontrada" if fila["estado_anterior"] is None
+                else "ya_resuelta"
+            ),
+            "estado_anterior": fila["estado_anterior"],
+            "documentos": fila["documentos"],
+        }
+        for fila in filas
+    ]
+    return DecisionMasivaOut(
+        procesadas=len(resultados),
+        actualizadas=sum(1 for fila in filas if fila["actualizada"]),
+        resultados=resultados,
+    )
 
     
 @router.get(
@@ -43,7 +167,7 @@ async def get_detalle_solicitud(solicitud_id: int, db: AsyncSession = Depends(ge
     #joinedload para cargar el perfil y los documentos
     result = await db.execute(query.options(joinedload(VerificacionSolicitud.perfil_empresa), 
                                             joinedload(VerificacionSolicitud.documento)))
-    solicitud = result.scalars().first()
+    solicitud = result.unique().scalars().first()
 
     if not solicitud:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada.")
@@ -52,35 +176,37 @@ async def get_detalle_solicitud(solicitud_id: int, db: AsyncSession = Depends(ge
 class AdministradorDecision(BaseModel):
     comentario: Optional[str] = None
 
+async def _decidir_solicitud(db: AsyncSession, solicitud_id: int, decision: str, comentario: Optional[str]):
+    """
+    Aplica la decisión con un único statement (solicitud -> perfil de empresa -> documentos).
+    """
+    # La sesión puede venir con una transacción abierta (consulta de roles en get_admin_user)
+    try:
+        resultado = (await decidir_solicitudes(db, decision, [(solicitud_id, comentario)]))[0]
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    if resultado["estado_anterior"] is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada.")
+    if not resultado["actualizada"]:
+        # 'pendiente' en la foto del statement: otra decisión concurrente la resolvió primero
+        estado = resultado["estado_anterior"]
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La solicitud fue resuelta por otra decisión simultánea." if estado == "pendiente"
+            else f"La solicitud ya fue resuelta (estado: {estado})."
+        )
+
+
 @router.post(
     "/verificaciones/{solicitud_id}/aprobar",
     status_code=status.HTTP_200_OK,
     description="Aprobar una solicitud de verificación y actualizar el estado de la empresa."
 )
 async def aprobar_solicitud(solicitud_id: int, decision: AdministradorDecision, db: AsyncSession = Depends(get_async_db)):
-    async with db.begin():
-
-        solicitud = await db.execute(select(VerificacionSolicitud).where(
-                                    VerificacionSolicitud.id_verificacion == solicitud_id))
-        solicitud = solicitud.scalars().first()
-
-        if not solicitud:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada.")
-
-        solicitud.estado = "aprobada"
-        solicitud.fecha_revision = datetime.utcnow()
-        solicitud.comentario = decision.comentario
-        db.add(solicitud)
-
-        perfil_empresa = await db.execute(select(PerfilEmpresa).where(PerfilEmpresa.id_empresa == solicitud.id_empresa))
-        perfil_empresa = perfil_empresa.scalars().first()
-
-        if not perfil_empresa:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil de empresa no encontrado.")
-
-        perfil_empresa.estado = "True" #"verificado"
-        db.add(perfil_empresa)
-
+    await _decidir_solicitud(db, solicitud_id, "aprobar", decision.comentario)
     return {"message": "Solicitud aprobada y perfil verificado."}
 
 
@@ -90,29 +216,56 @@ async def aprobar_solicitud(solicitud_id: int, decision: AdministradorDecision,
     description="Rechazar una solicitud de verificación y actualizar el estado de la empresa."
 )
 async def rechazar_solicitud(solicitud_id: int, decision: AdministradorDecision, db: AsyncSession = Depends(get_async_db)):
-    async with db.begin():
-
-        solicitud = await db.execute(select(VerificacionSolicitud).where(
-                                    VerificacionSolicitud.id_verificacion == solicitud_id))
-        solicitud = solicitud.scalars().first()
-
-        if not solicitud:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada.")
+    await _decidir_solicitud(db, solicitud_id, "rechazar", decision.comentario)
+    return {"message": "Solicitud rechazada."}
 
-        solicitud.estado = "rechazada"
-        solicitud.fecha_revision = datetime.utcnow()
-        solicitud.comentario = decision.comentario
-        db.add(solicitud)
 
-        '''
-        perfil_empresa = await db.execute(select(PerfilEmpresa).where(PerfilEmpresa.id_empresa == solicitud.id_empresa))
-        perfil_empresa = perfil_empresa.scalars().first()
-
-        if not perfil_empresa:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil de empresa no encontrado.")
+@router.patch(
+    "/verificaciones/{solicitud_id}/documentos",
+    response_model=RevisionDocumentosOut,
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Registra la revisión (estado y observación) de varios documentos de una solicitud "
+        "pendiente con un único statement, y deriva de ellos el estado de la solicitud: si "
+        "todos quedan aprobados se aprueba (y se verifica el perfil), si ninguno queda pendiente "
+        "y alguno fue rechazado se rechaza."
+    )
+)
+async def revisar_documentos_solicitud(
+    solicitud_id: int, data: RevisionDocumentosIn, db: AsyncSession = Depends(get_async_db)
+):
+    # Una revisión por documento: si se repite, vale la primera aparición
+    revisiones = {}
+    for doc in data.documentos:
+        revisiones.setdefault(doc.id_documento, (doc.id_documento, doc.estado_revision, doc.observacion))
 
-        perfil_empresa.estado = "rechazado"
-        db.add(perfil_empresa)
-        '''
+    try:
+        resultado = await revisar_documentos(db, solicitud_id, list(revisiones.values()))
+        if resultado is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Solicitud no encontrada.")
+        if resultado["estado_anterior"] != "pendiente":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"La solicitud ya fue resuelta (estado: {resultado['estado_anterior']})."
+            )
+        if resultado["no_actualizados"]:
+            # Todo o nada: se descarta la revisión completa
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Documentos inexistentes o de otra solicitud: {list(resultado['no_actualizados'])}."
+            )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
 
-    return {"message": "Solicitud rechazada."}
\ No newline at end of file
+    return RevisionDocumentosOut(
+        id_verificacion=solicitud_id,
+        estado_anterior=resultado["estado_anterior"],
+        estado_solicitud=resultado["estado_solicitud"],
+        documentos_actualizados=resultado["documentos_actualizados"],
+        total=resultado["total"],
+        aprobados=resultado["aprobados"],
+        rechazados=resultado["rechazados"],
+        pendientes=resultado["pendientes"],
+    )
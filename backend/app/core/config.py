@@ -11,9 +11,56 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SERVICE_ROLE")
 
+# Verificación de los access tokens (JWT) de Supabase
+# "local": se valida firma, expiración y audiencia en el proceso (sin llamar a GoTrue)
+# "remote": se consulta a GoTrue (auth.get_user) en cada request
+AUTH_JWT_VERIFICATION = os.getenv("AUTH_JWT_VERIFICATION", "local")
+# Secreto compartido (proyectos con firma HS256). Si no se define, solo se usan las claves del JWKS
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+# Cada cuántos segundos se refresca en segundo plano el conjunto de claves de firma (JWKS)
+SUPABASE_JWKS_REFRESH_SECONDS = int(os.getenv("SUPABASE_JWKS_REFRESH_SECONDS", "600"))
+# Cache en memoria de usuarios ya validados, indexado por hash del token
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+# Vida máxima de una entrada; nunca supera el "exp" del token
+AUTH_USER_CACHE_TTL_SECONDS = int(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "300"))
+# Claim del access token con los roles del usuario (lo agrega el hook custom_access_token)
+AUTH_ROLES_CLAIM = os.getenv("AUTH_ROLES_CLAIM", "user_roles")
+# Vida de los roles cacheados por usuario cuando el token no trae el claim
+ROLE_CACHE_TTL_SECONDS = int(os.getenv("ROLE_CACHE_TTL_SECONDS", "60"))
+ROLE_CACHE_SIZE = int(os.getenv("ROLE_CACHE_SIZE", "5000"))
+# Cliente HTTP asíncrono de Supabase Auth (un único pool keep-alive por proceso)
+AUTH_HTTP_TIMEOUT_SECONDS = float(os.getenv("AUTH_HTTP_TIMEOUT_SECONDS", "10"))
+AUTH_HTTP_MAX_CONNECTIONS = int(os.getenv("AUTH_HTTP_MAX_CONNECTIONS", "20"))
+AUTH_HTTP_MAX_KEEPALIVE = int(os.getenv("AUTH_HTTP_MAX_KEEPALIVE", "10"))
+# Espera máxima (y backoff) para que el trigger de registro cree el perfil y el rol
+SIGNUP_TRIGGER_DEADLINE_SECONDS = float(os.getenv("SIGNUP_TRIGGER_DEADLINE_SECONDS", "3"))
+SIGNUP_TRIGGER_INITIAL_DELAY_SECONDS = float(os.getenv("SIGNUP_TRIGGER_INITIAL_DELAY_SECONDS", "0.02"))
+SIGNUP_TRIGGER_MAX_DELAY_SECONDS = float(os.getenv("SIGNUP_TRIGGER_MAX_DELAY_SECONDS", "0.5"))
+# Segundos durante los que se reutiliza el resultado de un refresh para el mismo refresh_token
+REFRESH_SINGLE_FLIGHT_TTL_SECONDS = float(os.getenv("REFRESH_SINGLE_FLIGHT_TTL_SECONDS", "10"))
+
 #PostgreSQL Supabase
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Perfil del engine asíncrono según la topología de despliegue:
+# "transaction-pooler": Supabase Transaction Pooler (PgBouncer/Supavisor, puerto 6543), sin
+#                       prepared statements con nombre reutilizables
+# "direct": conexión directa a Postgres (o Session Pooler), con cache de prepared statements
+DB_ENGINE_PROFILE = os.getenv("DB_ENGINE_PROFILE", "transaction-pooler")
+# Workers de uvicorn que comparten el presupuesto de conexiones
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Presupuesto total de conexiones para todos los workers (se reparte entre ellos)
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "15"))
+# Ajustes explícitos del pool; si no se definen se usan los valores por defecto del perfil
+DB_POOL_SIZE = os.getenv("DB_POOL_SIZE")
+DB_MAX_OVERFLOW = os.getenv("DB_MAX_OVERFLOW")
+DB_POOL_RECYCLE = os.getenv("DB_POOL_RECYCLE")
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING")
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "20"))
+# Con el Transaction Pooler se puede delegar todo el pooling a PgBouncer (NullPool)
+DB_USE_NULLPOOL = os.getenv("DB_USE_NULLPOOL", "false").lower() in ("1", "true", "yes")
+
 #PostgreSQL Local
 DATABASE_URL_LOCAL = os.getenv("DATABASE_URL_LOCAL")
 
@@ -32,6 +79,90 @@ AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 print(f"la clave secreta es :{AWS_SECRET_ACCESS_KEY}")
 IDRIVE_BUCKET_NAME = os.getenv("IDRIVE_BUCKET_NAME")
+# Subidas simultáneas a iDrive por proceso (cada una corre en un hilo, fuera del event loop)
+IDRIVE_UPLOAD_CONCURRENCY = int(os.getenv("IDRIVE_UPLOAD_CONCURRENCY", "4"))
+# Región y estilo de direccionamiento del bucket ("auto", "path" o "virtual"). Para probar
+# contra un S3 local (MinIO, LocalStack) usar IDRIVE_ENDPOINT_URL=http://localhost:9000 y "path"
+IDRIVE_REGION = os.getenv("IDRIVE_REGION")
+IDRIVE_ADDRESSING_STYLE = os.getenv("IDRIVE_ADDRESSING_STYLE", "auto")
+# Vigencia de las URLs firmadas para subir documentos directo al bucket
+IDRIVE_PRESIGN_EXPIRES_SECONDS = int(os.getenv("IDRIVE_PRESIGN_EXPIRES_SECONDS", "900"))
+# Máximo de documentos por request al firmar URLs y al finalizar una solicitud
+IDRIVE_MAX_DOCUMENTS_PER_REQUEST = int(os.getenv("IDRIVE_MAX_DOCUMENTS_PER_REQUEST", "20"))
+# Tamaño máximo por documento y content types aceptados
+IDRIVE_MAX_FILE_SIZE_BYTES = int(os.getenv("IDRIVE_MAX_FILE_SIZE_BYTES", str(20 * 1024 * 1024)))
+# Subida por streaming (S3 multipart): tamaño de cada parte (mínimo 5 MiB) y partes en
+# paralelo por archivo. Memoria por subida ~ parte * (concurrencia + 1)
+IDRIVE_MULTIPART_PART_SIZE_BYTES = int(os.getenv("IDRIVE_MULTIPART_PART_SIZE_BYTES", str(5 * 1024 * 1024)))
+IDRIVE_MULTIPART_CONCURRENCY = int(os.getenv("IDRIVE_MULTIPART_CONCURRENCY", "2"))
+IDRIVE_ALLOWED_CONTENT_TYPES = [
+    t.strip() for t in os.getenv("IDRIVE_ALLOWED_CONTENT_TYPES", "application/pdf,image/jpeg,image/png").split(",")
+    if t.strip()
+]
+
+
+# Recursos que se crean al arrancar (separados por coma: db, auth, idrive).
+# El resto se crea de forma perezosa en su primer uso.
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "db,auth")
+# Conexiones que se abren en paralelo durante el warm-up (0 = el tamaño del pool)
+DB_WARMUP_CONNECTIONS = int(os.getenv("DB_WARMUP_CONNECTIONS", "0"))
+# Espera máxima de cada intento de warm-up; si falla se reintenta con backoff
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+
+# Cache de datos de referencia (departamentos, ciudades, barrios)
+# Cada cuántos segundos se consulta la versión de los datos en la tabla cache_version
+REFERENCE_CACHE_CHECK_SECONDS = float(os.getenv("REFERENCE_CACHE_CHECK_SECONDS", "30"))
+# Vida máxima de una entrada aunque la versión no cambie (por si falta la tabla cache_version)
+REFERENCE_CACHE_MAX_AGE_SECONDS = float(os.getenv("REFERENCE_CACHE_MAX_AGE_SECONDS", "3600"))
+# max-age del header Cache-Control; después el navegador revalida con If-None-Match
+REFERENCE_HTTP_MAX_AGE_SECONDS = int(os.getenv("REFERENCE_HTTP_MAX_AGE_SECONDS", "60"))
+
+# Geocodificación inversa (punto -> barrio)
+# R-tree en proceso sobre polígonos simplificados para el camino rápido (requiere shapely>=2);
+# los puntos cercanos a un límite, o si está desactivado, se resuelven en PostGIS
+GEOCODING_RTREE = os.getenv("GEOCODING_RTREE", "false").lower() in ("1", "true", "yes")
+# Tolerancia de simplificación de los polígonos, en grados (0.0001 ~ 11 m)
+GEOCODING_RTREE_TOLERANCE = float(os.getenv("GEOCODING_RTREE_TOLERANCE", "0.0001"))
+# Cantidad máxima de puntos por request en el modo batch
+GEOCODING_BATCH_MAX_POINTS = int(os.getenv("GEOCODING_BATCH_MAX_POINTS", "5000"))
+
+# Búsqueda de proveedores cercanos
+PROVIDERS_NEARBY_DEFAULT_RADIUS_M = float(os.getenv("PROVIDERS_NEARBY_DEFAULT_RADIUS_M", "5000"))
+PROVIDERS_NEARBY_MAX_RADIUS_M = float(os.getenv("PROVIDERS_NEARBY_MAX_RADIUS_M", "50000"))
+
+# Tiles del mapa de proveedores
+TILES_MAX_ZOOM = int(os.getenv("TILES_MAX_ZOOM", "20"))
+# Hasta este zoom (inclusive) los puntos se agrupan en clusters en el servidor
+TILES_CLUSTER_MAX_ZOOM = int(os.getenv("TILES_CLUSTER_MAX_ZOOM", "12"))
+# Celdas de la grilla de clustering por lado de tile
+TILES_CLUSTER_GRID = int(os.getenv("TILES_CLUSTER_GRID", "32"))
+# Tiles generados que se guardan en memoria (LRU); se descartan al cambiar 'proveedores_geo'
+TILES_CACHE_SIZE = int(os.getenv("TILES_CACHE_SIZE", "2000"))
+TILES_HTTP_MAX_AGE_SECONDS = int(os.getenv("TILES_HTTP_MAX_AGE_SECONDS", "60"))
+
+# Idempotency-Key en POST costosos (signup, solicitud de verificación)
+# Tiempo durante el que se conserva (y se repite) la respuesta de una key
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# Cuánto espera un duplicado a que termine el request en curso antes de responder 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+# Un request en curso más viejo que esto se considera abandonado y otro puede retomarlo
+IDEMPOTENCY_LOCK_TIMEOUT_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", "300"))
+# Clave del HMAC con el que se resume el cuerpo del request (el de signup incluye la contraseña).
+# Sin ninguna de las dos variables se ignora el header Idempotency-Key
+IDEMPOTENCY_FINGERPRINT_SECRET = os.getenv("IDEMPOTENCY_FINGERPRINT_SECRET") or SUPABASE_JWT_SECRET
+# Cada worker borra las keys vencidas al reservar una, como máximo una vez por intervalo y en lotes
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "300"))
+IDEMPOTENCY_PURGE_BATCH = int(os.getenv("IDEMPOTENCY_PURGE_BATCH", "1000"))
+
+# Cola de solicitudes de verificación (panel de administración)
+ADMIN_QUEUE_DEFAULT_LIMIT = int(os.getenv("ADMIN_QUEUE_DEFAULT_LIMIT", "50"))
+ADMIN_QUEUE_MAX_LIMIT = int(os.getenv("ADMIN_QUEUE_MAX_LIMIT", "200"))
+# Hasta esta cantidad el total se cuenta exacto; por encima se usa la estimación del planificador
+ADMIN_QUEUE_EXACT_COUNT_LIMIT = int(os.getenv("ADMIN_QUEUE_EXACT_COUNT_LIMIT", "1000"))
+# Máximo de solicitudes por request en la aprobación/rechazo masivo
+ADMIN_BULK_DECISION_MAX = int(os.getenv("ADMIN_BULK_DECISION_MAX", "1000"))
+# Máximo de documentos por request en la revisión de documentos de una solicitud
+ADMIN_DOCUMENT_REVIEW_MAX = int(os.getenv("ADMIN_DOCUMENT_REVIEW_MAX", "100"))
 
 
 #Weaviate
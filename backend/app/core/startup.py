@@ -0,0 +1,166 @@
+# app/core/startup.py
+# Medición del arranque y calentamiento explícito de los recursos perezosos
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from app.core.config import STARTUP_WARMUP, DB_WARMUP_CONNECTIONS, WARMUP_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """
+    Registra cuánto tarda cada paso del arranque (imports de módulos y creación de
+    engines/clientes) para poder reportarlo al terminar el lifespan de inicio.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.timings: List[Dict[str, object]] = []
+
+    @contextmanager
+    def track(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append({
+                "nombre": name,
+                "ms": round((time.perf_counter() - start) * 1000, 1),
+            })
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "total_ms": round((time.perf_counter() - self.started_at) * 1000, 1),
+            "pasos": sorted(self.timings, key=lambda t: t["ms"], reverse=True),
+        }
+
+    def log_report(self) -> None:
+        report = self.report()
+        lines = [f"  {t['ms']:>8} ms  {t['nombre']}" for t in report["pasos"]]
+        logger.info(
+            f"⏱️ Arranque completado en {report['total_ms']} ms:\n" + "\n".join(lines)
+        )
+
+
+startup_timer = StartupTimer()
+
+
+class Readiness:
+    """
+    Estado de preparación de la instancia: solo está lista cuando terminó el warm-up.
+    Lo consulta /health/ready para que la plataforma no envíe tráfico a una instancia fría.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.intentos = 0
+        self.error: Optional[str] = None
+
+
+readiness = Readiness()
+
+
+def _recursos_warm_up() -> set:
+    return {r.strip() for r in STARTUP_WARMUP.split(",") if r.strip()}
+
+
+def warm_up() -> None:
+    """
+    Crea por adelantado los recursos listados en STARTUP_WARMUP ("db", "auth", "idrive"),
+    para que la primera request no pague su construcción. Los que no se listen se crean
+    recién cuando se usen.
+    """
+    recursos = _recursos_warm_up()
+
+    if "db" in recursos:
+        from app.supabase.db.db_supabase import get_async_sessionmaker
+        get_async_sessionmaker()
+    if "auth" in recursos:
+        from app.supabase.auth_service import get_async_auth
+        get_async_auth()
+    if "idrive" in recursos:
+        from app.idrive.idrive_service import get_idrive_client
+        get_idrive_client()
+
+
+async def _abrir_conexiones() -> int:
+    """
+    Abre en paralelo N conexiones del pool (TCP + TLS + handshake de asyncpg), ejecuta un
+    ping en cada una y las devuelve al pool, que queda con N conexiones listas.
+    """
+    from sqlalchemy import text
+    from app.supabase.db.db_supabase import get_async_engine, async_engine_options
+
+    engine = get_async_engine()
+    # Mismas opciones con las que se creó el engine; sin pool_size es NullPool (sin límite)
+    opciones = async_engine_options()
+    pool_size = opciones.get("pool_size")
+    max_overflow = opciones.get("max_overflow", 0)
+    n = DB_WARMUP_CONNECTIONS or pool_size or 1
+
+    # Nunca pedir más conexiones de las que el pool entrega a la vez (pool_size + max_overflow):
+    # las que sobran esperarían una conexión que recién se devuelve al final y el warm-up vencería
+    # por timeout en cada reintento. Un max_overflow negativo es ilimitado.
+    if pool_size is not None and max_overflow >= 0 and n > pool_size + max_overflow:
+        logger.warning(
+            f"⚠️ DB_WARMUP_CONNECTIONS={n} supera la capacidad del pool "
+            f"({pool_size} + {max_overflow} de overflow); se abren {pool_size + max_overflow}"
+        )
+        n = pool_size + max_overflow
+
+    results = await asyncio.gather(*[engine.connect() for _ in range(n)], return_exceptions=True)
+    conexiones = [c for c in results if not isinstance(c, BaseException)]
+    try:
+        await asyncio.gather(*[c.execute(text("SELECT 1")) for c in conexiones])
+    finally:
+        await asyncio.gather(*[c.close() for c in conexiones], return_exceptions=True)
+
+    errores = [e for e in results if isinstance(e, BaseException)]
+    if errores:
+        raise errores[0]
+    return n
+
+
+async def _warm_up_async() -> None:
+    if "db" not in _recursos_warm_up():
+        return
+
+    with startup_timer.track("conexiones a la base (paralelo)"):
+        n = await _abrir_conexiones()
+    logger.info(f"🔌 Warm-up: {n} conexión(es) abiertas en el pool")
+
+    from app.supabase.db.db_supabase import get_async_sessionmaker
+    from app.api.v1.routers.locations.locations import precargar_datos_referencia
+
+    with startup_timer.track("precarga de datos de referencia (locations)"):
+        async with get_async_sessionmaker()() as session:
+            await precargar_datos_referencia(session)
+
+
+async def run_warm_up() -> None:
+    """
+    Ejecuta el warm-up completo y marca la instancia como lista. Si falla (por ejemplo, la
+    base todavía no responde) se reintenta con backoff; mientras tanto /health/ready da 503.
+    """
+    delay = 1.0
+    while True:
+        readiness.intentos += 1
+        try:
+            with startup_timer.track(f"warm-up (intento {readiness.intentos})"):
+                warm_up()
+                await asyncio.wait_for(_warm_up_async(), timeout=WARMUP_TIMEOUT_SECONDS)
+            readiness.ready = True
+            readiness.error = None
+            startup_timer.log_report()
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            readiness.error = f"{type(e).__name__}: {e}"
+            logger.warning(f"⚠️ Warm-up fallido (intento {readiness.intentos}), reintentando en {delay}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
@@ -1,10 +1,22 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.orm.session import engine
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
 from app.core.config import DATABASE_URL_LOCAL
+from app.core.startup import startup_timer
+
+# Engine de la base local: se crea en el primer uso, no al importar el módulo
+_engine = None
+_session_local = None
+
+
+def get_local_engine():
+    get_local_sessionmaker()
+    return _engine
 
-engine = create_async_engine(DATABASE_URL_LOCAL, echo=True)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    
\ No newline at end of file
+def get_local_sessionmaker() -> sessionmaker:
+    global _engine, _session_local
+    if _session_local is None:
+        with startup_timer.track("engine local (DATABASE_URL_LOCAL)"):
+            _engine = create_async_engine(DATABASE_URL_LOCAL, echo=True)
+            _session_local = sessionmaker(_engine, class_=AsyncSession, autocommit=False, autoflush=False)
+    return _session_local
@@ -1,11 +1,29 @@
 import boto3
-from app.core.config import IDRIVE_ENDPOINT_URL, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, IDRIVE_BUCKET_NAME
+from botocore.config import Config
+from app.core.config import (
+    IDRIVE_ENDPOINT_URL, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, IDRIVE_BUCKET_NAME,
+    IDRIVE_REGION, IDRIVE_ADDRESSING_STYLE,
+)
+from app.core.startup import startup_timer
 
-idrive_s3_client = boto3.client(
-        's3',
-        endpoint_url=IDRIVE_ENDPOINT_URL,
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-    )
+# El cliente de boto3 se crea en el primer uso (o en el warm-up si STARTUP_WARMUP incluye "idrive")
+_idrive_s3_client = None
 
 
+def get_idrive_client():
+    """
+    Devuelve el cliente S3 de iDrive, creándolo en el primer uso.
+    """
+    global _idrive_s3_client
+    if _idrive_s3_client is None:
+        with startup_timer.track("cliente S3 de iDrive (boto3)"):
+            _idrive_s3_client = boto3.client(
+                's3',
+                endpoint_url=IDRIVE_ENDPOINT_URL,
+                aws_access_key_id=AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+                region_name=IDRIVE_REGION,
+                # s3v4 es necesario para las URLs firmadas de PUT/POST
+                config=Config(signature_version="s3v4", s3={"addressing_style": IDRIVE_ADDRESSING_STYLE})
+            )
+    return _idrive_s3_client
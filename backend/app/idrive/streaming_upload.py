@@ -0,0 +1,151 @@
+# app/idrive/streaming_upload.py
+# Subida por streaming a iDrive (S3 multipart) con memoria acotada por request
+
+import asyncio
+import hashlib
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import (
+    IDRIVE_BUCKET_NAME, IDRIVE_MULTIPART_PART_SIZE_BYTES, IDRIVE_MULTIPART_CONCURRENCY,
+)
+from app.idrive.idrive_service import get_idrive_client
+
+logger = logging.getLogger(__name__)
+
+# S3 exige partes de al menos 5 MiB (salvo la última)
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """
+    El contenido superó el tamaño máximo permitido; la subida ya fue abortada.
+    """
+
+    def __init__(self, max_size: int):
+        super().__init__(f"El archivo supera el tamaño máximo de {max_size} bytes.")
+        self.max_size = max_size
+
+
+class ContentHashMismatchError(Exception):
+    """
+    El SHA-256 del contenido recibido no coincide con el declarado; no quedó ningún objeto.
+    """
+
+    def __init__(self, expected: str, actual: str):
+        super().__init__(f"El SHA-256 del archivo ({actual}) no coincide con el declarado ({expected}).")
+        self.expected = expected
+        self.actual = actual
+
+
+async def stream_to_idrive(
+    chunks: AsyncIterator[bytes],
+    key: str,
+    content_type: str,
+    max_size: int,
+    part_size: int = IDRIVE_MULTIPART_PART_SIZE_BYTES,
+    concurrency: int = IDRIVE_MULTIPART_CONCURRENCY,
+    client=None,
+    bucket: Optional[str] = None,
+    expected_sha256: Optional[str] = None,
+) -> Tuple[int, str]:
+    """
+    Sube el contenido de `chunks` (ej. request.stream()) al objeto `key` y devuelve su tamaño
+    y su SHA-256 (hex), calculado mientras se recibe.
+
+    Los bytes se acumulan hasta completar una parte y cada parte se sube en un hilo, con a lo
+    sumo `concurrency` partes en vuelo. Mientras no hay lugar para otra parte no se lee más del
+    stream, así que la memoria queda acotada en ~ part_size * (concurrency + 1) sin importar el
+    tamaño del archivo. Si se supera `max_size` se aborta en cuanto ocurre. Los archivos más
+    chicos que una parte se suben con un único PUT.
+
+    Con `expected_sha256` el hash se compara antes de completar la subida: si no coincide se
+    aborta y se lanza ContentHashMismatchError, así la key nunca apunta a otro contenido.
+    """
+    client = client or get_idrive_client()
+    bucket = bucket or IDRIVE_BUCKET_NAME
+    part_size = max(part_size, S3_MIN_PART_SIZE)
+    extra = {"ContentType": content_type, "ACL": "public-read"}
+
+    buffer = bytearray()
+    total = 0
+    sha256 = hashlib.sha256()
+    upload_id: Optional[str] = None
+    parts: Dict[int, str] = {}
+    next_part = 1
+    in_flight: List[asyncio.Task] = []
+    slots = asyncio.Semaphore(max(concurrency, 1))
+
+    async def upload_part(number: int, body: bytes) -> None:
+        try:
+            response = await asyncio.to_thread(
+                client.upload_part,
+                Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body,
+            )
+            parts[number] = response["ETag"]
+        finally:
+            slots.release()
+
+    async def flush_part() -> None:
+        nonlocal upload_id, next_part
+        if upload_id is None:
+            response = await asyncio.to_thread(
+                client.create_multipart_upload, Bucket=bucket, Key=key, **extra
+            )
+            upload_id = response["UploadId"]
+        # Esperar lugar antes de copiar la parte: backpressure sobre el stream de entrada
+        await slots.acquire()
+        for task in [t for t in in_flight if t.done()]:
+            in_flight.remove(task)
+            task.result()  # propaga el error de una parte fallida
+        with memoryview(buffer) as view:
+            body = bytes(view[:part_size])
+        del buffer[:part_size]
+        in_flight.append(asyncio.create_task(upload_part(next_part, body)))
+        next_part += 1
+
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            total += len(chunk)
+            if total > max_size:
+                raise UploadTooLargeError(max_size)
+            sha256.update(chunk)
+            buffer += chunk
+            while len(buffer) >= part_size:
+                await flush_part()
+
+        digest = sha256.hexdigest()
+        if expected_sha256 is not None and digest != expected_sha256.lower():
+            raise ContentHashMismatchError(expected_sha256, digest)
+
+        if upload_id is None:
+            # Cabe en una sola parte: PUT simple
+            await asyncio.to_thread(
+                client.put_object, Bucket=bucket, Key=key, Body=bytes(buffer), **extra
+            )
+            return total, digest
+
+        if buffer:
+            await flush_part()
+        await asyncio.gather(*in_flight)
+        await asyncio.to_thread(
+            client.complete_multipart_upload,
+            Bucket=bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": n, "ETag": parts[n]} for n in sorted(parts)]},
+        )
+        return total, digest
+
+    except BaseException:
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        if upload_id is not None:
+            try:
+                await asyncio.to_thread(
+                    client.abort_multipart_upload, Bucket=bucket, Key=key, UploadId=upload_id
+                )
+            except Exception as e:
+                logger.warning(f"No se pudo abortar la subida multipart de {key}: {e}")
+        raise
@@ -8,3 +8,5 @@ from .empresa.ciudad import Ciudad
 from .empresa.barrio import Barrio
 from .empresa.direccion import Direccion
 from .empresa.verificacion_solicitud import VerificacionSolicitud
+from .cache_version import CacheVersion
+from .idempotency_key import IdempotencyKey
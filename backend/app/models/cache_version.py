@@ -0,0 +1,21 @@
+# app/models/cache_version.py
+
+from datetime import datetime
+from sqlalchemy import Column, String, BigInteger, DateTime, text
+from sqlalchemy.orm import Mapped
+from app.supabase.db.db_supabase import Base # Importación de la base declarativa
+
+class CacheVersion(Base):
+    """
+    Contador de versión por grupo de datos cacheados en memoria (ej. 'ubicaciones').
+    Lo incrementan triggers de la base cuando cambian las tablas del grupo; cada worker
+    lo consulta periódicamente para saber si debe descartar su cache.
+    """
+    __tablename__ = 'cache_version'
+    __table_args__ = (
+        {'comment': 'Versiones de los datos cacheados en memoria por la API'}
+    )
+
+    nombre: Mapped[str] = Column(String(60), primary_key=True)
+    version: Mapped[int] = Column(BigInteger, nullable=False, server_default=text('1'))
+    updated_at: Mapped[datetime] = Column(DateTime(True), server_default=text('now()'))
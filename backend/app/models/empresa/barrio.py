@@ -3,7 +3,8 @@
 from typing import List
 from datetime import datetime
 from sqlalchemy import Column, String, BigInteger, DateTime, text, ForeignKey
-from sqlalchemy.orm import relationship, Mapped
+from sqlalchemy.orm import relationship, Mapped, deferred
+from geoalchemy2 import Geometry
 from app.supabase.db.db_supabase import Base # Importación de la base declarativa
 from app.models.empresa.ciudad import Ciudad # Asegúrate de que esta importación sea correcta
 
@@ -25,6 +26,10 @@ class Barrio(Base):
     
     created_at: Mapped[datetime] = Column(DateTime(True), server_default=text('now()'))
 
+    # Límite del barrio para geocodificación inversa (índice GiST en la migración).
+    # Diferida: los listados de barrios no cargan el polígono.
+    geom = deferred(Column(Geometry('MULTIPOLYGON', srid=4326, spatial_index=False), nullable=True))
+
     # Relaciones con otras tablas
     ciudad: Mapped["Ciudad"] = relationship("Ciudad", back_populates='barrio')
     direccion: Mapped[List["Direccion"]] = relationship("Direccion", back_populates='barrio')
\ No newline at end of file
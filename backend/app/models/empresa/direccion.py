@@ -32,8 +32,8 @@ class Direccion(Base):
     numero: Mapped[str] = Column(String(20), nullable=False)
     referencia: Mapped[str] = Column(String(150), nullable=True) # Hacemos referencia opcional
     
-    # La columna de coordenadas ya está correctamente definida
-    #coordenadas: Mapped[str] = mapped_column(Geometry("POINT", srid=4326), nullable=False)
+    # Punto WGS84; los índices GiST (geometría y geography) se crean en la migración
+    coordenadas = Column(Geometry("POINT", srid=4326, spatial_index=False), nullable=True)
     
     # El id_barrio también debe ser UUID para la consistencia
     id_barrio: Mapped[UUID] = Column(PG_UUID(as_uuid=True), ForeignKey('barrio.id_barrio', ondelete='CASCADE'), nullable=False)
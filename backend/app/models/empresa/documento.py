@@ -28,6 +28,9 @@ class Documento(Base):
     id_tip_documento: Mapped[int] = Column(BigInteger, ForeignKey('tipo_documento.id_tip_documento', ondelete='CASCADE'), nullable=False)
     id_verificacion: Mapped[int] = Column(BigInteger, ForeignKey('verificacion_solicitud.id_verificacion', ondelete='CASCADE'), nullable=False, index=True)
 
+    # URL pública del archivo en iDrive
+    url_archivo: Mapped[Optional[str]] = Column(String(500), nullable=True)
+
     estado_revision: Mapped[str] = Column(String(20), nullable=False)  # ej. 'pendiente', 'aprobado', 'rechazado'
     
     # La fecha de verificación debe ser opcional (nullable=True)
@@ -0,0 +1,38 @@
+# app/models/idempotency_key.py
+
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+from sqlalchemy import Column, String, SmallInteger, DateTime, text, Index
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped
+from app.supabase.db.db_supabase import Base # Importación de la base declarativa
+
+class IdempotencyKey(Base):
+    """
+    Respuesta registrada para un header Idempotency-Key. Se identifica por alcance (el id del
+    usuario, o el email en el signup), endpoint y key. Mientras el primer request está en
+    curso la fila queda 'en_curso' a nombre de `propietario`; al terminar guarda el status y
+    el cuerpo de la respuesta para repetirlos en los reintentos hasta `expires_at`.
+    """
+    __tablename__ = 'idempotency_key'
+    __table_args__ = (
+        Index('idx_idempotency_key_expires_at', 'expires_at'),
+        {'comment': 'Respuestas registradas por Idempotency-Key para repetirlas en los reintentos'}
+    )
+
+    alcance: Mapped[str] = Column(String(320), primary_key=True)
+    endpoint: Mapped[str] = Column(String(100), primary_key=True)
+    clave: Mapped[str] = Column(String(255), primary_key=True)
+
+    # HMAC del cuerpo del request: la misma key con otro cuerpo se rechaza
+    request_hash: Mapped[str] = Column(String(64), nullable=False)
+    estado: Mapped[str] = Column(String(20), nullable=False, server_default=text("'en_curso'"))  # 'en_curso' o 'completada'
+    propietario: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=False)
+
+    status_code: Mapped[Optional[int]] = Column(SmallInteger, nullable=True)
+    respuesta: Mapped[Optional[Any]] = Column(JSONB, nullable=True)
+
+    locked_at: Mapped[datetime] = Column(DateTime(True), nullable=False, server_default=text('now()'))
+    created_at: Mapped[datetime] = Column(DateTime(True), server_default=text('now()'))
+    expires_at: Mapped[datetime] = Column(DateTime(True), nullable=False)
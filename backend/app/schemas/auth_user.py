@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic import BaseModel
 
 class SupabaseUser(BaseModel):
@@ -8,7 +9,10 @@ class SupabaseUser(BaseModel):
         id (str): Identificador único del usuario (UUID).
         email (str): Correo electrónico del usuario. 
                      Nunca se debe devolver la contraseña en este modelo.
+        roles (list[str] | None): Nombres de los roles del usuario tomados del claim
+                     personalizado del token. None si el token no trae el claim.
     """
     
     id: str
     email: str  # Nunca devolver la contraseña
+    roles: Optional[List[str]] = None
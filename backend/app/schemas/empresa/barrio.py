@@ -1,5 +1,6 @@
 # app/schemas/barrio.py
 
+from typing import List
 from pydantic import BaseModel
 
 class BarrioIn(BaseModel):
@@ -24,4 +25,15 @@ class BarrioOut(BaseModel):
     class Config:
         # Habilita la compatibilidad con modelos ORM de SQLAlchemy
         from_attributes = True
-        #orm_mode = True version vieja
\ No newline at end of file
+        #orm_mode = True version vieja
+
+class BarrioPacked(BaseModel):
+
+    '''
+    Representación compacta (por columnas) de una lista de barrios: arreglos paralelos de id,
+    nombre e id_ciudad (el padre de cada barrio).
+    '''
+
+    id: List[int]
+    nombre: List[str]
+    id_ciudad: List[int]
@@ -1,6 +1,7 @@
 # app/schemas/ciudad.py
 
 from datetime import datetime
+from typing import List
 from pydantic import BaseModel
 
 class CiudadIn(BaseModel):
@@ -23,4 +24,14 @@ class CiudadOut(BaseModel):
 
     class Config:
         # Habilita la compatibilidad con modelos ORM de SQLAlchemy
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CiudadPacked(BaseModel):
+
+    '''
+    Representación compacta (por columnas) de una lista de ciudades: arreglos paralelos de id,
+    nombre e id_departamento (el padre de cada ciudad).
+    '''
+    id: List[int]
+    nombre: List[str]
+    id_departamento: List[int]
@@ -1,5 +1,6 @@
 # app/schemas/departamento.py
 
+from typing import List
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -25,4 +26,14 @@ class DepartamentoOut(BaseModel):
     
     class Config:
         # Habilita la compatibilidad con modelos ORM de SQLAlchemy
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class DepartamentoPacked(BaseModel):
+
+    '''
+    Representación compacta (por columnas) de una lista de departamentos: en lugar de un objeto
+    por departamento, arreglos paralelos donde la posición i de cada arreglo es el departamento i.
+    '''
+
+    id: List[int]
+    nombre: List[str]
@@ -1,8 +1,9 @@
 # app/schemas/documento.py
 
 from datetime import datetime
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
+from app.core.config import IDRIVE_MAX_DOCUMENTS_PER_REQUEST, ADMIN_DOCUMENT_REVIEW_MAX
 
 class DocumentoIn(BaseModel):
     '''
@@ -24,3 +25,97 @@ class DocumentoOut(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+class DocumentoPresignIn(BaseModel):
+    '''
+    Documento que el cliente va a subir directo al bucket: su tipo, nombre original (para la
+    extensión), content type y, opcionalmente, el tamaño en bytes y el SHA-256 (hex) del
+    archivo. Con el hash y PUT la key queda direccionada por contenido (el bucket verifica el
+    checksum firmado) y, si el documento ya está en el bucket, no hace falta volver a subirlo.
+    '''
+    id_tip_documento: int
+    nombre_archivo: str
+    content_type: str
+    tamano_bytes: Optional[int] = Field(None, gt=0)
+    sha256: Optional[str] = Field(None, pattern=r"^[0-9a-fA-F]{64}$")
+
+
+class PresignDocumentosIn(BaseModel):
+    '''
+    Pedido de URLs firmadas para subir los documentos de una solicitud de verificación.
+    Con "put" cada documento debe informar tamano_bytes, que queda firmado; "post" permite
+    que el bucket rechace archivos más grandes que el límite configurado sin conocer el tamaño.
+    '''
+    documentos: List[DocumentoPresignIn] = Field(..., min_length=1, max_length=IDRIVE_MAX_DOCUMENTS_PER_REQUEST)
+    metodo: Literal["put", "post"] = "put"
+
+
+class DocumentoPresignOut(BaseModel):
+    '''
+    Datos para subir un documento directo al bucket. Con PUT: enviar el archivo a `url` con
+    los `headers` indicados. Con POST: enviar un multipart/form-data a `url` con `campos`
+    más el campo `file`. Luego informar la `key` en el endpoint de finalización. Si
+    `existente` es True el documento ya está en el bucket: no se firma nada y alcanza con
+    informar la `key`.
+    '''
+    id_tip_documento: int
+    key: str
+    metodo: Literal["put", "post"]
+    existente: bool = False
+    url: Optional[str] = None
+    headers: Dict[str, str] = {}
+    campos: Dict[str, str] = {}
+    expira_en: int
+
+
+class DocumentoSubidoOut(BaseModel):
+    '''
+    Resultado de subir un documento por streaming: la `key` se informa luego en el endpoint
+    de finalización de la solicitud. `reutilizado` indica que el mismo contenido ya estaba
+    en el bucket y no se guardó una copia nueva.
+    '''
+    id_tip_documento: int
+    key: str
+    url: str
+    tamano_bytes: int
+    sha256: str
+    reutilizado: bool = False
+
+
+class DocumentoSubidoIn(BaseModel):
+    '''
+    Documento ya subido al bucket con una URL firmada.
+    '''
+    id_tip_documento: int
+    key: str
+
+
+class RevisionDocumentoIn(BaseModel):
+    '''
+    Resultado de la revisión de un documento por un administrador.
+    '''
+    id_documento: int
+    estado_revision: Literal["pendiente", "aprobado", "rechazado"]
+    observacion: Optional[str] = Field(None, max_length=1000)
+
+
+class RevisionDocumentosIn(BaseModel):
+    documentos: List[RevisionDocumentoIn] = Field(..., min_length=1, max_length=ADMIN_DOCUMENT_REVIEW_MAX)
+
+
+class RevisionDocumentosOut(BaseModel):
+    '''
+    Resultado de revisar documentos: cuántos se actualizaron, el conteo de todos los
+    documentos de la solicitud por estado y el estado de la solicitud derivado de ellos
+    ('aprobada' si todos están aprobados, 'rechazada' si ya no quedan pendientes y alguno
+    fue rechazado; si no sigue 'pendiente').
+    '''
+    id_verificacion: int
+    estado_anterior: str
+    estado_solicitud: str
+    documentos_actualizados: int
+    total: int
+    aprobados: int
+    rechazados: int
+    pendientes: int
@@ -1,10 +1,11 @@
 # app/schemas/perfil_empresa.py
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
 from datetime import datetime
 from typing import Optional, List
-from app.schemas.empresa.documento import DocumentoIn
+from app.schemas.empresa.documento import DocumentoIn, DocumentoSubidoIn
+from app.core.config import IDRIVE_MAX_DOCUMENTS_PER_REQUEST
 
 # Importar schemas de tablas relacionadas
 # from .direccion import DireccionOut
@@ -23,6 +24,14 @@ class solicitudCompletaIn(BaseModel):
     comentario_solicitud : str
     documentos : List[DocumentoIn]
 
+class SolicitudVerificacionFinalizarIn(BaseModel):
+    '''
+    Finaliza una solicitud cuyos documentos se subieron directo al bucket con URLs firmadas.
+    '''
+    perfil_empresa: PerfilEmpresaIn
+    comentario_solicitud: Optional[str] = None
+    documentos: List[DocumentoSubidoIn] = Field(..., min_length=1, max_length=IDRIVE_MAX_DOCUMENTS_PER_REQUEST)
+
 class PerfilEmpresaOut(BaseModel):
     id_perfil: UUID
     user_id: UUID
@@ -0,0 +1,33 @@
+# app/schemas/proveedor_cercano.py
+
+from typing import List, Literal, Optional
+from pydantic import BaseModel
+
+
+class ProveedorCercanoOut(BaseModel):
+
+    '''
+    Empresa verificada (su dirección principal) o una de sus sucursales, con la distancia en
+    metros al punto de búsqueda.
+    '''
+
+    tipo: Literal["empresa", "sucursal"]
+    id: int
+    id_perfil: int
+    nombre: str
+    nombre_fantasia: str
+    id_direccion: int
+    lat: float
+    lon: float
+    distancia_m: float
+
+
+class ProveedoresCercanosPage(BaseModel):
+
+    '''
+    Página de resultados ordenada por distancia. `next_cursor` se envía en ?cursor= para
+    pedir la página siguiente; es None cuando no hay más resultados.
+    '''
+
+    items: List[ProveedorCercanoOut]
+    next_cursor: Optional[str] = None
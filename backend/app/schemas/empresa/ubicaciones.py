@@ -0,0 +1,80 @@
+# app/schemas/ubicaciones.py
+
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+from app.schemas.empresa.departamento import DepartamentoPacked
+from app.schemas.empresa.ciudad import CiudadPacked
+from app.schemas.empresa.barrio import BarrioPacked
+from app.core.config import GEOCODING_BATCH_MAX_POINTS
+
+
+class UbicacionesArbolPacked(BaseModel):
+
+    '''
+    Árbol completo departamento -> ciudad -> barrio en formato compacto por columnas.
+    La relación con el padre va en los arreglos id_departamento / id_ciudad.
+    `version` identifica el contenido: el cliente lo guarda y lo envía en ?version=
+    para recibir un 304 mientras no cambie.
+    '''
+
+    version: str
+    departamentos: DepartamentoPacked
+    ciudades: CiudadPacked
+    barrios: BarrioPacked
+
+
+class UbicacionResultado(BaseModel):
+
+    '''
+    Resultado de la búsqueda de ubicaciones: un barrio o una ciudad con su ruta completa
+    (ej. "San Vicente, Asunción, Central") y los ids para precargar el formulario de dirección.
+    '''
+
+    tipo: Literal["barrio", "ciudad"]
+    id: int
+    nombre: str
+    ruta: str
+    id_ciudad: Optional[int] = None
+    ciudad: Optional[str] = None
+    id_departamento: Optional[int] = None
+    departamento: Optional[str] = None
+    score: float
+
+
+class PuntoIn(BaseModel):
+
+    '''
+    Coordenada WGS84 (SRID 4326) a geocodificar.
+    '''
+
+    lat: float = Field(..., ge=-90, le=90)
+    lon: float = Field(..., ge=-180, le=180)
+
+
+class GeocodificacionInversaBatchIn(BaseModel):
+
+    '''
+    Lote de puntos para resolver en una sola request (ej. importación masiva de direcciones).
+    '''
+
+    puntos: List[PuntoIn] = Field(..., min_length=1, max_length=GEOCODING_BATCH_MAX_POINTS)
+
+
+class GeocodificacionInversaOut(BaseModel):
+
+    '''
+    Barrio, ciudad y departamento que contienen un punto. `encontrado` es False si el punto
+    no cae dentro de ningún barrio con límites cargados. `fuente` indica si se resolvió con el
+    R-tree en memoria o con PostGIS.
+    '''
+
+    lat: float
+    lon: float
+    encontrado: bool
+    id_barrio: Optional[int] = None
+    barrio: Optional[str] = None
+    id_ciudad: Optional[int] = None
+    ciudad: Optional[str] = None
+    id_departamento: Optional[int] = None
+    departamento: Optional[str] = None
+    fuente: Literal["rtree", "postgis"]
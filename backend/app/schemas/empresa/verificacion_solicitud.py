@@ -1,10 +1,11 @@
 # app/schemas/verificacion_solicitud.py
 
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from datetime import datetime
 from uuid import UUID
 from app.schemas.empresa.documento import DocumentoOut
+from app.core.config import ADMIN_BULK_DECISION_MAX
 
 class VerificacionSolicitudIn(BaseModel):
     # La fecha de solicitud y el estado se manejan en el backend
@@ -31,4 +32,63 @@ class VerificacionSolicitudOut(BaseModel):
 
     class Config:
         # Habilita la compatibilidad con modelos ORM de SQLAlchemy
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class SolicitudVerificacionResumenOut(BaseModel):
+    '''
+    Fila de la cola de solicitudes del panel de administración (sin documentos).
+    '''
+    id_verificacion: int
+    fecha_solicitud: datetime
+    fecha_revision: Optional[datetime]
+    estado: str
+    comentario: Optional[str]
+    id_perfil: int
+    nombre_fantasia: str
+    razon_social: str
+
+
+class SolicitudesVerificacionPage(BaseModel):
+    '''
+    Página de la cola de solicitudes, de la más antigua a la más nueva. `next_cursor` se envía
+    en ?cursor= para pedir la página siguiente (None cuando no hay más). `total` solo se
+    calcula en la primera página; es exacto salvo que `total_estimado` sea True.
+    '''
+    items: List[SolicitudVerificacionResumenOut]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_estimado: bool = False
+
+
+class DecisionSolicitudItem(BaseModel):
+    '''
+    Solicitud a resolver; su comentario reemplaza al comentario común del lote.
+    '''
+    id_verificacion: int
+    comentario: Optional[str] = None
+
+
+class DecisionMasivaIn(BaseModel):
+    '''
+    Aprobación o rechazo de varias solicitudes en una sola transacción.
+    '''
+    decision: Literal["aprobar", "rechazar"]
+    comentario: Optional[str] = None
+    solicitudes: List[DecisionSolicitudItem] = Field(..., min_length=1, max_length=ADMIN_BULK_DECISION_MAX)
+
+
+class DecisionSolicitudResultadoOut(BaseModel):
+    '''
+    Resultado por solicitud: "aprobada" / "rechazada" si se aplicó la decisión,
+    "no_encontrada" o "ya_resuelta" (no estaba pendiente, ver `estado_anterior`).
+    '''
+    id_verificacion: int
+    resultado: Literal["aprobada", "rechazada", "no_encontrada", "ya_resuelta"]
+    estado_anterior: Optional[str] = None
+    documentos: int = 0
+
+
+class DecisionMasivaOut(BaseModel):
+    procesadas: int
+    actualizadas: int
+    resultados: List[DecisionSolicitudResultadoOut]
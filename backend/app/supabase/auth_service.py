@@ -1,9 +1,18 @@
 #registro/login usando supabase
 
+import asyncio
+from typing import Awaitable, Optional, TypeVar
+import httpx
+from fastapi import HTTPException, status
+from gotrue import AsyncGoTrueClient
 from supabase import Client, create_client
 from sqlalchemy import create_engine
-from app.core.config import SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY, DATABASE_URL
+from app.core.config import (
+    SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY, DATABASE_URL,
+    AUTH_HTTP_TIMEOUT_SECONDS, AUTH_HTTP_MAX_CONNECTIONS, AUTH_HTTP_MAX_KEEPALIVE,
+)
 from supabase.lib.client_options import ClientOptions
+from app.core.startup import startup_timer
 
 
 #options = ClientOptions(use_ssl=False)
@@ -11,13 +20,96 @@ from supabase.lib.client_options import ClientOptions
 # Supabase Auth client
 #supabase_auth: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY, SUPABASE_SERVICE_ROLE_KEY)
 
-# Cliente para uso publico/autenticacion de usuarios (con la anon key)
-supabase_auth: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+# Los clientes se crean de forma perezosa: importar este módulo no construye nada
+_supabase_auth: Optional[Client] = None
+_supabase_admin: Optional[Client] = None
+
+
+def get_supabase_auth() -> Client:
+    """
+    Cliente síncrono para uso publico/autenticacion de usuarios (con la anon key).
+    """
+    global _supabase_auth
+    if _supabase_auth is None:
+        with startup_timer.track("cliente Supabase (anon)"):
+            _supabase_auth = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+    return _supabase_auth
+
+
+def get_supabase_admin() -> Client:
+    """
+    Cliente síncrono para tareas administrativas (con la service_role key).
+    Se inicializa solo cuando es necesario, para mayor seguridad.
+    """
+    global _supabase_admin
+    if _supabase_admin is None:
+        with startup_timer.track("cliente Supabase (service_role)"):
+            _supabase_admin = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    return _supabase_admin
 
-# Cliente para tareas administrativas (con la service_role key)
-# Lo inicializaremos solo cuando sea necesario para mayor seguridad
-supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
 # SQLAlchemy engine para tu base de datos propia
 #engine = create_engine(DATABASE_URL, echo=True)
 
+
+# --- Cliente asíncrono de Supabase Auth ---
+# Los endpoints async no deben usar el cliente síncrono: cada llamada a GoTrue bloquearía
+# el event loop de uvicorn. Este cliente comparte un único pool de conexiones keep-alive.
+# No guarda sesiones entre requests: siempre se le pasan los tokens de forma explícita.
+
+T = TypeVar("T")
+
+_auth_http_client: Optional[httpx.AsyncClient] = None
+_async_auth: Optional[AsyncGoTrueClient] = None
+
+
+def get_async_auth() -> AsyncGoTrueClient:
+    """
+    Devuelve el cliente asíncrono de GoTrue, creándolo en el primer uso.
+    """
+    global _auth_http_client, _async_auth
+    if _async_auth is None:
+        with startup_timer.track("cliente asíncrono de Supabase Auth"):
+            _auth_http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(AUTH_HTTP_TIMEOUT_SECONDS),
+                limits=httpx.Limits(
+                    max_connections=AUTH_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=AUTH_HTTP_MAX_KEEPALIVE,
+                ),
+            )
+            _async_auth = AsyncGoTrueClient(
+                url=f"{SUPABASE_URL}/auth/v1",
+                headers={
+                    "apikey": SUPABASE_ANON_KEY,
+                    "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
+                },
+                http_client=_auth_http_client,
+                auto_refresh_token=False,
+                persist_session=False,
+            )
+    return _async_auth
+
+
+async def auth_call(awaitable: Awaitable[T], timeout: float = AUTH_HTTP_TIMEOUT_SECONDS) -> T:
+    """
+    Ejecuta una llamada a Supabase Auth con un límite de tiempo propio.
+    Si GoTrue no responde a tiempo se devuelve un 504 en lugar de dejar la request colgada.
+    """
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="El servicio de autenticación no respondió a tiempo. Inténtalo de nuevo."
+        )
+
+
+async def close_async_auth() -> None:
+    """
+    Cierra el pool de conexiones del cliente asíncrono (al apagar la aplicación).
+    """
+    global _auth_http_client, _async_auth
+    if _auth_http_client is not None:
+        await _auth_http_client.aclose()
+    _auth_http_client = None
+    _async_auth = None
@@ -10,7 +10,21 @@ from app.core.config import DATABASE_URL
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from app.core.config import DATABASE_URL
+from sqlalchemy.pool import NullPool
+from uuid import uuid4
+from app.core.config import (
+    DATABASE_URL,
+    DB_ENGINE_PROFILE,
+    WEB_CONCURRENCY,
+    DB_MAX_CONNECTIONS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_POOL_TIMEOUT,
+    DB_USE_NULLPOOL,
+)
+from app.core.startup import startup_timer
 import logging
 
 # Configurar logging
@@ -20,15 +34,25 @@ logger = logging.getLogger(__name__)
 # Crear la base para los modelos SQLAlchemy
 Base = declarative_base()
 
-# Verificar que DATABASE_URL esté configurado
-if not DATABASE_URL:
-    logger.error("❌ DATABASE_URL no está configurado")
-    logger.error("💡 Asegúrate de crear el archivo .env en la carpeta backend")
-    logger.error("💡 Con la connection string del Transaction Pooler")
-    raise ValueError(
-        "DATABASE_URL no está configurado. "
-        "Verifica que el archivo .env existe y contiene DATABASE_URL."
-    )
+# Los engines y sessionmakers se crean de forma perezosa (en el primer uso o en el warm-up
+# del lifespan), así importar este módulo (modelos, Alembic, scripts) no abre nada.
+_engine = None
+_session_local = None
+_async_engine = None
+_async_session_local = None
+
+
+def _require_database_url() -> str:
+    # Verificar que DATABASE_URL esté configurado
+    if not DATABASE_URL:
+        logger.error("❌ DATABASE_URL no está configurado")
+        logger.error("💡 Asegúrate de crear el archivo .env en la carpeta backend")
+        logger.error("💡 Con la connection string del Transaction Pooler")
+        raise ValueError(
+            "DATABASE_URL no está configurado. "
+            "Verifica que el archivo .env existe y contiene DATABASE_URL."
+        )
+    return DATABASE_URL
 
 #logger.info(f"🔗 Intentando conectar a la base de datos (Transaction Pooler): {DATABASE_URL}")
 
@@ -38,49 +62,135 @@ if not DATABASE_URL:
 #logger.info(f"🔗 Intentando conectar a la base de datos (Transaction Pooler) con URL: {db_url_sync}")
 
 
-# Crear engine síncrono
-try:
-    engine = create_engine(DATABASE_URL)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    logger.info("✅ Engine síncrono creado exitosamente")
-except Exception as e:
-    logger.error(f"❌ Error al crear la conexión síncrona a la base de datos: {e}")
-    raise ValueError(f"Error al crear la conexión a la base de datos: {e}")
-
-# Crear engine asíncrono (para operaciones async) con configuración simplificada
-try:
-    # Convertir URL síncrona a asíncrona
-    async_database_url = DATABASE_URL.replace('postgresql://', 'postgresql+asyncpg://')
-    logger.info(f"🔄 Creando engine asíncrono con URL: {async_database_url}")
-    
-    # Configuración simplificada y robusta del pool de conexiones
-    async_engine = create_async_engine(
-        async_database_url,
-        # Configuración básica del pool de conexiones
-        pool_size=5,  # Número de conexiones en el pool (reducido)
-        max_overflow=10,  # Conexiones adicionales (reducido)
-        pool_pre_ping=True,  # Verificar conexiones antes de usarlas
-        pool_recycle=1800,  # Reciclar conexiones cada 30 minutos
-        pool_timeout=20,  # Timeout para obtener conexión del pool
-        echo=False,  # No mostrar SQL en logs
-        # Configuración mínima para asyncpg
-        connect_args={
-            "server_settings": {
-                "application_name": "SAVEB2B_Backend"
-            }
+def get_session_local() -> sessionmaker:
+    """
+    Devuelve el sessionmaker síncrono, creando el engine síncrono en el primer uso.
+    """
+    global _engine, _session_local
+    if _session_local is None:
+        # Crear engine síncrono
+        try:
+            with startup_timer.track("engine síncrono (psycopg2)"):
+                _engine = create_engine(_require_database_url())
+                _session_local = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+            logger.info("✅ Engine síncrono creado exitosamente")
+        except Exception as e:
+            logger.error(f"❌ Error al crear la conexión síncrona a la base de datos: {e}")
+            raise ValueError(f"Error al crear la conexión a la base de datos: {e}")
+    return _session_local
+
+
+def _env_bool(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes")
+
+
+def async_engine_options() -> dict:
+    """
+    Arma los argumentos de create_async_engine según DB_ENGINE_PROFILE.
+
+    - "direct": pool propio con cache de prepared statements de asyncpg.
+    - "transaction-pooler": PgBouncer reparte las sentencias de una misma conexión entre
+      distintos backends, así que se desactivan los caches de prepared statements y cada
+      sentencia usa un nombre único. Opcionalmente (DB_USE_NULLPOOL) se deja el pooling
+      completo a PgBouncer.
+
+    El tamaño del pool sale de DB_MAX_CONNECTIONS repartido entre WEB_CONCURRENCY workers,
+    salvo que se fijen DB_POOL_SIZE / DB_MAX_OVERFLOW.
+    """
+    if DB_ENGINE_PROFILE not in ("direct", "transaction-pooler"):
+        raise ValueError(
+            f"DB_ENGINE_PROFILE inválido: {DB_ENGINE_PROFILE}. Usa 'direct' o 'transaction-pooler'."
+        )
+    pooler = DB_ENGINE_PROFILE == "transaction-pooler"
+
+    connect_args = {
+        "server_settings": {
+            "application_name": "SAVEB2B_Backend"
         }
-    )
-    
-    AsyncSessionLocal = sessionmaker(
-        async_engine, 
-        class_=AsyncSession, 
-        expire_on_commit=False,
-        autocommit=False,
-        autoflush=False
-    )
-    logger.info("✅ Engine asíncrono creado exitosamente con configuración simplificada")
-except Exception as e:
-    logger.error(f"❌ Error al crear la conexión asíncrona a la base de datos: {e}")
-    raise ValueError(f"Error al crear la conexión asíncrona a la base de datos: {e}")
+    }
+    if pooler:
+        connect_args.update({
+            "statement_cache_size": 0,  # cache de asyncpg
+            "prepared_statement_cache_size": 0,  # cache del dialecto de SQLAlchemy
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        })
+
+    options = {
+        "echo": False,  # No mostrar SQL en logs
+        "connect_args": connect_args,
+    }
+
+    if pooler and DB_USE_NULLPOOL:
+        options["poolclass"] = NullPool
+        return options
+
+    # Presupuesto de conexiones por worker: 1/3 fijas en el pool y el resto como overflow
+    per_worker = max(1, DB_MAX_CONNECTIONS // max(1, WEB_CONCURRENCY))
+    pool_size = int(DB_POOL_SIZE) if DB_POOL_SIZE else max(1, per_worker // 3)
+    max_overflow = int(DB_MAX_OVERFLOW) if DB_MAX_OVERFLOW else max(0, per_worker - pool_size)
+
+    # Detrás del pooler el pre-ping agrega una ida y vuelta por checkout sin mucho beneficio;
+    # se compensa reciclando las conexiones más seguido
+    pre_ping = _env_bool(DB_POOL_PRE_PING) if DB_POOL_PRE_PING else not pooler
+    recycle = int(DB_POOL_RECYCLE) if DB_POOL_RECYCLE else (300 if pooler else 1800)
+
+    options.update({
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_pre_ping": pre_ping,
+        "pool_recycle": recycle,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    })
+    return options
+
+
+def get_async_engine():
+    """
+    Devuelve el engine asíncrono, creándolo en el primer uso según el perfil configurado.
+    """
+    get_async_sessionmaker()
+    return _async_engine
+
+
+def get_async_sessionmaker() -> sessionmaker:
+    """
+    Devuelve el sessionmaker asíncrono, creando el engine asíncrono en el primer uso.
+    """
+    global _async_engine, _async_session_local
+    if _async_session_local is None:
+        try:
+            # Convertir URL síncrona a asíncrona
+            async_database_url = _require_database_url().replace('postgresql://', 'postgresql+asyncpg://')
+            engine_options = async_engine_options()
+            logger.info(
+                f"🔄 Creando engine asíncrono (perfil {DB_ENGINE_PROFILE}): "
+                f"{ {k: v for k, v in engine_options.items() if k != 'connect_args'} }"
+            )
+
+            with startup_timer.track("engine asíncrono (asyncpg)"):
+                _async_engine = create_async_engine(async_database_url, **engine_options)
+
+                _async_session_local = sessionmaker(
+                    _async_engine, 
+                    class_=AsyncSession, 
+                    expire_on_commit=False,
+                    autocommit=False,
+                    autoflush=False
+                )
+            logger.info("✅ Engine asíncrono creado exitosamente")
+        except Exception as e:
+            logger.error(f"❌ Error al crear la conexión asíncrona a la base de datos: {e}")
+            raise ValueError(f"Error al crear la conexión asíncrona a la base de datos: {e}")
+    return _async_session_local
 
 
+async def dispose_engines() -> None:
+    """
+    Cierra los pools de conexiones (al apagar la aplicación).
+    """
+    global _engine, _session_local, _async_engine, _async_session_local
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _engine is not None:
+        _engine.dispose()
+    _engine = _session_local = _async_engine = _async_session_local = None
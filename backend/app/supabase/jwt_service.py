@@ -0,0 +1,139 @@
+#verificacion local de los access tokens (JWT) emitidos por Supabase Auth
+# app/supabase/jwt_service.py
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+import jwt
+from jwt import PyJWK
+
+from app.core.config import (
+    SUPABASE_URL,
+    SUPABASE_ANON_KEY,
+    SUPABASE_JWT_SECRET,
+    SUPABASE_JWT_AUDIENCE,
+    SUPABASE_JWKS_REFRESH_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Tiempo mínimo entre dos descargas del JWKS provocadas por un kid desconocido,
+# para que tokens con kids inventados no disparen una descarga por request
+JWKS_MIN_REFETCH_SECONDS = 30
+
+# Tolerancia (segundos) para diferencias de reloj entre GoTrue y este servidor
+JWT_LEEWAY_SECONDS = 10
+
+
+class UnknownSigningKeyError(Exception):
+    """
+    El token está firmado con una clave que no conocemos localmente (kid fuera del JWKS
+    cacheado, o token HS256 sin secreto configurado). Quien llama debe validar con GoTrue.
+    """
+
+
+class SupabaseJWKSCache:
+    """
+    Cache en memoria del conjunto de claves públicas de firma (JWKS) de Supabase Auth.
+    La primera descarga se espera; las siguientes se hacen en segundo plano cuando el
+    cache está vencido, sin bloquear las requests que siguen usando las claves actuales.
+    """
+
+    def __init__(self, jwks_url: str, refresh_seconds: int):
+        self.jwks_url = jwks_url
+        self.refresh_seconds = refresh_seconds
+        self._keys: Dict[str, PyJWK] = {}
+        self._fetched_at: float = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def _fetch(self) -> None:
+        headers = {"apikey": SUPABASE_ANON_KEY} if SUPABASE_ANON_KEY else {}
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            response = await client.get(self.jwks_url, headers=headers)
+            response.raise_for_status()
+            data = response.json()
+
+        keys: Dict[str, PyJWK] = {}
+        for jwk in data.get("keys", []):
+            try:
+                key = PyJWK.from_dict(jwk)
+            except jwt.PyJWTError as e:
+                logger.warning(f"Clave del JWKS ignorada ({jwk.get('kid')}): {e}")
+                continue
+            if key.key_id:
+                keys[key.key_id] = key
+
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        logger.info(f"JWKS de Supabase cargado con {len(keys)} clave(s)")
+
+    async def _refresh(self) -> None:
+        async with self._lock:
+            try:
+                await self._fetch()
+            except Exception as e:
+                # Se siguen usando las claves anteriores hasta el próximo intento
+                self._fetched_at = time.monotonic()
+                logger.warning(f"No se pudo refrescar el JWKS de Supabase: {e}")
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def get_key(self, kid: str) -> Optional[PyJWK]:
+        """
+        Devuelve la clave pública para el kid indicado, o None si no se conoce.
+        """
+        if not self._fetched_at:
+            await self._refresh()
+
+        age = time.monotonic() - self._fetched_at
+        key = self._keys.get(kid)
+        if age > self.refresh_seconds or (key is None and age > JWKS_MIN_REFETCH_SECONDS):
+            self._schedule_refresh()
+        return key
+
+
+jwks_cache = SupabaseJWKSCache(
+    jwks_url=f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json",
+    refresh_seconds=SUPABASE_JWKS_REFRESH_SECONDS,
+)
+
+
+async def verify_access_token(token: str) -> Dict[str, Any]:
+    """
+    Valida localmente la firma, la expiración y la audiencia de un access token de Supabase.
+
+    parametro token: JWT recibido en el header Authorization.
+    return: claims del token ya verificados.
+    Lanza jwt.InvalidTokenError si el token es inválido o expiró, y UnknownSigningKeyError
+    si no hay una clave local con la que verificarlo.
+    """
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+
+    if alg == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            raise UnknownSigningKeyError("Token HS256 sin SUPABASE_JWT_SECRET configurado")
+        key: Any = SUPABASE_JWT_SECRET
+        algorithms = ["HS256"]
+    else:
+        kid = header.get("kid")
+        jwk = await jwks_cache.get_key(kid) if kid else None
+        if jwk is None:
+            raise UnknownSigningKeyError(f"kid desconocido: {kid}")
+        # El algoritmo se toma de la clave y no del header, para evitar confusión de algoritmos
+        key = jwk.key
+        algorithms = [jwk.algorithm_name]
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=algorithms,
+        audience=SUPABASE_JWT_AUDIENCE,
+        leeway=JWT_LEEWAY_SECONDS,
+        options={"require": ["exp", "sub"]},
+    )
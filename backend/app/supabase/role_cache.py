@@ -0,0 +1,73 @@
+#cache en memoria de los roles de cada usuario
+# app/supabase/role_cache.py
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import ROLE_CACHE_SIZE, ROLE_CACHE_TTL_SECONDS
+from app.models.rol import RolModel
+from app.models.usuario_rol import UsuarioRolModel
+
+
+class UserRoleCache:
+    """
+    Cache LRU de nombres de roles por id de usuario, con vencimiento por TTL.
+    Se usa cuando el access token no trae el claim de roles. Cualquier cambio en
+    usuario_rol hecho por la API debe llamar a invalidate() para ese usuario.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[List[str], float]]" = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[List[str]]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        roles, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return roles
+
+    def set(self, user_id: str, roles: List[str]) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[user_id] = (roles, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        self._entries.pop(str(user_id), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+user_role_cache = UserRoleCache(max_size=ROLE_CACHE_SIZE, ttl_seconds=ROLE_CACHE_TTL_SECONDS)
+
+
+async def get_user_roles(db: AsyncSession, user_id: str) -> List[str]:
+    """
+    Devuelve los nombres de los roles del usuario, desde el cache o con una única consulta
+    que solo trae la columna rol.nombre (sin cargar el perfil ni las relaciones).
+    """
+    roles = user_role_cache.get(user_id)
+    if roles is not None:
+        return roles
+
+    result = await db.execute(
+        select(RolModel.nombre)
+        .join(UsuarioRolModel, UsuarioRolModel.id_rol == RolModel.id)
+        .where(UsuarioRolModel.id_usuario == uuid.UUID(user_id))
+    )
+    roles = list(result.scalars().all())
+    user_role_cache.set(user_id, roles)
+    return roles
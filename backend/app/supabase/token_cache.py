@@ -0,0 +1,119 @@
+#cache en memoria de los usuarios ya validados, indexado por hash del access token
+# app/supabase/token_cache.py
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import jwt
+
+from app.core.config import AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TTL_SECONDS
+from app.schemas.auth_user import SupabaseUser
+
+
+def hash_token(token: str) -> str:
+    """
+    Nunca se guarda el token en claro, solo su hash SHA-256.
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def unverified_claims(token: str) -> Dict[str, Any]:
+    """
+    Lee los claims sin verificar la firma. Solo se usa con tokens que ya fueron validados
+    por GoTrue, o para acotar la vida de las entradas del cache.
+    """
+    try:
+        return jwt.decode(token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return {}
+
+
+def token_expiration(token: str) -> Optional[float]:
+    """
+    Lee el claim "exp" sin verificar la firma. Nunca se usa para decidir si el token es válido.
+    """
+    exp = unverified_claims(token).get("exp")
+    return float(exp) if exp is not None else None
+
+
+class TokenUserCache:
+    """
+    Cache LRU de SupabaseUser por token. Cada entrada vence a los `ttl_seconds` o al "exp"
+    del token, lo que ocurra primero. Los tokens invalidados (logout) quedan marcados como
+    revocados hasta su expiración.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[SupabaseUser, float]]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[SupabaseUser]:
+        key = hash_token(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        user, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user
+
+    def set(self, token: str, user: SupabaseUser, exp: Optional[float] = None) -> None:
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if exp is not None:
+            expires_at = min(expires_at, exp)
+        if expires_at <= time.time():
+            return
+
+        key = hash_token(token)
+        self._entries[key] = (user, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def is_revoked(self, token: str) -> bool:
+        if not self._revoked:
+            return False
+        return hash_token(token) in self._revoked
+
+    def invalidate(self, token: str) -> None:
+        """
+        Elimina la entrada del token y lo marca como revocado hasta su "exp".
+        """
+        key = hash_token(token)
+        self._entries.pop(key, None)
+
+        now = time.time()
+        self._revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+        self._revoked[key] = token_expiration(token) or now + self.ttl_seconds
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._revoked.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "revoked": len(self._revoked),
+        }
+
+
+user_token_cache = TokenUserCache(
+    max_size=AUTH_USER_CACHE_SIZE,
+    ttl_seconds=AUTH_USER_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,132 @@
+# app/utils/geocoding.py
+
+import asyncio
+import logging
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import GEOCODING_RTREE, GEOCODING_RTREE_TOLERANCE
+
+try:
+    # Opcional: sin shapely todo se resuelve en PostGIS
+    import shapely
+    from shapely import STRtree
+except ImportError:  # pragma: no cover - depende del entorno
+    shapely = None
+    STRtree = None
+
+logger = logging.getLogger(__name__)
+
+# (lon, lat) en SRID 4326
+Punto = Tuple[float, float]
+
+# Un punto por fila (WITH ORDINALITY conserva la posición); el LATERAL usa el índice GiST
+# de barrio.geom. Si un punto cae justo sobre un límite compartido gana el id menor.
+_SQL_PUNTOS_A_BARRIO = text("""
+    SELECT p.i, b.id_barrio
+    FROM unnest(CAST(:lons AS float8[]), CAST(:lats AS float8[])) WITH ORDINALITY AS p(lon, lat, i)
+    LEFT JOIN LATERAL (
+        SELECT id_barrio
+        FROM barrio
+        WHERE geom IS NOT NULL
+          AND ST_Intersects(geom, ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326))
+        ORDER BY id_barrio
+        LIMIT 1
+    ) b ON true
+""")
+
+_SQL_POLIGONOS_SIMPLIFICADOS = text("""
+    SELECT id_barrio, ST_AsBinary(ST_SimplifyPreserveTopology(geom, :tolerancia)) AS wkb
+    FROM barrio
+    WHERE geom IS NOT NULL
+""")
+
+
+class BarrioRTree:
+    """
+    R-tree en proceso (STRtree de shapely) sobre los polígonos simplificados de los barrios.
+
+    Como los polígonos están simplificados, solo se responde cuando el punto cae dentro de un
+    único polígono y a más de la tolerancia de su borde; en cualquier otro caso se devuelve
+    None y el punto se resuelve en PostGIS con el polígono exacto.
+    """
+
+    def __init__(self, tolerancia: float):
+        self.tolerancia = tolerancia
+        self.version: Optional[int] = None
+        self.listo = False
+        self._tree = None
+        self._ids: List[int] = []
+        self._poligonos = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def disponible(self) -> bool:
+        return GEOCODING_RTREE and shapely is not None
+
+    async def refresh(self, db: AsyncSession, version: Optional[int] = None) -> None:
+        if not self.disponible:
+            return
+        async with self._lock:
+            if self.listo and version is not None and version == self.version:
+                return
+            rows = (await db.execute(
+                _SQL_POLIGONOS_SIMPLIFICADOS, {"tolerancia": self.tolerancia}
+            )).all()
+            # Parsear WKB y armar el árbol es CPU puro: fuera del event loop
+            self._ids, self._poligonos, self._tree = await asyncio.to_thread(self._construir, rows)
+            self.version = version
+            self.listo = True
+            logger.info(f"🗺️ R-tree de barrios construido: {len(self._ids)} polígonos")
+
+    @staticmethod
+    def _construir(rows):
+        ids = [r[0] for r in rows]
+        poligonos = [shapely.from_wkb(r[1]) for r in rows]
+        for p in poligonos:
+            shapely.prepare(p)
+        return ids, poligonos, STRtree(poligonos)
+
+    def lookup(self, lon: float, lat: float) -> Optional[int]:
+        if not self.listo or self._tree is None:
+            return None
+        punto = shapely.Point(lon, lat)
+        candidatos = self._tree.query(punto, predicate="intersects")
+        if len(candidatos) != 1:
+            return None
+        poligono = self._poligonos[candidatos[0]]
+        if shapely.distance(poligono.boundary, punto) <= self.tolerancia:
+            return None
+        return self._ids[candidatos[0]]
+
+
+barrio_rtree = BarrioRTree(GEOCODING_RTREE_TOLERANCE)
+
+
+async def resolver_barrios(db: AsyncSession, puntos: Sequence[Punto]) -> List[Tuple[Optional[int], str]]:
+    """
+    Devuelve, para cada punto (lon, lat), el id del barrio que lo contiene (o None) y la
+    fuente que lo resolvió ("rtree" o "postgis"). Los puntos que el R-tree no resuelve con
+    certeza se envían todos juntos a PostGIS en una sola consulta.
+    """
+    resultado: List[Tuple[Optional[int], str]] = [(None, "postgis")] * len(puntos)
+    pendientes: List[int] = []
+
+    for i, (lon, lat) in enumerate(puntos):
+        id_barrio = barrio_rtree.lookup(lon, lat)
+        if id_barrio is not None:
+            resultado[i] = (id_barrio, "rtree")
+        else:
+            pendientes.append(i)
+
+    if pendientes:
+        rows = (await db.execute(_SQL_PUNTOS_A_BARRIO, {
+            "lons": [puntos[i][0] for i in pendientes],
+            "lats": [puntos[i][1] for i in pendientes],
+        })).all()
+        for ordinal, id_barrio in rows:
+            resultado[pendientes[ordinal - 1]] = (id_barrio, "postgis")
+
+    return resultado
@@ -0,0 +1,270 @@
+# app/utils/idempotency.py
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, null, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import (
+    IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_WAIT_SECONDS,
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS, IDEMPOTENCY_FINGERPRINT_SECRET,
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS, IDEMPOTENCY_PURGE_BATCH,
+)
+from app.models.idempotency_key import IdempotencyKey
+from app.supabase.db.db_supabase import get_async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+# Header que se agrega a las respuestas repetidas
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# (alcance, endpoint, clave)
+_Id = Tuple[str, str, str]
+
+# Requests en curso en este worker: los duplicados que llegan al mismo proceso se despiertan
+# apenas termina el original en lugar de esperar al próximo sondeo de la tabla
+_locales: Dict[_Id, asyncio.Event] = {}
+
+# Momento (monotónico) de la última purga de keys vencidas en este worker
+_purgado_at = 0.0
+
+# Para avisar una sola vez por worker que la idempotencia está deshabilitada
+_aviso_sin_clave = False
+
+
+def idempotencia_habilitada() -> bool:
+    """
+    Sin clave para el HMAC la huella de un signup sería un hash sin clave de la contraseña,
+    así que los endpoints ignoran el header Idempotency-Key (y se avisa en el log).
+    """
+    global _aviso_sin_clave
+    if IDEMPOTENCY_FINGERPRINT_SECRET:
+        return True
+    if not _aviso_sin_clave:
+        _aviso_sin_clave = True
+        logger.warning(
+            "⚠️ Falta IDEMPOTENCY_FINGERPRINT_SECRET (o SUPABASE_JWT_SECRET): se ignora el header "
+            "Idempotency-Key hasta configurar la clave del HMAC de las huellas."
+        )
+    return False
+
+
+def huella_request(*partes: Any) -> str:
+    """
+    HMAC-SHA256 de las partes del request (serializadas como JSON canónico). Con la clave del
+    servidor, guardar la huella de un signup no expone un hash directo de la contraseña.
+    Solo se llama si idempotencia_habilitada().
+    """
+    if not IDEMPOTENCY_FINGERPRINT_SECRET:
+        raise RuntimeError("huella_request sin IDEMPOTENCY_FINGERPRINT_SECRET")
+    cuerpo = json.dumps(jsonable_encoder(partes), sort_keys=True, separators=(",", ":"))
+    return hmac.new(IDEMPOTENCY_FINGERPRINT_SECRET.encode(), cuerpo.encode(), hashlib.sha256).hexdigest()
+
+
+async def _reservar(id: _Id, request_hash: str, propietario: uuid.UUID) -> bool:
+    """
+    Inserta la fila 'en_curso' a nombre de `propietario`. Si ya existe solo se la toma cuando
+    venció o quedó abandonada (en curso hace más de IDEMPOTENCY_LOCK_TIMEOUT_SECONDS).
+    Devuelve True si este request quedó a cargo.
+    """
+    ahora = datetime.now(timezone.utc)
+    stmt = insert(IdempotencyKey).values(
+        alcance=id[0], endpoint=id[1], clave=id[2],
+        request_hash=request_hash, estado="en_curso", propietario=propietario,
+        locked_at=ahora, created_at=ahora,
+        expires_at=ahora + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.alcance, IdempotencyKey.endpoint, IdempotencyKey.clave],
+        set_={
+            "request_hash": stmt.excluded.request_hash,
+            "estado": "en_curso",
+            "propietario": stmt.excluded.propietario,
+            "status_code": None,
+            "respuesta": null(),
+            "locked_at": stmt.excluded.locked_at,
+            "created_at": stmt.excluded.created_at,
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=or_(
+            IdempotencyKey.expires_at < ahora,
+            (IdempotencyKey.estado == "en_curso")
+            & (IdempotencyKey.locked_at < ahora - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT_SECONDS)),
+        ),
+    ).returning(IdempotencyKey.propietario)
+
+    async with get_async_sessionmaker()() as db:
+        await _purgar_vencidas(db, ahora)
+        reservada = (await db.execute(stmt)).scalar_one_or_none()
+        await db.commit()
+    return reservada == propietario
+
+
+async def _purgar_vencidas(db, ahora: datetime) -> None:
+    """
+    Borra un lote de keys vencidas (por el índice de expires_at), como máximo una vez cada
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS por worker, para que la tabla no crezca sin límite.
+    """
+    global _purgado_at
+    if time.monotonic() - _purgado_at < IDEMPOTENCY_PURGE_INTERVAL_SECONDS:
+        return
+    _purgado_at = time.monotonic()
+
+    pk = (IdempotencyKey.alcance, IdempotencyKey.endpoint, IdempotencyKey.clave)
+    vencidas = select(*pk).where(IdempotencyKey.expires_at < ahora).limit(IDEMPOTENCY_PURGE_BATCH)
+    result = await db.execute(
+        delete(IdempotencyKey).where(tuple_(*pk).in_(vencidas))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        logger.info(f"🧹 {result.rowcount} Idempotency-Key vencida(s) eliminadas")
+
+
+async def _leer(id: _Id) -> Optional[Any]:
+    async with get_async_sessionmaker()() as db:
+        result = await db.execute(
+            select(
+                IdempotencyKey.request_hash, IdempotencyKey.estado,
+                IdempotencyKey.status_code, IdempotencyKey.respuesta,
+            ).where(
+                IdempotencyKey.alcance == id[0],
+                IdempotencyKey.endpoint == id[1],
+                IdempotencyKey.clave == id[2],
+            )
+        )
+        return result.one_or_none()
+
+
+async def _completar(id: _Id, propietario: uuid.UUID, status_code: int, respuesta: Any) -> None:
+    async with get_async_sessionmaker()() as db:
+        await db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.alcance == id[0],
+                IdempotencyKey.endpoint == id[1],
+                IdempotencyKey.clave == id[2],
+                IdempotencyKey.propietario == propietario,
+            )
+            .values(estado="completada", status_code=status_code, respuesta=respuesta)
+        )
+        await db.commit()
+
+
+async def _liberar(id: _Id, propietario: uuid.UUID) -> None:
+    async with get_async_sessionmaker()() as db:
+        await db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.alcance == id[0],
+                IdempotencyKey.endpoint == id[1],
+                IdempotencyKey.clave == id[2],
+                IdempotencyKey.propietario == propietario,
+            )
+        )
+        await db.commit()
+
+
+async def _esperar(id: _Id, segundos: float) -> None:
+    evento = _locales.get(id)
+    if evento is None:
+        await asyncio.sleep(segundos)
+        return
+    try:
+        await asyncio.wait_for(evento.wait(), segundos)
+    except asyncio.TimeoutError:
+        pass
+
+
+def _repetir(status_code: int, respuesta: Any) -> JSONResponse:
+    if status_code >= 400:
+        # Los errores se guardan como {"detail": ...}: se repiten igual que una HTTPException
+        raise HTTPException(status_code=status_code, detail=(respuesta or {}).get("detail"),
+                            headers={REPLAY_HEADER: "true"})
+    return JSONResponse(status_code=status_code, content=respuesta, headers={REPLAY_HEADER: "true"})
+
+
+async def ejecutar_idempotente(
+    alcance: str,
+    endpoint: str,
+    clave: str,
+    request_hash: str,
+    operacion: Callable[[], Awaitable[Any]],
+    status_code: int = status.HTTP_200_OK,
+    respuesta_guardada: Optional[Callable[[Any], Any]] = None,
+) -> Any:
+    """
+    Ejecuta `operacion` una sola vez por (alcance, endpoint, clave):
+    - El primer request reserva la key y ejecuta la operación. Su respuesta (o su error 4xx)
+      se guarda; un error 5xx o una excepción libera la key para que el cliente reintente.
+      Con `respuesta_guardada` se guarda (y se repite) lo que devuelva esa función a partir
+      del resultado, para no persistir datos sensibles como tokens de sesión.
+    - Un duplicado con la key completada recibe la respuesta guardada, con el header
+      Idempotent-Replayed, sin volver a ejecutar nada.
+    - Un duplicado con la key en curso espera hasta IDEMPOTENCY_WAIT_SECONDS a que termine;
+      si no termina responde 409.
+    - La misma key con otro cuerpo de request se rechaza con 422.
+
+    Las filas se leen y escriben en sesiones propias, independientes de la sesión del endpoint,
+    así quedan confirmadas aunque la transacción del endpoint falle.
+    """
+    id = (alcance, endpoint, clave)
+    propietario = uuid.uuid4()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+    delay = 0.05
+
+    while True:
+        if await _reservar(id, request_hash, propietario):
+            break
+
+        fila = await _leer(id)
+        if fila is not None:
+            if fila.request_hash != request_hash:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="La Idempotency-Key ya se usó con un request distinto."
+                )
+            if fila.estado == "completada":
+                logger.info(f"🔁 Respuesta repetida por Idempotency-Key en {endpoint}")
+                return _repetir(fila.status_code, fila.respuesta)
+
+        # En curso (o liberada justo ahora): esperar y volver a intentar
+        if loop.time() + delay > deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Hay un request en curso con la misma Idempotency-Key. Reintente más tarde.",
+                headers={"Retry-After": "1"},
+            )
+        await _esperar(id, delay)
+        delay = min(delay * 2, 1.0)
+
+    evento = _locales.setdefault(id, asyncio.Event())
+    try:
+        try:
+            resultado = await operacion()
+        except HTTPException as e:
+            if e.status_code < 500:
+                await _completar(id, propietario, e.status_code, {"detail": jsonable_encoder(e.detail)})
+            else:
+                await _liberar(id, propietario)
+            raise
+        except BaseException:
+            await _liberar(id, propietario)
+            raise
+
+        guardada = respuesta_guardada(resultado) if respuesta_guardada else resultado
+        await _completar(id, propietario, status_code, jsonable_encoder(guardada))
+        return resultado
+    finally:
+        _locales.pop(id, None)
+        evento.set()
@@ -0,0 +1,290 @@
+# app/utils/location_index.py
+
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.empresa.departamento import Departamento
+from app.models.empresa.ciudad import Ciudad
+from app.models.empresa.barrio import Barrio
+
+logger = logging.getLogger(__name__)
+
+# (tipo, id) identifica una entrada del índice: ("barrio", 12) o ("ciudad", 3)
+Clave = Tuple[str, int]
+
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9]+")
+
+
+def normalizar(texto: str) -> str:
+    """
+    Minúsculas, sin tildes ni diéresis (la ñ queda como n) y con la puntuación como espacios.
+    """
+    sin_tildes = "".join(
+        c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c)
+    )
+    return _NO_ALFANUMERICO.sub(" ", sin_tildes.lower()).strip()
+
+
+def trigramas(texto_normalizado: str) -> Set[str]:
+    """
+    Trigramas por palabra, con el mismo relleno que pg_trgm ("  pa", " pal", ..., "ra ").
+    """
+    resultado: Set[str] = set()
+    for palabra in texto_normalizado.split():
+        relleno = f"  {palabra} "
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return resultado
+
+
+class EntradaUbicacion:
+    """
+    Un barrio o ciudad indexado, con su ruta completa (barrio, ciudad, departamento).
+    """
+
+    __slots__ = (
+        "tipo", "id", "nombre", "normalizado", "trigramas",
+        "id_ciudad", "ciudad", "id_departamento", "departamento",
+    )
+
+    def __init__(self, tipo: str, id: int, nombre: str, id_ciudad: Optional[int], ciudad: Optional[str],
+                 id_departamento: Optional[int], departamento: Optional[str]):
+        self.tipo = tipo
+        self.id = id
+        self.nombre = nombre
+        self.normalizado = normalizar(nombre)
+        self.trigramas = trigramas(self.normalizado)
+        self.id_ciudad = id_ciudad
+        self.ciudad = ciudad
+        self.id_departamento = id_departamento
+        self.departamento = departamento
+
+    @property
+    def ruta(self) -> str:
+        partes = [self.nombre]
+        if self.tipo == "barrio" and self.ciudad:
+            partes.append(self.ciudad)
+        if self.departamento:
+            partes.append(self.departamento)
+        return ", ".join(partes)
+
+    def to_dict(self, score: float) -> dict:
+        return {
+            "tipo": self.tipo,
+            "id": self.id,
+            "nombre": self.nombre,
+            "ruta": self.ruta,
+            "id_ciudad": self.id_ciudad,
+            "ciudad": self.ciudad,
+            "id_departamento": self.id_departamento,
+            "departamento": self.departamento,
+            "score": round(score, 3),
+        }
+
+
+class LocationSearchIndex:
+    """
+    Índice en memoria para autocompletar barrios y ciudades sin consultar la base.
+
+    - Prefijos: lista ordenada de (sufijo de palabras normalizado, tipo, id); por cada nombre se
+      guarda el nombre completo y cada sufijo que empieza en una palabra ("san vicente", "vicente"),
+      así "vic" y "san vic" se resuelven con una búsqueda binaria.
+    - Trigramas: posting lists trigrama -> claves, para tolerar errores de tipeo (similaridad
+      de Jaccard, como pg_trgm).
+
+    `refresh` vuelve a leer id/nombre/padre de las tres tablas y aplica solo las diferencias.
+    """
+
+    def __init__(self, umbral_similitud: float = 0.3, max_candidatos_prefijo: int = 500):
+        self.umbral_similitud = umbral_similitud
+        self.max_candidatos_prefijo = max_candidatos_prefijo
+        self.version: Optional[int] = None
+        self.listo = False
+        self._entradas: Dict[Clave, EntradaUbicacion] = {}
+        self._prefijos: List[Tuple[str, str, int]] = []
+        self._trigramas: Dict[str, Set[Clave]] = defaultdict(set)
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def get(self, tipo: str, id: int) -> Optional[EntradaUbicacion]:
+        return self._entradas.get((tipo, id))
+
+    # --- mantenimiento ---
+
+    @staticmethod
+    def _sufijos(normalizado: str) -> List[str]:
+        palabras = normalizado.split()
+        return [" ".join(palabras[i:]) for i in range(len(palabras))]
+
+    def _agregar(self, entrada: EntradaUbicacion, ordenar: bool = True) -> None:
+        clave = (entrada.tipo, entrada.id)
+        self._entradas[clave] = entrada
+        for sufijo in self._sufijos(entrada.normalizado):
+            if ordenar:
+                bisect.insort(self._prefijos, (sufijo, entrada.tipo, entrada.id))
+            else:
+                self._prefijos.append((sufijo, entrada.tipo, entrada.id))
+        for t in entrada.trigramas:
+            self._trigramas[t].add(clave)
+
+    def _quitar(self, clave: Clave) -> None:
+        entrada = self._entradas.pop(clave, None)
+        if entrada is None:
+            return
+        for sufijo in self._sufijos(entrada.normalizado):
+            item = (sufijo, entrada.tipo, entrada.id)
+            i = bisect.bisect_left(self._prefijos, item)
+            if i < len(self._prefijos) and self._prefijos[i] == item:
+                del self._prefijos[i]
+        for t in entrada.trigramas:
+            claves = self._trigramas.get(t)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._trigramas[t]
+
+    async def refresh(self, db: AsyncSession, version: Optional[int] = None) -> None:
+        """
+        Lee las ubicaciones (solo id, nombre y padre) y actualiza el índice: agrega las nuevas,
+        quita las borradas y reindexa las que cambiaron de nombre o de ruta.
+        """
+        async with self._lock:
+            if self.listo and version is not None and version == self.version:
+                return
+
+            departamentos = dict((await db.execute(
+                select(Departamento.id_departamento, Departamento.nombre)
+            )).all())
+            ciudades = {
+                r[0]: (r[1], r[2]) for r in (await db.execute(
+                    select(Ciudad.id_ciudad, Ciudad.nombre, Ciudad.id_departamento)
+                )).all()
+            }
+            barrios = (await db.execute(
+                select(Barrio.id_barrio, Barrio.nombre, Barrio.id_ciudad)
+            )).all()
+
+            nuevas: Dict[Clave, EntradaUbicacion] = {}
+            for id_ciudad, (nombre, id_departamento) in ciudades.items():
+                nuevas[("ciudad", id_ciudad)] = EntradaUbicacion(
+                    "ciudad", id_ciudad, nombre, id_ciudad, nombre,
+                    id_departamento, departamentos.get(id_departamento),
+                )
+            for id_barrio, nombre, id_ciudad in barrios:
+                ciudad, id_departamento = ciudades.get(id_ciudad, (None, None))
+                nuevas[("barrio", id_barrio)] = EntradaUbicacion(
+                    "barrio", id_barrio, nombre, id_ciudad, ciudad,
+                    id_departamento, departamentos.get(id_departamento),
+                )
+
+            if not self._entradas:
+                # Construcción inicial: se agregan todas y se ordena una sola vez
+                for entrada in nuevas.values():
+                    self._agregar(entrada, ordenar=False)
+                self._prefijos.sort()
+                self.version = version
+                self.listo = True
+                logger.info(f"🔎 Índice de ubicaciones construido: {len(self)} entradas")
+                return
+
+            cambios = 0
+            for clave in [c for c in self._entradas if c not in nuevas]:
+                self._quitar(clave)
+                cambios += 1
+            for clave, entrada in nuevas.items():
+                actual = self._entradas.get(clave)
+                if actual is not None and actual.nombre == entrada.nombre:
+                    if actual.ruta != entrada.ruta:
+                        # Mismo nombre (mismos tokens): alcanza con reemplazar la entrada
+                        self._entradas[clave] = entrada
+                        cambios += 1
+                    continue
+                if actual is not None:
+                    self._quitar(clave)
+                self._agregar(entrada)
+                cambios += 1
+
+            self.version = version
+            self.listo = True
+            logger.info(f"🔎 Índice de ubicaciones actualizado: {cambios} cambio(s), {len(self)} entradas")
+
+    # --- búsqueda ---
+
+    def _aproximados(self, consulta: str, tipo: Optional[str]) -> List[Tuple[Clave, float]]:
+        """
+        Entradas con similitud de trigramas >= umbral. Para llegar al umbral una entrada debe
+        compartir al menos ceil(umbral * |Q|) trigramas de la consulta, así que alcanza con
+        buscar candidatos en las |Q| - ese mínimo + 1 posting lists más cortas y luego
+        calcular la similitud exacta solo sobre ellos.
+        """
+        trigramas_consulta = trigramas(consulta)
+        if not trigramas_consulta:
+            return []
+        minimo = max(1, math.ceil(self.umbral_similitud * len(trigramas_consulta)))
+        listas = sorted(
+            (self._trigramas.get(t, ()) for t in trigramas_consulta), key=len
+        )[:len(trigramas_consulta) - minimo + 1]
+
+        candidatos: Set[Clave] = set()
+        for claves in listas:
+            candidatos.update(claves)
+
+        resultado = []
+        for clave in candidatos:
+            if tipo and clave[0] != tipo:
+                continue
+            entrada = self._entradas[clave]
+            n = len(trigramas_consulta & entrada.trigramas)
+            similitud = n / (len(trigramas_consulta) + len(entrada.trigramas) - n)
+            if similitud >= self.umbral_similitud:
+                resultado.append((clave, similitud))
+        return resultado
+
+    def search(self, q: str, limit: int = 10, tipo: Optional[str] = None) -> List[dict]:
+        """
+        Busca primero por prefijo (inicio del nombre o de cualquiera de sus palabras) y completa
+        con coincidencias aproximadas por trigramas. No accede a la base.
+        """
+        consulta = normalizar(q)
+        if not consulta:
+            return []
+
+        puntajes: Dict[Clave, float] = {}
+
+        inicio = bisect.bisect_left(self._prefijos, (consulta,))
+        for sufijo, tipo_entrada, id_entrada in self._prefijos[inicio:inicio + self.max_candidatos_prefijo]:
+            if not sufijo.startswith(consulta):
+                break
+            if tipo and tipo_entrada != tipo:
+                continue
+            clave = (tipo_entrada, id_entrada)
+            entrada = self._entradas[clave]
+            # Coincidencia al inicio del nombre puntúa más que en una palabra intermedia
+            puntaje = 1.0 if entrada.normalizado.startswith(consulta) else 0.9
+            puntajes[clave] = max(puntajes.get(clave, 0.0), puntaje)
+
+        if len(puntajes) < limit:
+            for clave, similitud in self._aproximados(consulta, tipo):
+                if clave not in puntajes:
+                    puntajes[clave] = 0.8 * similitud
+
+        mejores = heapq.nsmallest(
+            limit,
+            puntajes.items(),
+            key=lambda kv: (-kv[1], len(self._entradas[kv[0]].nombre), self._entradas[kv[0]].normalizado),
+        )
+        return [self._entradas[clave].to_dict(puntaje) for clave, puntaje in mejores]
+
+
+location_index = LocationSearchIndex()
@@ -0,0 +1,177 @@
+# app/utils/proveedores_geo.py
+
+import json
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# (min_lon, min_lat, max_lon, max_lat) en SRID 4326
+BBox = Tuple[float, float, float, float]
+
+
+# Punto de búsqueda como geografía (lado derecho constante del operador KNN)
+_PUNTO = "ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography"
+
+_COLUMNAS = {
+    "empresa": "'empresa' AS tipo, pe.id_perfil AS id, pe.id_perfil, "
+               "pe.nombre_fantasia AS nombre, pe.nombre_fantasia",
+    "sucursal": "'sucursal' AS tipo, s.id_sucursal AS id, s.id_perfil, "
+                "s.nombre, pe.nombre_fantasia",
+}
+_JOIN = {
+    "empresa": "JOIN perfil_empresa pe ON pe.id_direccion = d.id_direccion AND pe.verificado",
+    "sucursal": "JOIN sucursal_empresa s ON s.id_direccion = d.id_direccion "
+                "JOIN perfil_empresa pe ON pe.id_perfil = s.id_perfil AND pe.verificado",
+}
+_ID = {"empresa": "pe.id_perfil", "sucursal": "s.id_sucursal"}
+
+
+def _rama_sql(tipo: str, filtro: str) -> str:
+    return f"""
+        SELECT {_COLUMNAS[tipo]}, d.id_direccion, d.coordenadas
+        FROM direccion d
+        {_JOIN[tipo]}
+        WHERE d.coordenadas IS NOT NULL AND {filtro}
+    """
+
+
+def proveedores_verificados_sql(filtro: str) -> str:
+    """
+    Subconsulta con las empresas verificadas (su dirección principal) y sus sucursales que
+    tienen coordenadas. `filtro` es una condición sobre `d.coordenadas` que se repite en
+    ambas ramas del UNION ALL, para que cada una arranque por el índice GiST de direccion.
+    """
+    return f"{_rama_sql('empresa', filtro)} UNION ALL {_rama_sql('sucursal', filtro)}"
+
+
+def _rama_cercanos_sql(tipo: str, filtro: str, keyset: bool) -> str:
+    """
+    Una rama de la búsqueda por cercanía, ordenada solo por `<->` (una segunda clave de orden
+    impide el recorrido KNN del índice) y cortada en :limit incluyendo los empates en la
+    distancia de corte, para que el desempate por (tipo, id) del query externo vea todos los
+    candidatos. Con `keyset` la clave del cursor se aplica dentro de la rama (tipo es constante
+    en ella) como filtro del recorrido.
+    """
+    distancia = f"d.coordenadas::geography <-> {_PUNTO}"
+    despues = ""
+    if keyset:
+        despues = (
+            f"AND ({distancia}, '{tipo}', {_ID[tipo]}) > "
+            "(CAST(:after_dist AS float8), CAST(:after_tipo AS text), CAST(:after_id AS bigint))"
+        )
+    return f"""
+        (SELECT {_COLUMNAS[tipo]}, d.id_direccion,
+                ST_Y(d.coordenadas) AS lat, ST_X(d.coordenadas) AS lon, {distancia} AS distancia_m
+         FROM direccion d
+         {_JOIN[tipo]}
+         WHERE d.coordenadas IS NOT NULL AND {filtro} {despues}
+         ORDER BY distancia_m
+         FETCH FIRST (:limit) ROWS WITH TIES)
+    """
+
+
+async def buscar_proveedores_cercanos(
+    db: AsyncSession,
+    lat: float,
+    lon: float,
+    limit: int,
+    radio_m: Optional[float] = None,
+    bbox: Optional[BBox] = None,
+    after: Optional[Sequence[Any]] = None,
+) -> List[Any]:
+    """
+    Proveedores verificados dentro de un radio (metros) o de un bounding box, ordenados por
+    distancia al punto (lat, lon). `after` es la clave (distancia_m, tipo, id) de la última
+    fila de la página anterior: la página siguiente empieza estrictamente después de ella.
+
+    Cada rama ordena con el operador KNN `<->` sobre el índice GiST de la geografía, así la
+    base recorre el índice desde el punto hacia afuera y se detiene a las `limit` filas en
+    lugar de calcular la distancia de todo el radio y ordenarlo. distancia_m es ese mismo
+    valor (esférico, en metros), por lo que el orden y el cursor son consistentes.
+    """
+    params = {"lat": lat, "lon": lon, "limit": limit}
+
+    if bbox is not None:
+        filtro = "d.coordenadas && ST_MakeEnvelope(:min_lon, :min_lat, :max_lon, :max_lat, 4326)"
+        params.update(zip(("min_lon", "min_lat", "max_lon", "max_lat"), bbox))
+    else:
+        filtro = f"ST_DWithin(d.coordenadas::geography, {_PUNTO}, :radio_m)"
+        params["radio_m"] = radio_m
+
+    if after is not None:
+        params.update(after_dist=after[0], after_tipo=after[1], after_id=after[2])
+
+    ramas = " UNION ALL ".join(_rama_cercanos_sql(t, filtro, after is not None) for t in _COLUMNAS)
+    sql = text(f"""
+        SELECT r.* FROM ({ramas}) r
+        ORDER BY r.distancia_m, r.tipo, r.id
+        LIMIT :limit
+    """)
+    result = await db.execute(sql, params)
+    return result.mappings().all()
+
+
+# Lado del mundo en Web Mercator (EPSG:3857), en metros
+_MUNDO_3857 = 40075016.68557849
+
+
+def _tile_items_sql(clusterizar: bool) -> str:
+    """
+    Puntos de proveedores verificados dentro del tile, en EPSG:3857. Con `clusterizar`, los
+    puntos se agrupan en una grilla de :celda metros: cada grupo es un punto (centroide) con
+    su cantidad; los datos del proveedor solo se incluyen si el grupo tiene uno solo.
+    """
+    filtro = "d.coordenadas && ST_Transform(ST_TileEnvelope(:z, :x, :y), 4326)"
+    puntos = f"""
+        SELECT p.tipo, p.id, p.id_perfil, p.nombre, ST_Transform(p.coordenadas, 3857) AS g
+        FROM ({proveedores_verificados_sql(filtro)}) p
+    """
+    if not clusterizar:
+        return f"SELECT 1 AS cantidad, tipo, id, id_perfil, nombre, g FROM ({puntos}) pts"
+    return f"""
+        SELECT count(*) AS cantidad,
+               CASE WHEN count(*) = 1 THEN min(tipo) END AS tipo,
+               CASE WHEN count(*) = 1 THEN min(id) END AS id,
+               CASE WHEN count(*) = 1 THEN min(id_perfil) END AS id_perfil,
+               CASE WHEN count(*) = 1 THEN min(nombre) END AS nombre,
+               ST_Centroid(ST_Collect(g)) AS g
+        FROM ({puntos}) pts
+        GROUP BY ST_SnapToGrid(g, :celda)
+    """
+
+
+async def generar_tile(
+    db: AsyncSession, z: int, x: int, y: int, formato: str, clusterizar: bool, grilla: int
+) -> Tuple[bytes, int]:
+    """
+    Genera un tile z/x/y con los proveedores verificados. Devuelve el cuerpo y la cantidad de
+    puntos (o grupos) que contiene.
+    - "mvt": Mapbox Vector Tile (capa "proveedores", extent 4096) generado por PostGIS.
+    - "json": columnas paralelas lon/lat/cantidad/tipo/id/id_perfil/nombre.
+    """
+    params = {"z": z, "x": x, "y": y, "celda": _MUNDO_3857 / (2 ** z) / grilla}
+    items = _tile_items_sql(clusterizar)
+
+    if formato == "mvt":
+        result = await db.execute(text(f"""
+            SELECT ST_AsMVT(t, 'proveedores', 4096, 'geom'), count(*)
+            FROM (
+                SELECT cantidad, tipo, id, id_perfil, nombre,
+                       ST_AsMVTGeom(g, ST_TileEnvelope(:z, :x, :y), 4096, 64, true) AS geom
+                FROM ({items}) i
+            ) t
+        """), params)
+        tile, cantidad = result.one()
+        return bytes(tile or b""), cantidad
+
+    rows = (await db.execute(text(f"""
+        SELECT ST_X(ST_Transform(g, 4326)) AS lon, ST_Y(ST_Transform(g, 4326)) AS lat,
+               cantidad, tipo, id, id_perfil, nombre
+        FROM ({items}) i
+        ORDER BY cantidad DESC
+    """), params)).all()
+    columnas = ("lon", "lat", "cantidad", "tipo", "id", "id_perfil", "nombre")
+    cuerpo = {"z": z, "x": x, "y": y, "clusterizado": clusterizar}
+    cuerpo.update({c: [r[i] for r in rows] for i, c in enumerate(columnas)})
+    return json.dumps(cuerpo, separators=(",", ":"), ensure_ascii=False).encode(), len(rows)
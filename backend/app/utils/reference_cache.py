@@ -0,0 +1,210 @@
+# app/utils/reference_cache.py
+
+import asyncio
+import gzip
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cache_version import CacheVersion
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+class CachedPayload:
+    """
+    Respuesta JSON ya serializada, con su ETag (hash del contenido) y la cantidad de
+    elementos que contiene. La versión comprimida con gzip se genera una sola vez, al pedirla,
+    y tiene su propio ETag (son representaciones distintas del mismo recurso).
+    """
+
+    __slots__ = ("body", "etag", "items", "created_at", "_gzip_body")
+
+    def __init__(self, body: bytes, items: int, etag: Optional[str] = None):
+        self.body = body
+        self.items = items
+        self.etag = f'"{etag or content_hash(body)}"'
+        self.created_at = time.monotonic()
+        self._gzip_body: Optional[bytes] = None
+
+    @property
+    def gzip_etag(self) -> str:
+        return f'{self.etag[:-1]}-gzip"'
+
+    @property
+    def gzip_body(self) -> bytes:
+        if self._gzip_body is None:
+            self._gzip_body = gzip.compress(self.body, compresslevel=6)
+        return self._gzip_body
+
+
+class ReferenceDataCache:
+    """
+    Cache en proceso de respuestas de datos de referencia, ya serializadas a bytes.
+
+    La validez se controla con el contador `nombre` de la tabla cache_version, que los
+    triggers de la base incrementan cuando cambian las tablas del grupo. Cada worker lo
+    consulta como máximo cada `check_seconds`; si cambió, descarta todas sus entradas.
+    Con `max_entries` se comporta como LRU (para claves no acotadas, como los tiles del mapa).
+    """
+
+    def __init__(self, nombre: str, check_seconds: float, max_age_seconds: float,
+                 max_entries: Optional[int] = None):
+        self.nombre = nombre
+        self.check_seconds = check_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_entries = max_entries
+        self.version: Optional[int] = None
+        self._checked_at = 0.0
+        self._entries: "OrderedDict[str, CachedPayload]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """
+        Consulta la versión en la base si pasó el intervalo de chequeo y descarta el
+        cache cuando cambió.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = now
+
+        try:
+            result = await db.execute(
+                select(CacheVersion.version).where(CacheVersion.nombre == self.nombre)
+            )
+            version = result.scalar_one_or_none()
+        except Exception as e:
+            # Sin tabla de versiones se sigue sirviendo el cache, acotado por max_age_seconds
+            logger.warning(f"No se pudo consultar la versión del cache '{self.nombre}': {e}")
+            await db.rollback()
+            return
+
+        if version != self.version:
+            if self.version is not None:
+                logger.info(f"Cache '{self.nombre}' invalidado: versión {self.version} -> {version}")
+            self.version = version
+            self._entries.clear()
+
+    def get(self, key: str) -> Optional[CachedPayload]:
+        payload = self._entries.get(key)
+        if payload is None:
+            return None
+        if time.monotonic() - payload.created_at > self.max_age_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def put(self, key: str, body: bytes, items: int, etag: Optional[str] = None) -> CachedPayload:
+        payload = CachedPayload(body, items, etag)
+        self._entries[key] = payload
+        self._entries.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+    async def get_or_load(
+        self, key: str, loader: Callable[[], Awaitable[Tuple]], cache_empty: bool = True
+    ) -> CachedPayload:
+        """
+        Devuelve la entrada cacheada o la carga con `loader` (que retorna el JSON serializado,
+        la cantidad de elementos y, opcionalmente, el ETag). Solo una carga por clave a la vez.
+        Con `cache_empty=False` un resultado sin elementos se devuelve sin guardarlo, para que
+        claves arbitrarias del cliente (ids inexistentes) no hagan crecer el cache.
+        """
+        payload = self.get(key)
+        if payload is not None:
+            return payload
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                payload = self.get(key)
+                if payload is None:
+                    cargado = await loader()
+                    if cache_empty or cargado[1]:
+                        payload = self.put(key, *cargado)
+                    else:
+                        payload = CachedPayload(*cargado)
+        finally:
+            if not lock.locked() and self._locks.get(key) is lock:
+                del self._locks[key]
+        return payload
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+        self._checked_at = 0.0
+
+
+def acepta_gzip(accept_encoding: str) -> bool:
+    """
+    Si un header Accept-Encoding admite gzip: con q > 0 para "gzip" (o "x-gzip") o, si no
+    figura, para "*". Un q mal formado cuenta como 0.
+    """
+    calidades: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            nombre, _, valor = param.partition("=")
+            if nombre.strip() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        calidades[coding] = q
+
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in calidades:
+            return calidades[coding] > 0
+    return False
+
+
+def cached_response(request: Request, payload: CachedPayload, max_age: int,
+                    media_type: str = "application/json", not_modified: bool = False) -> Response:
+    """
+    Arma la respuesta para una entrada del cache: 304 si el cliente ya tiene esa versión
+    (If-None-Match con el ETag de cualquiera de las dos representaciones, o `not_modified`
+    cuando el endpoint la validó por otra vía), o el cuerpo pre-serializado (comprimido si el
+    cliente acepta gzip, con el ETag de la versión comprimida).
+    """
+    comprimido = acepta_gzip(request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": payload.gzip_etag if comprimido else payload.etag,
+        "Cache-Control": f"public, max-age={max_age}, must-revalidate",
+        "Vary": "Accept-Encoding",
+    }
+
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in etags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        for etag in (payload.etag, payload.gzip_etag):
+            if etag in etags:
+                # El 304 lleva el ETag de la representación que el cliente tiene guardada
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={**headers, "ETag": etag})
+
+    if comprimido:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=payload.gzip_body, media_type=media_type, headers=headers)
+
+    return Response(content=payload.body, media_type=media_type, headers=headers)
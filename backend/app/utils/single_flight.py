@@ -0,0 +1,61 @@
+# app/utils/single_flight.py
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Deduplicación en proceso de llamadas concurrentes con la misma clave: la primera
+    llamada ejecuta la operación y las demás esperan y comparten su resultado (o su error).
+    Los resultados exitosos se conservan `result_ttl_seconds` para quienes llegan tarde.
+    """
+
+    def __init__(self, result_ttl_seconds: float, max_results: int = 1000):
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_results = max_results
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._results: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+
+    def _get_result(self, key: str) -> Tuple[bool, Any]:
+        entry = self._results.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._results[key]
+            return False, None
+        return True, value
+
+    def _store_result(self, key: str, value: Any) -> None:
+        if self.result_ttl_seconds <= 0:
+            return
+        self._results[key] = (value, time.monotonic() + self.result_ttl_seconds)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_results:
+            self._results.popitem(last=False)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        found, value = self._get_result(key)
+        if found:
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            # La operación corre en su propia tarea: si la request que la inició se cancela
+            # (cliente desconectado), las demás siguen esperando el mismo resultado.
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+
+            def _done(t: asyncio.Task) -> None:
+                self._inflight.pop(key, None)
+                if not t.cancelled() and t.exception() is None:
+                    self._store_result(key, t.result())
+
+            task.add_done_callback(_done)
+
+        return await asyncio.shield(task)
@@ -0,0 +1,337 @@
+# app/utils/verificaciones.py
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Valores válidos de verificacion_solicitud.estado
+ESTADOS_SOLICITUD = ("pendiente", "aprobada", "rechazada")
+
+
+def _escapar_like(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _filtros_solicitudes(
+    estado: Optional[str],
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+    empresa: Optional[str],
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Condiciones WHERE de la cola de solicitudes y sus parámetros. El estado va como literal
+    (ya validado contra ESTADOS_SOLICITUD) y no como parámetro: así también un plan genérico
+    reconoce el índice parcial de las pendientes.
+    """
+    condiciones: List[str] = []
+    params: Dict[str, Any] = {}
+    if estado is not None:
+        if estado not in ESTADOS_SOLICITUD:
+            raise ValueError(f"Estado de solicitud inválido: {estado}")
+        condiciones.append(f"vs.estado = '{estado}'")
+    if desde is not None:
+        condiciones.append("vs.fecha_solicitud >= :desde")
+        params["desde"] = desde
+    if hasta is not None:
+        condiciones.append("vs.fecha_solicitud < :hasta")
+        params["hasta"] = hasta
+    if empresa:
+        # Índices de trigramas sobre ambos nombres (pg_trgm) para el ILIKE con comodín inicial
+        condiciones.append("(pe.nombre_fantasia ILIKE :empresa OR pe.razon_social ILIKE :empresa)")
+        params["empresa"] = f"%{_escapar_like(empresa)}%"
+    return (" AND ".join(condiciones) or "true"), params
+
+
+_FROM_SOLICITUDES = """
+    FROM verificacion_solicitud vs
+    JOIN perfil_empresa pe ON pe.id_perfil = vs.id_perfil
+"""
+
+
+async def listar_solicitudes(
+    db: AsyncSession,
+    limit: int,
+    estado: Optional[str] = "pendiente",
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    empresa: Optional[str] = None,
+    after: Optional[Sequence[Any]] = None,
+) -> List[Any]:
+    """
+    Página de solicitudes de verificación, de la más antigua a la más nueva. `after` es la
+    clave (fecha_solicitud, id_verificacion) de la última fila de la página anterior.
+    """
+    where, params = _filtros_solicitudes(estado, desde, hasta, empresa)
+    params["limit"] = limit
+    if after is not None:
+        where += (
+            " AND (vs.fecha_solicitud, vs.id_verificacion) > "
+            "(CAST(:after_fecha AS timestamptz), CAST(:after_id AS bigint))"
+        )
+        params.update(after_fecha=after[0], after_id=after[1])
+
+    result = await db.execute(text(f"""
+        SELECT vs.id_verificacion, vs.fecha_solicitud, vs.fecha_revision, vs.estado, vs.comentario,
+               vs.id_perfil, pe.nombre_fantasia, pe.razon_social
+        {_FROM_SOLICITUDES}
+        WHERE {where}
+        ORDER BY vs.fecha_solicitud, vs.id_verificacion
+        LIMIT :limit
+    """), params)
+    return result.mappings().all()
+
+
+async def contar_solicitudes(
+    db: AsyncSession,
+    tope_exacto: int,
+    estado: Optional[str] = "pendiente",
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    empresa: Optional[str] = None,
+) -> Tuple[int, bool]:
+    """
+    Total de solicitudes que cumplen los filtros, sin un COUNT(*) sobre toda la tabla:
+    se cuentan a lo sumo `tope_exacto` + 1 filas (LIMIT) y, si se llega al tope, se usa la
+    estimación del planificador (EXPLAIN, sin ejecutar la consulta). Devuelve (total, estimado).
+    """
+    where, params = _filtros_solicitudes(estado, desde, hasta, empresa)
+    filas = f"SELECT 1 {_FROM_SOLICITUDES} WHERE {where}"
+
+    exacto = (await db.execute(
+        text(f"SELECT count(*) FROM ({filas} LIMIT :tope) t"), {**params, "tope": tope_exacto + 1}
+    )).scalar_one()
+    if exacto <= tope_exacto:
+        return exacto, False
+
+    plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {filas}"), params)).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimado = int(plan[0]["Plan"]["Plan Rows"])
+    return max(estimado, exacto), True
+
+
+# Estado que toma cada tabla según la decisión sobre la solicitud
+DECISIONES = {
+    "aprobar": {"solicitud": "aprobada", "perfil": "verificado", "verificado": True, "documento": "aprobado"},
+    "rechazar": {"solicitud": "rechazada", "perfil": "rechazado", "verificado": False, "documento": "rechazado"},
+}
+
+# Un único statement: las solicitudes pendientes pasan al estado de la decisión, sus perfiles
+# de empresa se marcan verificados (o rechazados, salvo que ya estuvieran verificados: rechazar
+# una nueva solicitud de un perfil verificado no le quita la verificación) y sus documentos aún
+# pendientes toman el mismo resultado. Todas las CTE ven la misma foto de la base, así que `anterior` tiene el estado
+# previo a la decisión. Como el UPDATE exige estado = 'pendiente', dos decisiones
+# concurrentes sobre la misma solicitud no se pisan: la segunda no actualiza nada.
+_SQL_DECIDIR_SOLICITUDES = text("""
+    WITH entrada AS (
+        SELECT *
+        FROM unnest(CAST(:ids AS bigint[]), CAST(:comentarios AS text[]))
+             WITH ORDINALITY AS e(id_verificacion, comentario, orden)
+    ),
+    anterior AS (
+        SELECT vs.id_verificacion, vs.estado
+        FROM verificacion_solicitud vs
+        JOIN entrada e ON e.id_verificacion = vs.id_verificacion
+    ),
+    solicitudes AS (
+        UPDATE verificacion_solicitud vs
+        SET estado = :estado_solicitud,
+            fecha_revision = now(),
+            comentario = COALESCE(e.comentario, vs.comentario)
+        FROM entrada e
+        WHERE vs.id_verificacion = e.id_verificacion
+          AND vs.estado = 'pendiente'
+        RETURNING vs.id_verificacion, vs.id_perfil
+    ),
+    perfiles AS (
+        UPDATE perfil_empresa pe
+        SET verificado = CAST(:verificado AS boolean),
+            fecha_verificacion = CASE WHEN CAST(:verificado AS boolean) THEN now() END,
+            estado = :estado_perfil
+        FROM (SELECT DISTINCT id_perfil FROM solicitudes) s
+        WHERE pe.id_perfil = s.id_perfil
+          AND (CAST(:verificado AS boolean) OR NOT pe.verificado)
+        RETURNING pe.id_perfil
+    ),
+    documentos AS (
+        UPDATE documento d
+        SET estado_revision = :estado_documento,
+            fecha_verificacion = now()
+        FROM solicitudes s
+        WHERE d.id_verificacion = s.id_verificacion
+          AND d.estado_revision = 'pendiente'
+        RETURNING d.id_verificacion
+    )
+    SELECT e.id_verificacion,
+           a.estado AS estado_anterior,
+           s.id_verificacion IS NOT NULL AS actualizada,
+           s.id_perfil,
+           coalesce(dc.cantidad, 0) AS documentos
+    FROM entrada e
+    LEFT JOIN anterior a ON a.id_verificacion = e.id_verificacion
+    LEFT JOIN solicitudes s ON s.id_verificacion = e.id_verificacion
+    LEFT JOIN (
+        SELECT id_verificacion, count(*) AS cantidad FROM documentos GROUP BY id_verificacion
+    ) dc ON dc.id_verificacion = e.id_verificacion
+    ORDER BY e.orden
+""")
+
+
+async def decidir_solicitudes(
+    db: AsyncSession,
+    decision: str,
+    decisiones: Sequence[Tuple[int, Optional[str]]],
+) -> List[Any]:
+    """
+    Aprueba o rechaza (`decision`: "aprobar" / "rechazar") un conjunto de solicitudes
+    pendientes en un solo round trip. `decisiones` son pares (id_verificacion, comentario);
+    un comentario None conserva el que tenía la solicitud.
+
+    Devuelve una fila por id, en el orden recibido, con: estado_anterior (None si la
+    solicitud no existe), actualizada (False si no estaba pendiente), id_perfil y la
+    cantidad de documentos resueltos. No hace commit: corre en la transacción del llamador.
+    """
+    estados = DECISIONES[decision]
+    result = await db.execute(_SQL_DECIDIR_SOLICITUDES, {
+        "ids": [id_verificacion for id_verificacion, _ in decisiones],
+        "comentarios": [comentario for _, comentario in decisiones],
+        "estado_solicitud": estados["solicitud"],
+        "estado_perfil": estados["perfil"],
+        "verificado": estados["verificado"],
+        "estado_documento": estados["documento"],
+    })
+    return result.mappings().all()
+
+
+# Estados de documento.estado_revision
+ESTADOS_DOCUMENTO = ("pendiente", "aprobado", "rechazado")
+
+# Un único statement para la revisión de documentos de una solicitud pendiente:
+# 1. actualiza los documentos indicados (solo los que pertenecen a la solicitud);
+# 2. junta el estado nuevo de esos documentos con el de los no tocados (las CTE ven la foto
+#    previa al UPDATE, por eso se combinan con lo que devolvió el RETURNING);
+# 3. deriva el estado de la solicitud: 'aprobada' si todos están aprobados, 'rechazada' si
+#    no queda ninguno pendiente y alguno fue rechazado; si no sigue 'pendiente';
+# 4. si cambió, lo aplica a la solicitud y al perfil de empresa (igual que decidir_solicitudes:
+#    un rechazo no le quita la verificación a un perfil ya verificado).
+# Una observación None conserva la que tenía el documento. La fila de la solicitud se bloquea
+# antes, en otro statement (_SQL_BLOQUEAR_SOLICITUD): ver revisar_documentos.
+_SQL_REVISAR_DOCUMENTOS = text("""
+    WITH entrada AS (
+        SELECT *
+        FROM unnest(CAST(:ids AS bigint[]), CAST(:estados AS text[]), CAST(:observaciones AS text[]))
+             AS e(id_documento, estado_revision, observacion)
+    ),
+    solicitud AS (
+        SELECT id_verificacion, id_perfil, estado
+        FROM verificacion_solicitud
+        WHERE id_verificacion = :id_verificacion
+    ),
+    documentos AS (
+        UPDATE documento d
+        SET estado_revision = e.estado_revision,
+            observacion = COALESCE(e.observacion, d.observacion),
+            fecha_verificacion = CASE WHEN e.estado_revision = 'pendiente' THEN NULL ELSE now() END
+        FROM entrada e, solicitud s
+        WHERE d.id_documento = e.id_documento
+          AND d.id_verificacion = s.id_verificacion
+          AND s.estado = 'pendiente'
+        RETURNING d.id_documento, d.estado_revision
+    ),
+    estados AS (
+        SELECT d.estado_revision
+        FROM documento d
+        JOIN solicitud s ON s.id_verificacion = d.id_verificacion
+        WHERE d.id_documento NOT IN (SELECT id_documento FROM documentos)
+        UNION ALL
+        SELECT estado_revision FROM documentos
+    ),
+    resumen AS (
+        SELECT count(*) AS total,
+               count(*) FILTER (WHERE estado_revision = 'aprobado') AS aprobados,
+               count(*) FILTER (WHERE estado_revision = 'rechazado') AS rechazados,
+               count(*) FILTER (WHERE estado_revision = 'pendiente') AS pendientes
+        FROM estados
+    ),
+    derivado AS (
+        SELECT CASE
+                   WHEN r.total > 0 AND r.aprobados = r.total THEN 'aprobada'
+                   WHEN r.rechazados > 0 AND r.pendientes = 0 THEN 'rechazada'
+                   ELSE 'pendiente'
+               END AS estado
+        FROM resumen r
+    ),
+    solicitud_actualizada AS (
+        UPDATE verificacion_solicitud vs
+        SET estado = dv.estado,
+            fecha_revision = now()
+        FROM derivado dv
+        WHERE vs.id_verificacion = :id_verificacion
+          AND vs.estado = 'pendiente'
+          AND dv.estado <> 'pendiente'
+          AND EXISTS (SELECT 1 FROM documentos)
+        RETURNING vs.id_perfil, vs.estado
+    ),
+    perfil AS (
+        UPDATE perfil_empresa pe
+        SET verificado = (sa.estado = 'aprobada'),
+            fecha_verificacion = CASE WHEN sa.estado = 'aprobada' THEN now() END,
+            estado = CASE WHEN sa.estado = 'aprobada' THEN :perfil_aprobado ELSE :perfil_rechazado END
+        FROM solicitud_actualizada sa
+        WHERE pe.id_perfil = sa.id_perfil
+          AND (sa.estado = 'aprobada' OR NOT pe.verificado)
+        RETURNING pe.id_perfil
+    )
+    SELECT s.estado AS estado_anterior,
+           coalesce((SELECT estado FROM solicitud_actualizada), s.estado) AS estado_solicitud,
+           (SELECT count(*) FROM documentos) AS documentos_actualizados,
+           ARRAY(
+               SELECT e.id_documento FROM entrada e
+               WHERE e.id_documento NOT IN (SELECT id_documento FROM documentos)
+               ORDER BY e.id_documento
+           ) AS no_actualizados,
+           r.total, r.aprobados, r.rechazados, r.pendientes
+    FROM solicitud s, resumen r
+""")
+
+_SQL_BLOQUEAR_SOLICITUD = text("""
+    SELECT estado FROM verificacion_solicitud WHERE id_verificacion = :id_verificacion FOR UPDATE
+""")
+
+
+async def revisar_documentos(
+    db: AsyncSession,
+    id_verificacion: int,
+    revisiones: Sequence[Tuple[int, str, Optional[str]]],
+) -> Optional[Any]:
+    """
+    Aplica la revisión de varios documentos de una solicitud (tripletas id_documento,
+    estado_revision, observacion) y deriva el estado de la solicitud con un único statement
+    (más el bloqueo previo de la fila de la solicitud).
+
+    Devuelve None si la solicitud no existe; si no, una fila con estado_anterior,
+    estado_solicitud (el resultante), documentos_actualizados, no_actualizados (ids que no
+    pertenecen a la solicitud, o todos si no estaba pendiente) y el conteo de documentos por
+    estado. No hace commit: corre en la transacción del llamador.
+    """
+    # Dos revisiones concurrentes de documentos distintos de la misma solicitud derivarían su
+    # estado cada una sin ver la otra (todas las CTE usan la foto tomada al empezar el
+    # statement) y la solicitud podría quedar 'pendiente' con todo aprobado. Bloquear la fila
+    # en un statement previo las serializa, y en READ COMMITTED el statement siguiente toma
+    # una foto nueva que ya incluye lo que confirmó la revisión anterior.
+    bloqueada = await db.execute(_SQL_BLOQUEAR_SOLICITUD, {"id_verificacion": id_verificacion})
+    if bloqueada.first() is None:
+        return None
+
+    result = await db.execute(_SQL_REVISAR_DOCUMENTOS, {
+        "id_verificacion": id_verificacion,
+        "ids": [id_documento for id_documento, _, _ in revisiones],
+        "estados": [estado for _, estado, _ in revisiones],
+        "observaciones": [observacion for _, _, observacion in revisiones],
+        "perfil_aprobado": DECISIONES["aprobar"]["perfil"],
+        "perfil_rechazado": DECISIONES["rechazar"]["perfil"],
+    })
+    return result.mappings().one_or_none()
@@ -1,14 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
+from app.core.startup import startup_timer, run_warm_up
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.v1.routers.users.auth_user2 import auth
-from app.api.v1.routers.locations import locations
-from app.api.v1.routers.providers import providers
+
+# Se mide el import de cada router para el reporte de arranque
+with startup_timer.track("import routers.users.auth_user"):
+    from app.api.v1.routers.users.auth_user import auth
+with startup_timer.track("import routers.locations"):
+    from app.api.v1.routers.locations import locations
+with startup_timer.track("import routers.providers"):
+    from app.api.v1.routers.providers import providers
+with startup_timer.track("import routers.users.auth_user_admin"):
+    from app.api.v1.routers.users.auth_user_admin import auth_admin
+from app.api.v1.routers.health import health
+from app.supabase.auth_service import close_async_auth
+from app.supabase.db.db_supabase import dispose_engines
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Al iniciar: warm-up en segundo plano (engines/clientes, conexiones del pool y datos de
+    # referencia). /health/live responde de inmediato; /health/ready recién cuando termina.
+    warm_up_task = asyncio.create_task(run_warm_up())
+    yield
+    warm_up_task.cancel()
+    # Al apagar: cerrar el pool de conexiones HTTP hacia Supabase Auth y los pools de la base
+    await close_async_auth()
+    await dispose_engines()
+
 
 # Instancia de la aplicación de FastAPI
 app = FastAPI(
     title="SEVA B2B API",
     description="API para la plataforma B2B SEVA Empresas",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS para permitir comunicación con el frontend
@@ -31,6 +58,8 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(providers.router, prefix="/api/v1")
 app.include_router(locations.router, prefix="/api/v1") 
+app.include_router(auth_admin.router, prefix="/api/v1")
+app.include_router(health.router)
 
 # endpoint (una ruta) para la URL raíz ("/")
 @app.get("/")
@@ -0,0 +1,83 @@
+# scripts/bench_decisiones_masivas.py
+# Benchmark de la aprobación/rechazo masivo (app/utils/verificaciones.py:decidir_solicitudes).
+#
+# Dentro de una transacción que al final se descarta (ROLLBACK) crea N perfiles de empresa
+# con una solicitud pendiente y dos documentos cada uno, y mide:
+#   - el lote completo resuelto con un único statement (lo que hace /admin/verificaciones/decisiones);
+#   - como referencia, otras N solicitudes resueltas de a una (un statement por click).
+# No deja datos en la base. Requiere DATABASE_URL (ej. en backend/.env) apuntando a una base
+# con el esquema de la aplicación.
+#
+# Uso (desde backend/):  python scripts/bench_decisiones_masivas.py [--n 1000]
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+import app.models  # noqa: E402,F401  (registra los modelos)
+from app.supabase.db.db_supabase import get_async_sessionmaker, dispose_engines  # noqa: E402
+from app.utils.verificaciones import decidir_solicitudes  # noqa: E402
+
+_SQL_CREAR_SOLICITUDES = text("""
+    WITH tipo AS (
+        INSERT INTO tipo_documento (tipo_documento, es_requerido)
+        VALUES ('bench', false)
+        RETURNING id_tip_documento
+    ),
+    perfiles AS (
+        INSERT INTO perfil_empresa (razon_social, nombre_fantasia, estado, verificado)
+        SELECT 'bench ' || g, 'bench ' || g, 'pendiente', false
+        FROM generate_series(1, :n) g
+        RETURNING id_perfil
+    ),
+    solicitudes AS (
+        INSERT INTO verificacion_solicitud (id_perfil, estado)
+        SELECT id_perfil, 'pendiente' FROM perfiles
+        RETURNING id_verificacion
+    ),
+    documentos AS (
+        INSERT INTO documento (id_tip_documento, id_verificacion, estado_revision)
+        SELECT tipo.id_tip_documento, s.id_verificacion, 'pendiente'
+        FROM solicitudes s, tipo, generate_series(1, 2)
+        RETURNING 1
+    )
+    SELECT id_verificacion FROM solicitudes ORDER BY id_verificacion
+""")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la aprobación/rechazo masivo")
+    parser.add_argument("--n", type=int, default=1000, help="solicitudes por lote")
+    args = parser.parse_args()
+
+    async with get_async_sessionmaker()() as db:
+        try:
+            ids = (await db.execute(_SQL_CREAR_SOLICITUDES, {"n": args.n * 2})).scalars().all()
+            lote, de_a_una = ids[:args.n], ids[args.n:]
+
+            start = time.perf_counter()
+            filas = await decidir_solicitudes(db, "aprobar", [(i, "ok") for i in lote])
+            masivo = time.perf_counter() - start
+            assert sum(1 for f in filas if f["actualizada"]) == len(lote)
+
+            start = time.perf_counter()
+            for i in de_a_una:
+                await decidir_solicitudes(db, "aprobar", [(i, "ok")])
+            individual = time.perf_counter() - start
+        finally:
+            await db.rollback()
+    await dispose_engines()
+
+    print(f"{args.n} solicitudes (2 documentos c/u)")
+    print(f"  un statement:        {masivo * 1000:8.1f} ms")
+    print(f"  una por statement:   {individual * 1000:8.1f} ms  ({individual / masivo:.0f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
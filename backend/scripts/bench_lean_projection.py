@@ -0,0 +1,133 @@
+# scripts/bench_lean_projection.py
+# Microbenchmark de los listados de ubicaciones: entidades ORM + validación pydantic
+# (select(Model) -> from_attributes -> dump_json) contra la lectura por columnas
+# (select(columnas) -> tuplas -> JSON directo, como hace app/api/v1/routers/locations).
+#
+# Usa SQLite en memoria para aislar el costo del lado de Python (hidratar entidades, identity
+# map, validación) del driver y la red, que son iguales en ambos caminos. Mide tiempo de CPU y
+# memoria asignada (tracemalloc) por cada 1.000 filas, y verifica que ambos caminos produzcan
+# exactamente el mismo JSON.
+#
+# Uso (desde backend/):  python scripts/bench_lean_projection.py [--rows 1000] [--repeat 50]
+
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import create_engine, select, text  # noqa: E402
+from sqlalchemy.orm import Session, configure_mappers  # noqa: E402
+
+import app.models  # noqa: E402,F401  (registra los modelos para configurar las relaciones)
+import app.models.perfil  # noqa: E402,F401
+import app.models.rol  # noqa: E402,F401
+import app.models.usuario_rol  # noqa: E402,F401
+from app.models.empresa.ciudad import Ciudad  # noqa: E402
+from app.models.empresa.barrio import Barrio  # noqa: E402
+from app.schemas.empresa.ciudad import CiudadOut  # noqa: E402
+from app.schemas.empresa.barrio import BarrioOut  # noqa: E402
+from app.api.v1.routers.locations.locations import (  # noqa: E402
+    _serializar, ciudad_columnas, barrio_columnas,
+)
+
+CASOS = (
+    ("ciudad", Ciudad, CiudadOut, ciudad_columnas),
+    ("barrio", Barrio, BarrioOut, barrio_columnas),
+)
+
+
+def crear_base(rows: int):
+    engine = create_engine("sqlite://")
+    ahora = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE ciudad (id_ciudad INTEGER PRIMARY KEY, nombre TEXT NOT NULL, "
+            "id_departamento INTEGER NOT NULL, created_at TIMESTAMP)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE barrio (id_barrio INTEGER PRIMARY KEY, nombre TEXT NOT NULL, "
+            "id_ciudad INTEGER NOT NULL, created_at TIMESTAMP, geom BLOB)"
+        ))
+        conn.execute(
+            text("INSERT INTO ciudad VALUES (:id, :nombre, 1, :created_at)"),
+            [{"id": i, "nombre": f"Ciudad {i}", "created_at": ahora} for i in range(1, rows + 1)],
+        )
+        conn.execute(
+            text("INSERT INTO barrio VALUES (:id, :nombre, 1, :created_at, NULL)"),
+            [{"id": i, "nombre": f"Barrio {i}", "created_at": ahora} for i in range(1, rows + 1)],
+        )
+    return engine
+
+
+def via_orm(engine, model, adapter: TypeAdapter) -> bytes:
+    # Camino anterior: entidades completas en una sesión y validación from_attributes
+    with Session(engine) as db:
+        entidades = db.execute(select(model)).scalars().all()
+        items = adapter.validate_python(entidades, from_attributes=True)
+        return adapter.dump_json(items)
+
+
+def via_columnas(engine, columnas: list) -> bytes:
+    with Session(engine) as db:
+        rows = db.execute(select(*columnas)).all()
+        return _serializar(columnas, rows)[0]
+
+
+def medir(fn, repeat: int):
+    fn()  # calentamiento (compilación de la consulta, caches de SQLAlchemy)
+    tiempos = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        tiempos.append(time.process_time() - start)
+
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    fn()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(tiempos), pico - antes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de lectura por columnas vs entidades ORM")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    configure_mappers()
+    engine = crear_base(args.rows)
+    por_mil = 1000 / args.rows
+
+    print(f"{args.rows} filas, mediana de {args.repeat} repeticiones; valores por 1.000 filas\n")
+    print(f"{'tabla':<8} {'camino':<10} {'CPU':>9} {'memoria pico':>14}")
+
+    ok = True
+    for nombre, model, schema, columnas in CASOS:
+        adapter = TypeAdapter(List[schema])
+        if via_orm(engine, model, adapter) != via_columnas(engine, columnas):
+            print(f"{nombre}: el JSON de ambos caminos difiere")
+            ok = False
+
+        resultados = {
+            "orm": medir(lambda: via_orm(engine, model, adapter), args.repeat),
+            "columnas": medir(lambda: via_columnas(engine, columnas), args.repeat),
+        }
+        for camino, (cpu, memoria) in resultados.items():
+            print(f"{nombre:<8} {camino:<10} {cpu * por_mil * 1000:>7.2f}ms {memoria * por_mil / 1024:>10.0f} KiB")
+        (cpu_orm, mem_orm), (cpu_col, mem_col) = resultados["orm"], resultados["columnas"]
+        print(f"{'':<8} {'ahorro':<10} {cpu_orm / cpu_col:>8.1f}x {mem_orm / max(mem_col, 1):>12.1f}x\n")
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
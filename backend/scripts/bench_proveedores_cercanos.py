@@ -0,0 +1,121 @@
+# scripts/bench_proveedores_cercanos.py
+# Benchmark de la búsqueda por cercanía (app/utils/proveedores_geo.py:buscar_proveedores_cercanos).
+#
+# Dentro de una transacción que al final se descarta (ROLLBACK) crea N sucursales (y N/10
+# empresas verificadas) con direcciones al azar en un cuadrado de ~100 km alrededor del punto,
+# actualiza las estadísticas y mide la primera página y las siguientes (por cursor), con el
+# EXPLAIN ANALYZE de la primera para ver que cada rama recorre el índice con `<->`.
+# No deja datos en la base. Requiere DATABASE_URL (ej. en backend/.env) apuntando a una base
+# con PostGIS y el esquema de la aplicación (al menos un barrio cargado).
+#
+# Uso (desde backend/):  python scripts/bench_proveedores_cercanos.py [--n 100000] [--radio 50000]
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+import app.models  # noqa: E402,F401  (registra los modelos)
+from app.supabase.db.db_supabase import get_async_sessionmaker, dispose_engines  # noqa: E402
+from app.utils import proveedores_geo  # noqa: E402
+from app.utils.proveedores_geo import buscar_proveedores_cercanos  # noqa: E402
+
+# Asunción
+LAT, LON = -25.2637, -57.5759
+
+_SQL_CREAR_PROVEEDORES = text("""
+    WITH direcciones AS (
+        INSERT INTO direccion (calle, numero, id_barrio, coordenadas)
+        SELECT 'bench', g::text, (SELECT id_barrio FROM barrio LIMIT 1),
+               ST_SetSRID(ST_MakePoint(:lon + random() - 0.5, :lat + random() - 0.5), 4326)
+        FROM generate_series(1, :n + :n / 10) g
+        RETURNING id_direccion
+    ),
+    numeradas AS (
+        SELECT id_direccion, row_number() OVER (ORDER BY id_direccion) AS i FROM direcciones
+    ),
+    perfiles AS (
+        INSERT INTO perfil_empresa (razon_social, nombre_fantasia, estado, verificado, id_direccion)
+        SELECT 'bench ' || i, 'bench ' || i, 'activo', true, id_direccion
+        FROM numeradas WHERE i <= :n / 10
+        RETURNING id_perfil
+    ),
+    perfiles_numerados AS (
+        SELECT id_perfil, row_number() OVER (ORDER BY id_perfil) - 1 AS i FROM perfiles
+    )
+    INSERT INTO sucursal_empresa (nombre, telefono, email, id_perfil, id_direccion)
+    SELECT 'bench ' || n.i, '0', 'bench@example.com', p.id_perfil, n.id_direccion
+    FROM numeradas n
+    JOIN perfiles_numerados p ON p.i = n.i % (:n / 10)
+    WHERE n.i > :n / 10
+""")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la búsqueda de proveedores cercanos")
+    parser.add_argument("--n", type=int, default=100_000, help="sucursales con dirección")
+    parser.add_argument("--radio", type=float, default=50_000, help="radio en metros")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--paginas", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    async with get_async_sessionmaker()() as db:
+        try:
+            await db.execute(_SQL_CREAR_PROVEEDORES, {"n": args.n, "lat": LAT, "lon": LON})
+            for tabla in ("direccion", "perfil_empresa", "sucursal_empresa"):
+                await db.execute(text(f"ANALYZE {tabla}"))
+
+            async def pagina(after=None):
+                rows = await buscar_proveedores_cercanos(
+                    db, lat=LAT, lon=LON, limit=args.limit + 1, radio_m=args.radio, after=after
+                )
+                ultimo = rows[args.limit - 1] if len(rows) > args.limit else None
+                return [ultimo.distancia_m, ultimo.tipo, ultimo.id] if ultimo else None
+
+            await pagina()  # calentamiento
+            primera = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                await pagina()
+                primera.append(time.perf_counter() - start)
+
+            siguientes, after = [], await pagina()
+            for _ in range(args.paginas):
+                if after is None:
+                    break
+                start = time.perf_counter()
+                after = await pagina(after)
+                siguientes.append(time.perf_counter() - start)
+
+            # Mismo SQL que arma buscar_proveedores_cercanos, con EXPLAIN ANALYZE
+            filtro = f"ST_DWithin(d.coordenadas::geography, {proveedores_geo._PUNTO}, :radio_m)"
+            ramas = " UNION ALL ".join(
+                proveedores_geo._rama_cercanos_sql(t, filtro, False) for t in proveedores_geo._COLUMNAS
+            )
+            plan = (await db.execute(
+                text(f"""
+                    EXPLAIN (ANALYZE, COSTS OFF)
+                    SELECT r.* FROM ({ramas}) r ORDER BY r.distancia_m, r.tipo, r.id LIMIT :limit
+                """),
+                {"lat": LAT, "lon": LON, "radio_m": args.radio, "limit": args.limit + 1},
+            )).scalars().all()
+        finally:
+            await db.rollback()
+    await dispose_engines()
+
+    print("\n".join(plan))
+    print(f"\n{args.n} sucursales + {args.n // 10} empresas, radio {args.radio:.0f} m, limit {args.limit}")
+    print(f"  primera página (mediana de {args.repeat}): {statistics.median(primera) * 1000:8.1f} ms")
+    if siguientes:
+        print(f"  páginas 2..{len(siguientes) + 1} (mediana):      {statistics.median(siguientes) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+# scripts/bench_streaming_upload.py
+# Benchmark de memoria de la subida por streaming (app/idrive/streaming_upload.py).
+#
+# Sube archivos sintéticos de distintos tamaños contra un cliente S3 falso (descarta los
+# bytes, simula latencia) y mide con tracemalloc el pico de memoria de Python durante la
+# subida. Con streaming el pico debe mantenerse ~ parte * (concurrencia + 1) para todos los
+# tamaños; como referencia se mide también leer el cuerpo completo en memoria.
+#
+# Uso (desde backend/):  python scripts/bench_streaming_upload.py [--sizes-mb 10 50 200]
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.idrive.streaming_upload import stream_to_idrive  # noqa: E402
+
+MB = 1024 * 1024
+CHUNK_SIZE = 64 * 1024  # lo que entrega uvicorn por evento http.request, aprox.
+
+
+class FakeS3Client:
+    """
+    Implementa las llamadas que usa stream_to_idrive sin guardar los datos.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.bytes_received = 0
+
+    def create_multipart_upload(self, **kwargs):
+        return {"UploadId": "bench"}
+
+    def upload_part(self, Body, PartNumber, **kwargs):
+        time.sleep(self.latency)
+        self.bytes_received += len(Body)
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, **kwargs):
+        return {}
+
+    def abort_multipart_upload(self, **kwargs):
+        return {}
+
+    def put_object(self, Body, **kwargs):
+        self.bytes_received += len(Body)
+        return {}
+
+
+async def body_stream(size: int):
+    chunk = b"\0" * CHUNK_SIZE  # el mismo objeto en cada iteración: no suma memoria
+    sent = 0
+    while sent < size:
+        n = min(CHUNK_SIZE, size - sent)
+        yield chunk if n == CHUNK_SIZE else chunk[:n]
+        sent += n
+        await asyncio.sleep(0)
+
+
+async def medir_streaming(size: int, part_size: int, concurrency: int, latency: float):
+    client = FakeS3Client(latency)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    total, _ = await stream_to_idrive(
+        body_stream(size), "bench/key", "application/pdf", max_size=size,
+        part_size=part_size, concurrency=concurrency, client=client, bucket="bench",
+    )
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert total == size == client.bytes_received
+    return peak, elapsed
+
+
+async def medir_cuerpo_completo(size: int):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    body = bytearray()
+    async for chunk in body_stream(size):
+        body += chunk
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memoria de la subida por streaming")
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--part-size-mb", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0.01, help="segundos por parte en el S3 falso")
+    args = parser.parse_args()
+
+    part_size = args.part_size_mb * MB
+    cota = part_size * (args.concurrency + 1)
+    print(f"parte={args.part_size_mb} MiB  concurrencia={args.concurrency}  cota teórica={cota / MB:.1f} MiB\n")
+    print(f"{'tamaño':>10} {'pico streaming':>16} {'pico cuerpo completo':>22} {'tiempo':>8}")
+
+    picos = []
+    for size_mb in args.sizes_mb:
+        size = size_mb * MB
+        peak, elapsed = await medir_streaming(size, part_size, args.concurrency, args.latency)
+        baseline = await medir_cuerpo_completo(size)
+        picos.append(peak)
+        print(f"{size_mb:>7} MiB {peak / MB:>12.1f} MiB {baseline / MB:>18.1f} MiB {elapsed:>7.2f}s")
+
+    # Memoria plana: el pico no crece con el tamaño del archivo y no supera la cota
+    plano = max(picos) <= cota * 1.1 and max(picos) - min(picos) <= part_size
+    print(f"\nmemoria plana: {'sí' if plano else 'NO'}")
+    sys.exit(0 if plano else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+# tests/conftest.py
+# Los tests de SQL corren contra una base PostgreSQL con el esquema de la aplicación (ej. la
+# de `supabase start`), indicada en TEST_DATABASE_URL; sin ella se saltean. Cada test trabaja
+# en una transacción que se descarta al terminar, así que no deja datos.
+
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL no está configurada")
+    engine = create_async_engine(
+        TEST_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"), poolclass=NullPool
+    )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db(engine):
+    """
+    Sesión sobre una transacción externa que se descarta al final; los commit del código
+    bajo prueba quedan como savepoints dentro de ella.
+    """
+    async with engine.connect() as conn:
+        transaccion = await conn.begin()
+        session = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaccion.rollback()
+
+
+async def crear_solicitud(
+    db,
+    documentos: Sequence[str] = ("pendiente", "pendiente"),
+    estado: str = "pendiente",
+    verificado: bool = False,
+    comentario: Optional[str] = None,
+) -> Tuple[int, int, List[int]]:
+    """
+    Crea un perfil de empresa con una solicitud de verificación y un documento por cada
+    estado de `documentos`. Devuelve (id_verificacion, id_perfil, ids de documento).
+    """
+    id_perfil = (await db.execute(text("""
+        INSERT INTO perfil_empresa (razon_social, nombre_fantasia, estado, verificado, fecha_verificacion)
+        VALUES ('test', 'test', :estado_perfil, :verificado, CASE WHEN :verificado THEN now() END)
+        RETURNING id_perfil
+    """), {"estado_perfil": "verificado" if verificado else "pendiente", "verificado": verificado})).scalar_one()
+    id_verificacion = (await db.execute(text("""
+        INSERT INTO verificacion_solicitud (id_perfil, estado, comentario)
+        VALUES (:id_perfil, :estado, :comentario)
+        RETURNING id_verificacion
+    """), {"id_perfil": id_perfil, "estado": estado, "comentario": comentario})).scalar_one()
+    id_tipo = (await db.execute(text("""
+        INSERT INTO tipo_documento (tipo_documento, es_requerido) VALUES ('test', false)
+        RETURNING id_tip_documento
+    """))).scalar_one()
+    ids_documento = [
+        (await db.execute(text("""
+            INSERT INTO documento (id_tip_documento, id_verificacion, estado_revision)
+            VALUES (:id_tipo, :id_verificacion, :estado)
+            RETURNING id_documento
+        """), {"id_tipo": id_tipo, "id_verificacion": id_verificacion, "estado": estado_doc})).scalar_one()
+        for estado_doc in documentos
+    ]
+    return id_verificacion, id_perfil, ids_documento
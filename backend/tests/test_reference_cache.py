@@ -0,0 +1,60 @@
+# tests/test_reference_cache.py
+# Negociación de gzip y ETags de app/utils/reference_cache.py (sin base de datos).
+
+import gzip
+
+import pytest
+from starlette.requests import Request
+
+from app.utils.reference_cache import CachedPayload, acepta_gzip, cached_response
+
+
+def _request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+@pytest.mark.parametrize("header, esperado", [
+    ("gzip, deflate, br", True),
+    ("deflate;q=1, gzip;q=0.5", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.000", False),
+    ("br, *", True),
+    ("*;q=0", False),
+    ("*, gzip;q=0", False),
+    ("x-gzip", True),
+    ("gzip;q=abc", False),
+    ("identity", False),
+    ("", False),
+])
+def test_acepta_gzip(header, esperado):
+    assert acepta_gzip(header) is esperado
+
+
+def test_gzip_y_sin_comprimir_tienen_etags_distintos():
+    payload = CachedPayload(b'{"a": 1}', 1)
+
+    plano = cached_response(_request(accept_encoding="gzip;q=0"), payload, 60)
+    comprimido = cached_response(_request(accept_encoding="gzip"), payload, 60)
+
+    assert plano.body == payload.body and "content-encoding" not in plano.headers
+    assert gzip.decompress(comprimido.body) == payload.body
+    assert comprimido.headers["content-encoding"] == "gzip"
+    assert plano.headers["etag"] == payload.etag
+    assert comprimido.headers["etag"] == payload.gzip_etag != payload.etag
+
+
+def test_if_none_match_con_el_etag_de_cualquier_representacion():
+    payload = CachedPayload(b'{"a": 1}', 1)
+
+    for etag in (payload.etag, payload.gzip_etag, f"W/{payload.gzip_etag}"):
+        respuesta = cached_response(_request(accept_encoding="gzip", if_none_match=etag), payload, 60)
+        assert respuesta.status_code == 304
+        assert respuesta.headers["etag"] == etag.removeprefix("W/")
+
+    respuesta = cached_response(_request(if_none_match='"otro"'), payload, 60)
+    assert respuesta.status_code == 200
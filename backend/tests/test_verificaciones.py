@@ -0,0 +1,234 @@
+# tests/test_verificaciones.py
+# SQL de app/utils/verificaciones.py contra PostgreSQL (ver tests/conftest.py).
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.utils.verificaciones import decidir_solicitudes, revisar_documentos
+from tests.conftest import crear_solicitud
+
+pytestmark = pytest.mark.anyio
+
+
+async def _fila(db, sql: str, **params):
+    return (await db.execute(text(sql), params)).mappings().one()
+
+
+async def test_aprobar_resuelve_solicitud_perfil_y_documentos_pendientes(db):
+    id_verificacion, id_perfil, (pendiente, rechazado) = await crear_solicitud(
+        db, documentos=("pendiente", "rechazado"), comentario="original"
+    )
+
+    (fila,) = await decidir_solicitudes(db, "aprobar", [(id_verificacion, None)])
+
+    assert fila["estado_anterior"] == "pendiente"
+    assert fila["actualizada"] is True
+    assert fila["id_perfil"] == id_perfil
+    assert fila["documentos"] == 1
+
+    solicitud = await _fila(
+        db, "SELECT estado, comentario, fecha_revision FROM verificacion_solicitud WHERE id_verificacion = :id",
+        id=id_verificacion,
+    )
+    assert solicitud["estado"] == "aprobada"
+    assert solicitud["comentario"] == "original"
+    assert solicitud["fecha_revision"] is not None
+
+    perfil = await _fila(
+        db, "SELECT verificado, estado, fecha_verificacion FROM perfil_empresa WHERE id_perfil = :id", id=id_perfil
+    )
+    assert perfil["verificado"] is True
+    assert perfil["estado"] == "verificado"
+    assert perfil["fecha_verificacion"] is not None
+
+    estados = dict((await db.execute(
+        text("SELECT id_documento, estado_revision FROM documento WHERE id_verificacion = :id"),
+        {"id": id_verificacion},
+    )).all())
+    # Solo se resuelven los documentos que seguían pendientes
+    assert estados == {pendiente: "aprobado", rechazado: "rechazado"}
+
+
+async def test_lote_devuelve_un_resultado_por_id_en_orden(db):
+    pendiente, _, _ = await crear_solicitud(db)
+    aprobada, _, _ = await crear_solicitud(db, estado="aprobada", documentos=())
+    inexistente = 2 ** 62
+
+    filas = await decidir_solicitudes(
+        db, "rechazar", [(aprobada, "x"), (inexistente, None), (pendiente, "motivo")]
+    )
+
+    assert [f["id_verificacion"] for f in filas] == [aprobada, inexistente, pendiente]
+    # Ya decidida: el endpoint individual responde 409
+    assert (filas[0]["estado_anterior"], filas[0]["actualizada"]) == ("aprobada", False)
+    # Inexistente: el endpoint individual responde 404
+    assert (filas[1]["estado_anterior"], filas[1]["actualizada"]) == (None, False)
+    assert (filas[2]["estado_anterior"], filas[2]["actualizada"]) == ("pendiente", True)
+
+    solicitud = await _fila(
+        db, "SELECT estado, comentario FROM verificacion_solicitud WHERE id_verificacion = :id", id=pendiente
+    )
+    assert dict(solicitud) == {"estado": "rechazada", "comentario": "motivo"}
+    ya_decidida = await _fila(db, "SELECT estado FROM verificacion_solicitud WHERE id_verificacion = :id", id=aprobada)
+    assert ya_decidida["estado"] == "aprobada"
+
+
+async def test_rechazar_no_quita_la_verificacion_de_un_perfil_verificado(db):
+    id_verificacion, id_perfil, _ = await crear_solicitud(db, verificado=True)
+
+    (fila,) = await decidir_solicitudes(db, "rechazar", [(id_verificacion, "documentación vencida")])
+
+    assert fila["actualizada"] is True
+    perfil = await _fila(
+        db, "SELECT verificado, estado, fecha_verificacion FROM perfil_empresa WHERE id_perfil = :id", id=id_perfil
+    )
+    assert perfil["verificado"] is True
+    assert perfil["estado"] == "verificado"
+    assert perfil["fecha_verificacion"] is not None
+
+
+async def test_rechazar_perfil_no_verificado(db):
+    id_verificacion, id_perfil, _ = await crear_solicitud(db)
+
+    await decidir_solicitudes(db, "rechazar", [(id_verificacion, None)])
+
+    perfil = await _fila(db, "SELECT verificado, estado FROM perfil_empresa WHERE id_perfil = :id", id=id_perfil)
+    assert dict(perfil) == {"verificado": False, "estado": "rechazado"}
+
+
+async def test_decisiones_concurrentes_solo_aplica_la_primera(engine):
+    # Datos confirmados: dos conexiones tienen que verlos
+    async with engine.begin() as conn:
+        id_verificacion, id_perfil, _ = await crear_solicitud(conn)
+
+    try:
+        async with AsyncSession(engine) as a, AsyncSession(engine) as b:
+            (primera,) = await decidir_solicitudes(a, "aprobar", [(id_verificacion, None)])
+            # La segunda queda bloqueada por el lock de fila de la primera hasta su commit, y
+            # luego re-evalúa estado = 'pendiente' sobre la versión confirmada
+            segunda = asyncio.create_task(decidir_solicitudes(b, "rechazar", [(id_verificacion, None)]))
+            await asyncio.sleep(0.2)
+            assert not segunda.done()
+            await a.commit()
+            (segunda,) = await segunda
+            await b.commit()
+
+        assert primera["actualizada"] is True
+        assert segunda["actualizada"] is False
+        async with engine.connect() as conn:
+            estado = (await conn.execute(
+                text("SELECT estado FROM verificacion_solicitud WHERE id_verificacion = :id"), {"id": id_verificacion}
+            )).scalar_one()
+        assert estado == "aprobada"
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("""
+                DELETE FROM tipo_documento WHERE id_tip_documento IN (
+                    SELECT id_tip_documento FROM documento WHERE id_verificacion = :id
+                )
+            """), {"id": id_verificacion})
+            await conn.execute(text("DELETE FROM perfil_empresa WHERE id_perfil = :id"), {"id": id_perfil})
+
+
+async def test_revisar_todos_aprobados_aprueba_la_solicitud(db):
+    id_verificacion, id_perfil, (uno, dos) = await crear_solicitud(db)
+
+    fila = await revisar_documentos(db, id_verificacion, [(uno, "aprobado", None), (dos, "aprobado", "ok")])
+
+    assert fila["estado_anterior"] == "pendiente"
+    assert fila["estado_solicitud"] == "aprobada"
+    assert fila["documentos_actualizados"] == 2
+    assert list(fila["no_actualizados"]) == []
+    perfil = await _fila(db, "SELECT verificado, estado FROM perfil_empresa WHERE id_perfil = :id", id=id_perfil)
+    assert dict(perfil) == {"verificado": True, "estado": "verificado"}
+
+
+async def test_revisar_deriva_rechazo_solo_sin_pendientes(db):
+    id_verificacion, id_perfil, (uno, dos) = await crear_solicitud(db)
+
+    fila = await revisar_documentos(db, id_verificacion, [(uno, "rechazado", "ilegible")])
+    assert fila["estado_solicitud"] == "pendiente"
+    assert (fila["rechazados"], fila["pendientes"]) == (1, 1)
+
+    fila = await revisar_documentos(db, id_verificacion, [(dos, "aprobado", None)])
+    assert fila["estado_solicitud"] == "rechazada"
+    perfil = await _fila(db, "SELECT verificado, estado FROM perfil_empresa WHERE id_perfil = :id", id=id_perfil)
+    assert dict(perfil) == {"verificado": False, "estado": "rechazado"}
+
+
+async def test_revisar_rechazo_no_quita_la_verificacion_de_un_perfil_verificado(db):
+    id_verificacion, id_perfil, (uno,) = await crear_solicitud(db, documentos=("pendiente",), verificado=True)
+
+    fila = await revisar_documentos(db, id_verificacion, [(uno, "rechazado", None)])
+
+    assert fila["estado_solicitud"] == "rechazada"
+    perfil = await _fila(db, "SELECT verificado, estado FROM perfil_empresa WHERE id_perfil = :id", id=id_perfil)
+    assert dict(perfil) == {"verificado": True, "estado": "verificado"}
+
+
+async def test_revisar_informa_documentos_de_otra_solicitud(db):
+    id_verificacion, _, (propio, _) = await crear_solicitud(db)
+    _, _, (ajeno, _) = await crear_solicitud(db)
+
+    fila = await revisar_documentos(db, id_verificacion, [(ajeno, "aprobado", None), (propio, "aprobado", None)])
+
+    assert list(fila["no_actualizados"]) == [ajeno]
+    ajeno_estado = await _fila(db, "SELECT estado_revision FROM documento WHERE id_documento = :id", id=ajeno)
+    assert ajeno_estado["estado_revision"] == "pendiente"
+
+
+async def test_revisar_solicitud_inexistente_o_resuelta(db):
+    assert await revisar_documentos(db, 2 ** 62, [(1, "aprobado", None)]) is None
+
+    id_verificacion, _, (uno,) = await crear_solicitud(db, estado="aprobada", documentos=("pendiente",))
+    fila = await revisar_documentos(db, id_verificacion, [(uno, "rechazado", None)])
+    assert fila["estado_anterior"] == "aprobada"
+    assert list(fila["no_actualizados"]) == [uno]
+
+
+async def test_revisar_sin_observacion_conserva_la_anterior(db):
+    id_verificacion, _, (uno, _) = await crear_solicitud(db)
+    await revisar_documentos(db, id_verificacion, [(uno, "rechazado", "ilegible")])
+
+    await revisar_documentos(db, id_verificacion, [(uno, "pendiente", None)])
+
+    documento = await _fila(
+        db, "SELECT estado_revision, observacion FROM documento WHERE id_documento = :id", id=uno
+    )
+    assert dict(documento) == {"estado_revision": "pendiente", "observacion": "ilegible"}
+
+
+async def test_revisiones_concurrentes_de_documentos_distintos(engine):
+    async with engine.begin() as conn:
+        id_verificacion, id_perfil, (uno, dos) = await crear_solicitud(conn)
+
+    try:
+        async with AsyncSession(engine) as a, AsyncSession(engine) as b:
+            primera = await revisar_documentos(a, id_verificacion, [(uno, "aprobado", None)])
+            # La segunda espera el bloqueo de la solicitud y, tras el commit de la primera,
+            # deriva el estado viendo los dos documentos aprobados
+            segunda = asyncio.create_task(revisar_documentos(b, id_verificacion, [(dos, "aprobado", None)]))
+            await asyncio.sleep(0.2)
+            assert not segunda.done()
+            await a.commit()
+            segunda = await segunda
+            await b.commit()
+
+        assert primera["estado_solicitud"] == "pendiente"
+        assert segunda["estado_solicitud"] == "aprobada"
+        async with engine.connect() as conn:
+            estado = (await conn.execute(
+                text("SELECT estado FROM verificacion_solicitud WHERE id_verificacion = :id"), {"id": id_verificacion}
+            )).scalar_one()
+        assert estado == "aprobada"
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("""
+                DELETE FROM tipo_documento WHERE id_tip_documento IN (
+                    SELECT id_tip_documento FROM documento WHERE id_verificacion = :id
+                )
+            """), {"id": id_verificacion})
+            await conn.execute(text("DELETE FROM perfil_empresa WHERE id_perfil = :id"), {"id": id_perfil})
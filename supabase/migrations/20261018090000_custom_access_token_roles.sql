@@ -0,0 +1,33 @@
+-- Hook "custom access token": agrega al JWT el claim user_roles con los nombres de
+-- los roles del usuario (rol.nombre vía usuario_rol). El backend autoriza con este
+-- claim sin consultar la base de datos; un cambio en usuario_rol se refleja en el
+-- siguiente token emitido (login o refresh).
+
+create or replace function public.custom_access_token_hook(event jsonb)
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+  claims jsonb;
+  roles jsonb;
+begin
+  select coalesce(jsonb_agg(r.nombre order by r.nombre), '[]'::jsonb)
+    into roles
+    from public.usuario_rol ur
+    join public.rol r on r.id = ur.id_rol
+   where ur.id_usuario = (event ->> 'user_id')::uuid;
+
+  claims := coalesce(event -> 'claims', '{}'::jsonb);
+  claims := jsonb_set(claims, '{user_roles}', roles);
+
+  return jsonb_set(event, '{claims}', claims);
+end;
+$$;
+
+grant usage on schema public to supabase_auth_admin;
+grant execute on function public.custom_access_token_hook(jsonb) to supabase_auth_admin;
+revoke execute on function public.custom_access_token_hook(jsonb) from authenticated, anon, public;
+
+grant select on table public.usuario_rol to supabase_auth_admin;
+grant select on table public.rol to supabase_auth_admin;
@@ -0,0 +1,41 @@
+-- Versiones de los datos que la API cachea en memoria. Cada grupo (ej. 'ubicaciones')
+-- tiene un contador que los triggers incrementan cuando cambian sus tablas; los workers
+-- lo consultan cada pocos segundos y descartan su cache si la versión cambió.
+
+create table if not exists public.cache_version (
+  nombre varchar(60) primary key,
+  version bigint not null default 1,
+  updated_at timestamptz default now()
+);
+
+comment on table public.cache_version is 'Versiones de los datos cacheados en memoria por la API';
+
+create or replace function public.bump_cache_version()
+returns trigger
+language plpgsql
+as $$
+begin
+  insert into public.cache_version (nombre, version, updated_at)
+  values (tg_argv[0], 1, now())
+  on conflict (nombre)
+  do update set version = public.cache_version.version + 1, updated_at = now();
+  return null;
+end;
+$$;
+
+insert into public.cache_version (nombre) values ('ubicaciones') on conflict do nothing;
+
+drop trigger if exists departamento_cache_version on public.departamento;
+create trigger departamento_cache_version
+  after insert or update or delete or truncate on public.departamento
+  for each statement execute function public.bump_cache_version('ubicaciones');
+
+drop trigger if exists ciudad_cache_version on public.ciudad;
+create trigger ciudad_cache_version
+  after insert or update or delete or truncate on public.ciudad
+  for each statement execute function public.bump_cache_version('ubicaciones');
+
+drop trigger if exists barrio_cache_version on public.barrio;
+create trigger barrio_cache_version
+  after insert or update or delete or truncate on public.barrio
+  for each statement execute function public.bump_cache_version('ubicaciones');
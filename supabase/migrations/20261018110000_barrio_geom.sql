@@ -0,0 +1,11 @@
+-- Polígonos de los barrios para geocodificación inversa (punto -> barrio -> ciudad -> departamento).
+-- El índice GiST permite resolver ST_Intersects(geom, punto) sin recorrer toda la tabla.
+
+create extension if not exists postgis with schema extensions;
+
+alter table public.barrio
+  add column if not exists geom geometry(MultiPolygon, 4326);
+
+comment on column public.barrio.geom is 'Límite del barrio (MultiPolygon, SRID 4326)';
+
+create index if not exists barrio_geom_gist on public.barrio using gist (geom);
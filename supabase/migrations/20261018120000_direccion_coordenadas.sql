@@ -0,0 +1,21 @@
+-- Coordenadas de las direcciones para búsquedas por cercanía de proveedores verificados.
+-- ST_DWithin/ST_Distance sobre geography usan el índice de expresión (metros);
+-- los filtros por bounding box (&&) usan el índice GiST sobre la geometría.
+
+create extension if not exists postgis with schema extensions;
+
+alter table public.direccion
+  add column if not exists coordenadas geometry(Point, 4326);
+
+create index if not exists direccion_coordenadas_gist
+  on public.direccion using gist (coordenadas);
+
+create index if not exists direccion_coordenadas_geog_gist
+  on public.direccion using gist ((coordenadas::geography));
+
+-- Joins desde la dirección hacia la empresa / sucursal
+create index if not exists perfil_empresa_id_direccion_verificado_idx
+  on public.perfil_empresa (id_direccion) where verificado;
+
+create index if not exists sucursal_empresa_id_direccion_idx
+  on public.sucursal_empresa (id_direccion);
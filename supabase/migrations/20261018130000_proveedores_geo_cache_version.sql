@@ -0,0 +1,19 @@
+-- Versión 'proveedores_geo': la usan los tiles del mapa de proveedores cacheados en memoria.
+-- Cambia cuando cambian direcciones (coordenadas), empresas (verificación / dirección) o sucursales.
+
+insert into public.cache_version (nombre) values ('proveedores_geo') on conflict do nothing;
+
+drop trigger if exists direccion_cache_version on public.direccion;
+create trigger direccion_cache_version
+  after insert or update or delete or truncate on public.direccion
+  for each statement execute function public.bump_cache_version('proveedores_geo');
+
+drop trigger if exists perfil_empresa_cache_version on public.perfil_empresa;
+create trigger perfil_empresa_cache_version
+  after insert or update or delete or truncate on public.perfil_empresa
+  for each statement execute function public.bump_cache_version('proveedores_geo');
+
+drop trigger if exists sucursal_empresa_cache_version on public.sucursal_empresa;
+create trigger sucursal_empresa_cache_version
+  after insert or update or delete or truncate on public.sucursal_empresa
+  for each statement execute function public.bump_cache_version('proveedores_geo');
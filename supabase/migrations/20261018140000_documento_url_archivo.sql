@@ -0,0 +1,4 @@
+-- URL del archivo subido a iDrive para cada documento de una solicitud de verificación.
+
+alter table public.documento
+  add column if not exists url_archivo varchar(500);
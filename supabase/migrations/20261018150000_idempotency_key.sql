@@ -0,0 +1,27 @@
+-- Respuestas registradas por Idempotency-Key (signup y solicitud de verificación). Un
+-- reintento con la misma key repite la respuesta guardada en lugar de volver a ejecutar
+-- el request; mientras el primero está en curso los duplicados esperan.
+
+create table if not exists public.idempotency_key (
+  alcance varchar(320) not null,
+  endpoint varchar(100) not null,
+  clave varchar(255) not null,
+  request_hash varchar(64) not null,
+  estado varchar(20) not null default 'en_curso',
+  propietario uuid not null,
+  status_code smallint,
+  respuesta jsonb,
+  locked_at timestamptz not null default now(),
+  created_at timestamptz default now(),
+  expires_at timestamptz not null,
+  primary key (alcance, endpoint, clave)
+);
+
+comment on table public.idempotency_key is 'Respuestas registradas por Idempotency-Key para repetirlas en los reintentos';
+
+-- Para purgar las vencidas: delete from public.idempotency_key where expires_at < now();
+create index if not exists idx_idempotency_key_expires_at
+  on public.idempotency_key (expires_at);
+
+-- Solo la API (service role / conexión directa) accede a esta tabla
+alter table public.idempotency_key enable row level security;
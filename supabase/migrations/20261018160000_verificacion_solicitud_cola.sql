@@ -0,0 +1,21 @@
+-- Cola de solicitudes de verificación del panel de administración: paginación keyset por
+-- (fecha_solicitud, id_verificacion) y filtro por nombre de empresa.
+
+-- Solo las pendientes: es la consulta más frecuente y el índice se mantiene chico a medida
+-- que las solicitudes se resuelven
+create index if not exists idx_verificacion_solicitud_pendiente
+  on public.verificacion_solicitud (fecha_solicitud, id_verificacion)
+  where estado = 'pendiente';
+
+-- Historial (aprobadas / rechazadas) con el mismo orden
+create index if not exists idx_verificacion_solicitud_estado_fecha
+  on public.verificacion_solicitud (estado, fecha_solicitud, id_verificacion);
+
+-- Búsqueda por nombre de empresa con ILIKE '%texto%'
+create extension if not exists pg_trgm with schema extensions;
+
+create index if not exists idx_perfil_empresa_nombre_fantasia_trgm
+  on public.perfil_empresa using gin (nombre_fantasia extensions.gin_trgm_ops);
+
+create index if not exists idx_perfil_empresa_razon_social_trgm
+  on public.perfil_empresa using gin (razon_social extensions.gin_trgm_ops);